@@ -0,0 +1,60 @@
+"""
+Benchmark for building and wiring AutobfxFlow DAGs
+
+Builds a QC-like (one-to-one) and a DECONTAM-like (one-to-many) flow for increasing numbers of tasks and
+reports the time spent wiring edges, which should scale roughly linearly with the number of tasks
+
+Usage: python benchmarks/flow_construction.py [n_tasks ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.iterator import AutobfxIterator
+from autobfx.lib.task import AutobfxTask
+
+
+N_HOSTS = 3
+
+
+def make_tasks(name: str, iterator: AutobfxIterator) -> list[AutobfxTask]:
+    return [
+        AutobfxTask(name=name, ids=kvs, func=lambda *a: None, project_fp=Path("."))
+        for kvs in iterator
+    ]
+
+
+def bench(n_tasks: int) -> tuple[float, float]:
+    # Split the tasks over the two stages so that the total number of tasks is roughly n_tasks
+    n_samples = max(1, n_tasks // (2 + N_HOSTS))
+    samples = AutobfxIterator([{"sample": f"sample{i}"} for i in range(n_samples)])
+    hosts = AutobfxIterator([{"host": f"host{i}"} for i in range(N_HOSTS)])
+    pairs = AutobfxIterator(
+        [{"sample": d["sample"], "host": h["host"]} for d in samples for h in hosts]
+    )
+    tasks = (
+        make_tasks("trimmomatic", samples)
+        + make_tasks("heyfastq", samples)
+        + make_tasks("align_to_host", pairs)
+    )
+
+    start = time.perf_counter()
+    flow = AutobfxFlow.from_tasks("bench", tasks)
+    flow.connect_one_to_one(samples, "trimmomatic", "heyfastq")
+    flow.connect_one_to_many(samples, "heyfastq", "align_to_host")
+    elapsed = time.perf_counter() - start
+
+    return len(flow.dag.nodes), elapsed
+
+
+def main(argv: list[str]):
+    sizes = [int(x) for x in argv] if argv else [1_000, 10_000, 100_000]
+    print(f"{'tasks':>10} {'wiring (s)':>12} {'us/task':>10}")
+    for n in sizes:
+        n_nodes, elapsed = bench(n)
+        print(f"{n_nodes:>10} {elapsed:>12.3f} {elapsed / n_nodes * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
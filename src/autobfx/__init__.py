@@ -1,3 +1,3 @@
-__version__ = "0.0.0"
-__author__ = "Charlie Bushman"
-__email__ = "ctbushman@gmail.com"
+__version__ = "0.0.0"
+__author__ = "Charlie Bushman"
+__email__ = "ctbushman@gmail.com"
@@ -1,103 +1,279 @@
-from pathlib import Path
-from autobfx.tasks.bwa import run_align_to_host, run_build_host_index
-from autobfx.lib.config import Config
-from autobfx.lib.flow import AutobfxFlow
-from autobfx.lib.iterator import AutobfxIterator
-from autobfx.lib.task import AutobfxTask
-
-
-def BUILD_HOST_INDEX(
-    config: Config, host_iterator: AutobfxIterator = None
-) -> AutobfxFlow:
-    NAME = "build_host_index"
-    project_fp = config.project_fp
-    flow_config = config.flows[NAME]
-    extra_inputs = AutobfxFlow.gather_files(
-        flow_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
-    )
-    extra_outputs = flow_config.get_extra_outputs(project_fp)
-    log_fp = config.get_log_fp() / NAME
-    runner = config.get_runner(flow_config)
-
-    host_iterator = AutobfxIterator.gather(
-        [{"host": host_name} for host_name in extra_inputs.keys()],
-        host_iterator,
-    )
-
-    tasks = [
-        AutobfxTask(
-            name=NAME,
-            ids=kvs,
-            func=run_build_host_index,
-            project_fp=project_fp,
-            extra_inputs={"host": [extra_inputs[kvs["host"]]]},
-            extra_outputs={
-                "host_indices": [
-                    extra_outputs["host_indices"][0] / f"{kvs['host']}.fasta.{index}"
-                    for index in ["amb", "ann", "bwt", "pac", "sa"]
-                ]
-            },
-            log_fp=log_fp / f"{kvs['host']}.log",
-            runner=runner,
-            kwargs={
-                **flow_config.parameters,
-            },
-        )
-        for kvs in host_iterator
-    ]
-
-    return AutobfxFlow.from_tasks(NAME, tasks)
-
-
-def ALIGN_TO_HOST(
-    config: Config,
-    sample_iterator: AutobfxIterator = None,
-    host_iterator: AutobfxIterator = None,
-) -> AutobfxFlow:
-    NAME = "align_to_host"
-    project_fp = config.project_fp
-    flow_config = config.flows[NAME]
-    input_reads = AutobfxFlow.gather_samples(
-        flow_config.get_input_reads(project_fp)[0],
-        config.paired_end,
-        config.samples,
-        sample_iterator,
-    )
-    extra_inputs = AutobfxFlow.gather_files(
-        flow_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
-    )
-    extra_outputs = flow_config.get_extra_outputs(project_fp)
-    log_fp = config.get_log_fp() / NAME
-    runner = config.get_runner(flow_config)
-
-    host_iterator = AutobfxIterator.gather(
-        {"host": host_name for host_name in extra_inputs.keys()},
-        host_iterator,
-    )
-    sample_iterator = AutobfxIterator.gather(
-        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
-    )
-    print(extra_inputs)
-    tasks = [
-        AutobfxTask(
-            name=NAME,
-            ids=kvs,
-            func=run_align_to_host,
-            project_fp=project_fp,
-            input_reads=[input_reads[kvs["sample"]]],
-            extra_inputs={"host": [extra_inputs[kvs["host"]]]},
-            extra_outputs={
-                "sams": [
-                    extra_outputs["sams"][0] / f"{kvs['host']}_{kvs['sample']}.sam"
-                ]
-            },
-            log_fp=log_fp / f"{kvs['host']}_{kvs['sample']}.log",
-            runner=runner,
-            kwargs={
-                **flow_config.parameters,
-            },
-        )
-        for kvs in AutobfxIterator.expand([sample_iterator, host_iterator])
-    ]
-
-    return AutobfxFlow.from_tasks(NAME, tasks)
+from pathlib import Path
+from autobfx.tasks.bwa import (
+    INDEX_SUFFIXES,
+    run_align_and_sort,
+    run_align_to_host,
+    run_align_to_hosts,
+    run_build_combined_index,
+    run_build_host_index,
+)
+from autobfx.flows.screen import host_screen, sample_screen
+from autobfx.lib.config import Config
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.iterator import AutobfxIterator
+from autobfx.lib.task import AutobfxTask
+
+
+def host_index(config: Config, host: str) -> dict[str, list[Path]]:
+    """The index BUILD_HOST_INDEX makes for `host` (by its .bwt file), as extra inputs for aligning to it"""
+    try:
+        index_fp = config.flows["build_host_index"].get_extra_outputs(
+            config.project_fp
+        )["host_indices"][0]
+    except KeyError:
+        return {}
+    return {"index": [index_fp / f"{host}.fasta.bwt"]}
+
+
+# The combined index of every host, next to the single host ones
+COMBINED = "combined_hosts"
+
+
+def BUILD_HOST_INDEX(
+    config: Config, host_iterator: AutobfxIterator = None
+) -> AutobfxFlow:
+    NAME = "build_host_index"
+    project_fp = config.project_fp
+    flow_config = config.flows[NAME]
+    extra_inputs = AutobfxFlow.gather_files(
+        flow_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
+    )
+    extra_outputs = flow_config.get_extra_outputs(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    host_iterator = AutobfxIterator.gather(
+        [{"host": host_name} for host_name in extra_inputs.keys()],
+        host_iterator,
+    )
+
+    tasks = [
+        AutobfxTask(
+            name=NAME,
+            ids=kvs,
+            func=run_build_host_index,
+            project_fp=project_fp,
+            extra_inputs={"host": [extra_inputs[kvs["host"]]]},
+            extra_outputs={
+                "host_indices": [
+                    extra_outputs["host_indices"][0] / f"{kvs['host']}.fasta.{index}"
+                    for index in INDEX_SUFFIXES
+                ]
+            },
+            log_fp=log_fp / f"{kvs['host']}.log",
+            runner=runner,
+            kwargs={
+                **flow_config.parameters,
+            },
+        )
+        for kvs in host_iterator
+    ]
+
+    return AutobfxFlow.from_tasks(NAME, tasks)
+
+
+def ALIGN_TO_HOST(
+    config: Config,
+    sample_iterator: AutobfxIterator = None,
+    host_iterator: AutobfxIterator = None,
+) -> AutobfxFlow:
+    NAME = "align_to_host"
+    project_fp = config.project_fp
+    flow_config = config.flows[NAME]
+    input_reads = AutobfxFlow.gather_samples(
+        flow_config.get_input_reads(project_fp)[0],
+        config.paired_end,
+        config.samples,
+        sample_iterator,
+        config.sample_patterns,
+    )
+    extra_inputs = AutobfxFlow.gather_files(
+        flow_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
+    )
+    extra_outputs = flow_config.get_extra_outputs(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    host_iterator = AutobfxIterator.gather(
+        [{"host": host_name} for host_name in extra_inputs.keys()],
+        host_iterator,
+    )
+    sample_iterator = AutobfxIterator.gather(
+        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
+    )
+    print(extra_inputs)
+    tasks = [
+        AutobfxTask(
+            name=NAME,
+            ids=kvs,
+            func=run_align_to_host,
+            project_fp=project_fp,
+            input_reads=[input_reads[kvs["sample"]]],
+            extra_inputs={
+                "host": [extra_inputs[kvs["host"]]],
+                **host_index(config, kvs["host"]),
+                **sample_screen(config, kvs["sample"]),
+            },
+            extra_outputs={
+                "sams": [
+                    extra_outputs["sams"][0] / f"{kvs['host']}_{kvs['sample']}.sam"
+                ]
+            },
+            log_fp=log_fp / f"{kvs['host']}_{kvs['sample']}.log",
+            runner=runner,
+            kwargs={
+                **flow_config.parameters,
+            },
+            screen=host_screen(config, kvs["sample"], kvs["host"]),
+        )
+        for kvs in AutobfxIterator.expand([sample_iterator, host_iterator])
+    ]
+
+    return AutobfxFlow.from_tasks(NAME, tasks)
+
+
+def ALIGN_AND_SORT(
+    config: Config,
+    sample_iterator: AutobfxIterator = None,
+    host_iterator: AutobfxIterator = None,
+) -> AutobfxFlow:
+    """ALIGN_TO_HOST and SORT_SAM in one task per host and sample, streaming alignments into the sort instead of through a SAM"""
+    NAME = "align_and_sort"
+    project_fp = config.project_fp
+    flow_config = config.flows[NAME]
+    input_reads = AutobfxFlow.gather_samples(
+        flow_config.get_input_reads(project_fp)[0],
+        config.paired_end,
+        config.samples,
+        sample_iterator,
+        config.sample_patterns,
+    )
+    extra_inputs = AutobfxFlow.gather_files(
+        flow_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
+    )
+    extra_outputs = flow_config.get_extra_outputs(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    host_iterator = AutobfxIterator.gather(
+        [{"host": host_name} for host_name in extra_inputs.keys()],
+        host_iterator,
+    )
+    sample_iterator = AutobfxIterator.gather(
+        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
+    )
+    tasks = [
+        AutobfxTask(
+            name=NAME,
+            ids=kvs,
+            func=run_align_and_sort,
+            project_fp=project_fp,
+            input_reads=[input_reads[kvs["sample"]]],
+            extra_inputs={
+                "host": [extra_inputs[kvs["host"]]],
+                **host_index(config, kvs["host"]),
+                **sample_screen(config, kvs["sample"]),
+            },
+            extra_outputs={
+                "bams": [
+                    extra_outputs["bams"][0] / f"{kvs['host']}_{kvs['sample']}.bam"
+                ]
+            },
+            log_fp=log_fp / f"{kvs['host']}_{kvs['sample']}.log",
+            runner=runner,
+            kwargs={
+                **flow_config.parameters,
+            },
+            screen=host_screen(config, kvs["sample"], kvs["host"]),
+        )
+        for kvs in AutobfxIterator.expand([sample_iterator, host_iterator])
+    ]
+
+    return AutobfxFlow.from_tasks(NAME, tasks)
+
+
+def BUILD_COMBINED_INDEX(
+    config: Config, host_iterator: AutobfxIterator = None
+) -> AutobfxFlow:
+    """One index of every host for ALIGN_TO_HOSTS, configured (and linked into the project) like BUILD_HOST_INDEX"""
+    NAME = "build_combined_index"
+    project_fp = config.project_fp
+    flow_config = config.flows["build_host_index"]
+    extra_inputs = AutobfxFlow.gather_files(
+        flow_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
+    )
+    extra_outputs = flow_config.get_extra_outputs(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    task = AutobfxTask(
+        name=NAME,
+        ids={},
+        func=run_build_combined_index,
+        project_fp=project_fp,
+        extra_inputs={"hosts": list(extra_inputs.values())},
+        extra_outputs={
+            "host_indices": [
+                extra_outputs["host_indices"][0] / f"{COMBINED}.fasta.{index}"
+                for index in INDEX_SUFFIXES
+            ]
+        },
+        log_fp=log_fp / f"{COMBINED}.log",
+        runner=runner,
+        kwargs={
+            **flow_config.parameters,
+        },
+    )
+
+    return AutobfxFlow.from_tasks(NAME, [task])
+
+
+def ALIGN_TO_HOSTS(
+    config: Config, sample_iterator: AutobfxIterator = None
+) -> AutobfxFlow:
+    """
+    Align each sample once to every host, with the index from BUILD_COMBINED_INDEX, counting the reads from each host
+    With the same ids as HEYFASTQ, this can be fused after it and read its output through a named pipe
+    """
+    NAME = "align_to_hosts"
+    project_fp = config.project_fp
+    flow_config = config.flows[NAME]
+    input_reads = AutobfxFlow.gather_samples(
+        flow_config.get_input_reads(project_fp)[0],
+        config.paired_end,
+        config.samples,
+        sample_iterator,
+        config.sample_patterns,
+    )
+    index_fp = config.flows["build_host_index"].get_extra_outputs(project_fp)[
+        "host_indices"
+    ][0]
+    extra_outputs = flow_config.get_extra_outputs(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    sample_iterator = AutobfxIterator.gather(
+        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
+    )
+    tasks = [
+        AutobfxTask(
+            name=NAME,
+            ids=kvs,
+            func=run_align_to_hosts,
+            project_fp=project_fp,
+            input_reads=[input_reads[kvs["sample"]].as_stream()],
+            extra_inputs={"index": [index_fp / f"{COMBINED}.fasta.bwt"]},
+            extra_outputs={
+                "bams": [extra_outputs["bams"][0] / f"{kvs['sample']}.bam"],
+                "counts": [extra_outputs["counts"][0] / f"{kvs['sample']}.json"],
+            },
+            log_fp=log_fp / f"{kvs['sample']}.log",
+            runner=runner,
+            kwargs={
+                **flow_config.parameters,
+            },
+        )
+        for kvs in sample_iterator
+    ]
+
+    return AutobfxFlow.from_tasks(NAME, tasks)
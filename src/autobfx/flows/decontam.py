@@ -1,59 +1,158 @@
-import networkx as nx
-from autobfx.lib.config import Config
-from autobfx.lib.flow import AutobfxFlow
-from autobfx.lib.io import IOReads
-from autobfx.lib.iterator import AutobfxIterator
-from autobfx.flows.bwa import ALIGN_TO_HOST, BUILD_HOST_INDEX
-from autobfx.flows.samtools import SORT_SAM
-from pathlib import Path
-
-
-NAME = "decontam"
-
-
-def DECONTAM(
-    config: Config,
-    sample_iterator: AutobfxIterator = None,
-    host_iterator: AutobfxIterator = None,
-) -> AutobfxFlow:
-    input_reads = AutobfxFlow.gather_samples(
-        config.flows["align_to_host"].get_input_reads(config.project_fp)[0],
-        config.paired_end,
-        config.samples,
-        sample_iterator,
-    )
-    extra_inputs = AutobfxFlow.gather_files(
-        config.flows["build_host_index"].get_extra_inputs(config.project_fp)["hosts"][
-            0
-        ],
-        "fasta",
-        host_iterator,
-    )
-    sample_iterator = AutobfxIterator.gather(
-        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
-    )
-    host_iterator = AutobfxIterator.gather(
-        [{"host": host_name} for host_name in extra_inputs.keys()],
-        host_iterator,
-    )
-
-    flow = AutobfxFlow.compose_flows(
-        NAME,
-        [
-            BUILD_HOST_INDEX(config, host_iterator=host_iterator),
-            ALIGN_TO_HOST(
-                config, sample_iterator=sample_iterator, host_iterator=host_iterator
-            ),
-            SORT_SAM(
-                config, sample_iterator=sample_iterator, host_iterator=host_iterator
-            ),
-        ],
-    )
-    flow.connect_one_to_many(host_iterator, "build_host_index", "align_to_host")
-    flow.connect_one_to_one(
-        AutobfxIterator.expand([sample_iterator, host_iterator]),
-        "align_to_host",
-        "sort_sam",
-    )
-
-    return flow
+import networkx as nx
+from autobfx.lib.config import Config
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.iterator import AutobfxIterator
+from autobfx.flows.bwa import (
+    ALIGN_AND_SORT,
+    ALIGN_TO_HOST,
+    ALIGN_TO_HOSTS,
+    BUILD_COMBINED_INDEX,
+    BUILD_HOST_INDEX,
+)
+from autobfx.flows.filter_host_reads import FILTER_HOST_READS
+from autobfx.flows.samtools import SORT_SAM
+from autobfx.flows.screen import BUILD_HOST_SKETCH, SCREEN_HOSTS
+from autobfx.tasks.bwa import index_mem_mb
+from pathlib import Path
+
+
+NAME = "decontam"
+
+
+def align_name(
+    config: Config,
+    hosts: dict[str, Path | IOObject],
+    fused: bool = None,
+    combined: bool = None,
+) -> str:
+    """
+    The name of the flow DECONTAM aligns samples with for `hosts`, so flows composed with it can connect to it
+    See DECONTAM for what `fused` and `combined` default to
+    """
+    if combined is None:
+        # Hosts are paths, or IOObjects when they come from `host_iterator`
+        fastas = [h.fp if isinstance(h, IOObject) else h for h in hosts.values()]
+        # Fastas that don't exist yet can't be sized, so they're aligned to one at a time
+        combined = (
+            "align_to_hosts" in config.flows
+            and all(fp.exists() for fp in fastas)
+            and index_mem_mb(fastas)
+            <= config.flows["align_to_hosts"].runner_config.mem_mb
+        )
+    if combined:
+        return "align_to_hosts"
+    if fused is None:
+        fused = "align_and_sort" in config.flows
+    return "align_and_sort" if fused else "align_to_host"
+
+
+def DECONTAM(
+    config: Config,
+    sample_iterator: AutobfxIterator = None,
+    host_iterator: AutobfxIterator = None,
+    fused: bool = None,
+    combined: bool = None,
+) -> AutobfxFlow:
+    """
+    Align every sample to every host and sort the alignments, then with a `filter_host_reads` flow in the config,
+    remove the reads that mapped to any of them
+    - With `combined` (the default if there's an `align_to_hosts` flow in the config and an index of every host fits in
+      its memory), every host is indexed together by BUILD_COMBINED_INDEX and each sample is aligned once by ALIGN_TO_HOSTS,
+      which counts the reads from each host as they stream past (there's nothing left to screen in this mode)
+    - With a `screen_hosts` flow in the config, a subsample of each sample's reads is first screened against a k-mer sketch
+      of each host and alignments to hosts it has no reads from are skipped (recorded as screened out)
+    - With `fused` (the default if there's an `align_and_sort` flow in the config) alignment is piped straight into sorting
+      by ALIGN_AND_SORT, otherwise ALIGN_TO_HOST writes SAMs that SORT_SAM reads back
+    """
+    extra_inputs = AutobfxFlow.gather_files(
+        config.flows["build_host_index"].get_extra_inputs(config.project_fp)["hosts"][
+            0
+        ],
+        "fasta",
+        host_iterator,
+    )
+    align = align_name(config, extra_inputs, fused, combined)
+    combined = align == "align_to_hosts"
+    fused = align == "align_and_sort"
+    input_reads = AutobfxFlow.gather_samples(
+        config.flows[align].get_input_reads(config.project_fp)[0],
+        config.paired_end,
+        config.samples,
+        sample_iterator,
+        config.sample_patterns,
+    )
+    sample_iterator = AutobfxIterator.gather(
+        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
+    )
+    host_iterator = AutobfxIterator.gather(
+        [{"host": host_name} for host_name in extra_inputs.keys()],
+        host_iterator,
+    )
+
+    if combined:
+        flow = AutobfxFlow.compose_flows(
+            NAME,
+            [
+                BUILD_COMBINED_INDEX(config, host_iterator=host_iterator),
+                ALIGN_TO_HOSTS(config, sample_iterator=sample_iterator),
+            ],
+        )
+        flow.connect("build_combined_index", "align_to_hosts", on=[])
+        bams_name = "align_to_hosts"
+    else:
+        flows = [BUILD_HOST_INDEX(config, host_iterator=host_iterator)]
+        if "screen_hosts" in config.flows:
+            flows += [
+                BUILD_HOST_SKETCH(config, host_iterator=host_iterator),
+                SCREEN_HOSTS(
+                    config, sample_iterator=sample_iterator, host_iterator=host_iterator
+                ),
+            ]
+        if fused:
+            flows.append(
+                ALIGN_AND_SORT(
+                    config, sample_iterator=sample_iterator, host_iterator=host_iterator
+                )
+            )
+        else:
+            flows += [
+                ALIGN_TO_HOST(
+                    config, sample_iterator=sample_iterator, host_iterator=host_iterator
+                ),
+                SORT_SAM(
+                    config, sample_iterator=sample_iterator, host_iterator=host_iterator
+                ),
+            ]
+
+        flow = AutobfxFlow.compose_flows(NAME, flows)
+        flow.connect("build_host_index", align, on=["host"])
+        if not fused:
+            flow.connect("align_to_host", "sort_sam", on=["sample", "host"])
+        if "screen_hosts" in config.flows:
+            # Every screen needs every host's sketch
+            for screen in flow.index["screen_hosts"].values():
+                flow.dag.add_edges_from(
+                    (sketch, screen)
+                    for sketch in flow.index["build_host_sketch"].values()
+                )
+            flow.connect("screen_hosts", align, on=["sample"])
+
+        bams_name = "align_and_sort" if fused else "sort_sam"
+
+    if "filter_host_reads" in config.flows:
+        flow = AutobfxFlow.compose_flows(
+            NAME,
+            [
+                flow,
+                FILTER_HOST_READS(
+                    config,
+                    sample_iterator=sample_iterator,
+                    host_iterator=host_iterator,
+                    source=bams_name,
+                ),
+            ],
+        )
+        flow.connect(bams_name, "filter_host_reads", on=["sample"])
+
+    return flow
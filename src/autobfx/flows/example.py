@@ -1,3 +1,3 @@
-# If you wanna write your own custom flow define it in a file here
-# then run it with:
-# python flows/flow_name.py /path/to/project
+# If you wanna write your own custom flow define it in a file here
+# then run it with:
+# python flows/flow_name.py /path/to/project
@@ -0,0 +1,68 @@
+from autobfx.tasks.filter_host_reads import run_filter_host_reads
+from autobfx.lib.config import Config
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.iterator import AutobfxIterator
+from autobfx.lib.task import AutobfxTask
+
+
+NAME = "filter_host_reads"
+
+
+def FILTER_HOST_READS(
+    config: Config,
+    sample_iterator: AutobfxIterator = None,
+    host_iterator: AutobfxIterator = None,
+    source: str = "sort_sam",
+) -> AutobfxFlow:
+    """
+    Remove the reads that mapped to any host, from the BAMs made by the `source` flow
+    (`sort_sam` or `align_and_sort` with a BAM per host and sample, or `align_to_hosts` with one per sample)
+    """
+    project_fp = config.project_fp
+    flow_config = config.flows[NAME]
+    input_reads = AutobfxFlow.gather_samples(
+        flow_config.get_input_reads(project_fp)[0],
+        config.paired_end,
+        config.samples,
+        sample_iterator,
+        config.sample_patterns,
+    )
+    bams_fp = config.flows[source].get_extra_outputs(project_fp)["bams"][0]
+    output_reads = flow_config.get_output_reads(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    sample_iterator = AutobfxIterator.gather(
+        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
+    )
+    hosts = AutobfxFlow.gather_files(
+        config.flows["build_host_index"].get_extra_inputs(project_fp)["hosts"][0],
+        "fasta",
+        host_iterator,
+    )
+
+    def bams(sample: str) -> list:
+        if source == "align_to_hosts":
+            return [bams_fp / f"{sample}.bam"]
+        return [bams_fp / f"{host}_{sample}.bam" for host in hosts]
+
+    tasks = [
+        AutobfxTask(
+            name=NAME,
+            ids=kvs,
+            func=run_filter_host_reads,
+            project_fp=project_fp,
+            input_reads=[input_reads[kvs["sample"]]],
+            extra_inputs={"bams": bams(kvs["sample"])},
+            output_reads=[input_reads[kvs["sample"]].get_output_reads(output_reads[0])],
+            log_fp=log_fp / f"{kvs['sample']}.log",
+            runner=runner,
+            kwargs={
+                **flow_config.parameters,
+            },
+            drop_screened=True,
+        )
+        for kvs in sample_iterator
+    ]
+
+    return AutobfxFlow.from_tasks(NAME, tasks)
@@ -18,6 +18,7 @@ def SORT_SAM(
         config.paired_end,
         config.samples,
         sample_iterator,
+        config.sample_patterns,
     )
     extra_inputs = AutobfxFlow.gather_files(
         flow_config.get_extra_inputs(project_fp)["sams"][0], "sam", host_iterator
@@ -27,7 +28,7 @@ def SORT_SAM(
     runner = config.get_runner(flow_config)
 
     host_iterator = AutobfxIterator.gather(
-        {"host": host_name for host_name in extra_inputs.keys()},
+        [{"host": host_name} for host_name in extra_inputs.keys()],
         host_iterator,
     )
     sample_iterator = AutobfxIterator.gather(
@@ -42,7 +43,8 @@ def SORT_SAM(
             project_fp=config.project_fp,
             extra_inputs={
                 "sams": [
-                    extra_outputs["sams"][0] / f"{kvs['host']}_{kvs['sample']}.sam"
+                    flow_config.get_extra_inputs(project_fp)["sams"][0]
+                    / f"{kvs['host']}_{kvs['sample']}.sam"
                 ]
             },
             extra_outputs={
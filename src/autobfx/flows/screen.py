@@ -0,0 +1,122 @@
+from functools import partial
+from pathlib import Path
+from typing import Callable
+from autobfx.lib.config import Config
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.iterator import AutobfxIterator
+from autobfx.lib.sketch import screened_out
+from autobfx.lib.task import AutobfxTask
+from autobfx.tasks.screen import SUFFIX, run_build_host_sketch, run_screen_hosts
+
+
+def sample_screen(config: Config, sample: str) -> dict[str, list[Path]]:
+    """The screen SCREEN_HOSTS makes for `sample`, as extra inputs for aligning it to hosts"""
+    if "screen_hosts" not in config.flows:
+        return {}
+    return {
+        "screen": [
+            config.flows["screen_hosts"].get_extra_outputs(config.project_fp)[
+                "screens"
+            ][0]
+            / f"{sample}.json"
+        ]
+    }
+
+
+def host_screen(config: Config, sample: str, host: str) -> Callable[[], bool] | None:
+    """The check that screens out aligning `sample` to `host` if the sample has no reads from it"""
+    screen = sample_screen(config, sample)
+    return partial(screened_out, screen["screen"][0], host) if screen else None
+
+
+def BUILD_HOST_SKETCH(
+    config: Config, host_iterator: AutobfxIterator = None
+) -> AutobfxFlow:
+    NAME = "build_host_sketch"
+    project_fp = config.project_fp
+    flow_config = config.flows[NAME]
+    extra_inputs = AutobfxFlow.gather_files(
+        flow_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
+    )
+    extra_outputs = flow_config.get_extra_outputs(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    host_iterator = AutobfxIterator.gather(
+        [{"host": host_name} for host_name in extra_inputs.keys()],
+        host_iterator,
+    )
+
+    tasks = [
+        AutobfxTask(
+            name=NAME,
+            ids=kvs,
+            func=run_build_host_sketch,
+            project_fp=project_fp,
+            extra_inputs={"host": [extra_inputs[kvs["host"]]]},
+            extra_outputs={
+                "sketches": [extra_outputs["sketches"][0] / f"{kvs['host']}{SUFFIX}"]
+            },
+            log_fp=log_fp / f"{kvs['host']}.log",
+            runner=runner,
+            kwargs={
+                **flow_config.parameters,
+            },
+        )
+        for kvs in host_iterator
+    ]
+
+    return AutobfxFlow.from_tasks(NAME, tasks)
+
+
+def SCREEN_HOSTS(
+    config: Config,
+    sample_iterator: AutobfxIterator = None,
+    host_iterator: AutobfxIterator = None,
+) -> AutobfxFlow:
+    """Estimate which hosts each sample has reads from, against the sketches BUILD_HOST_SKETCH makes"""
+    NAME = "screen_hosts"
+    project_fp = config.project_fp
+    flow_config = config.flows[NAME]
+    sketch_config = config.flows["build_host_sketch"]
+    input_reads = AutobfxFlow.gather_samples(
+        flow_config.get_input_reads(project_fp)[0],
+        config.paired_end,
+        config.samples,
+        sample_iterator,
+        config.sample_patterns,
+    )
+    hosts = AutobfxFlow.gather_files(
+        sketch_config.get_extra_inputs(project_fp)["hosts"][0], "fasta", host_iterator
+    )
+    sketches_fp = sketch_config.get_extra_outputs(project_fp)["sketches"][0]
+    extra_outputs = flow_config.get_extra_outputs(project_fp)
+    log_fp = config.get_log_fp() / NAME
+    runner = config.get_runner(flow_config)
+
+    sample_iterator = AutobfxIterator.gather(
+        [{"sample": s} for s, _ in input_reads.items()], sample_iterator
+    )
+    tasks = [
+        AutobfxTask(
+            name=NAME,
+            ids=kvs,
+            func=run_screen_hosts,
+            project_fp=project_fp,
+            input_reads=[input_reads[kvs["sample"]]],
+            extra_inputs={
+                "sketches": [sketches_fp / f"{host}{SUFFIX}" for host in hosts]
+            },
+            extra_outputs={
+                "screens": [extra_outputs["screens"][0] / f"{kvs['sample']}.json"]
+            },
+            log_fp=log_fp / f"{kvs['sample']}.log",
+            runner=runner,
+            kwargs={
+                **flow_config.parameters,
+            },
+        )
+        for kvs in sample_iterator
+    ]
+
+    return AutobfxFlow.from_tasks(NAME, tasks)
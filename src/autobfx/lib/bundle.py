@@ -0,0 +1,75 @@
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def read_results(results_fp: Path) -> dict[int, dict]:
+    """The results written so far by `run_bundle`, keyed by manifest line"""
+    results = {}
+    try:
+        with open(results_fp) as f:
+            for line in f:
+                # A bundle killed mid write can leave a partial last line
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                results[result["index"]] = result
+    except FileNotFoundError:
+        pass
+    return results
+
+
+def run_bundle(manifest_fp: Path, results_fp: Path, workers: int = 1) -> int:
+    """
+    Run each line of a manifest as a shell command, `workers` at a time
+    Every command's exit code and runtime is appended to `results_fp` as soon as it finishes,
+    so what finished is still known if the allocation is killed part way through
+    Returns 0 if every command succeeded and 1 otherwise
+    """
+    cmds = Path(manifest_fp).read_text().splitlines()
+    lock = threading.Lock()
+
+    def run(i: int) -> int:
+        started = time.time()
+        exit_code = subprocess.run(
+            cmds[i], shell=True, executable="/bin/bash"
+        ).returncode
+        with lock, open(results_fp, "a") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "index": i,
+                        "exit_code": exit_code,
+                        "runtime_s": time.time() - started,
+                    }
+                )
+                + "\n"
+            )
+        return exit_code
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        exit_codes = list(pool.map(run, range(len(cmds))))
+
+    return 0 if all(c == 0 for c in exit_codes) else 1
+
+
+def main(argv: list[str] = sys.argv[1:]):
+    parser = argparse.ArgumentParser(
+        description="Run a bundle of autobfx task commands in parallel"
+    )
+    parser.add_argument("manifest_fp", type=Path, help="One command per line")
+    parser.add_argument("results_fp", type=Path, help="Where to write exit codes")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    return run_bundle(args.manifest_fp, args.results_fp, args.workers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,114 +1,162 @@
-from pathlib import Path
-from pydantic import BaseModel
-from autobfx.lib.runner import (
-    AutobfxRunner,
-    AutobfxSoftwareManager,
-    runner_map,
-    swm_map,
-)
-
-
-class RunnerConfig(BaseModel):
-    # All the options that can be passed to the runner
-    threads: int = 1
-    mem_mb: int = 8000
-    runtime_min: int = 120
-    # TODO: Add more options
-    # Any additional parameters that can be passed to specific runner types
-    parameters: dict[str, str | int | float | Path | list | dict] = {}
-
-
-class FlowConfig(BaseModel):
-    # A directory or list of directories containing input reads
-    input_reads: Path | str | list[Path | str] = ""
-    # A dictionary of extra input names mapping to the input directories or files
-    extra_inputs: dict[str, Path | str | list[Path | str]] = {}
-    # A directory or list of directories containing output reads
-    output_reads: Path | str | list[Path | str] = ""
-    # A dictionary of extra output names mapping to the output directories or files
-    extra_outputs: dict[str, Path | str | list[Path | str]] = {}
-    # TODO: Consider adding flow-level SWM override
-    conda: str = "base"
-    image: str = ""
-    parameters: dict[str, str | int | float | Path | list | dict] = {}
-    runner_config: RunnerConfig = RunnerConfig()
-
-    def _parse_io_dir(self, input_fp: Path, project_fp: Path) -> Path:
-        if not input_fp.is_absolute():
-            input_fp = project_fp / input_fp
-
-        return input_fp.resolve()
-
-    def get_input_reads(self, project_fp: Path) -> list[Path]:
-        if isinstance(self.input_reads, list):
-            return [self._parse_io_dir(Path(x), project_fp) for x in self.input_reads]
-        return [self._parse_io_dir(Path(self.input_reads), project_fp)]
-
-    def get_extra_inputs(self, project_fp: Path) -> dict[str, list[Path]]:
-        extra_inputs = {}
-        for k, v in self.extra_inputs.items():
-            if isinstance(v, list):
-                extra_inputs[k] = [self._parse_io_dir(Path(x), project_fp) for x in v]
-            else:
-                extra_inputs[k] = [self._parse_io_dir(Path(v), project_fp)]
-        return extra_inputs
-
-    def get_output_reads(self, project_fp: Path) -> list[Path]:
-        if isinstance(self.output_reads, list):
-            return [self._parse_io_dir(Path(x), project_fp) for x in self.output_reads]
-        return [self._parse_io_dir(Path(self.output_reads), project_fp)]
-
-    def get_extra_outputs(self, project_fp: Path) -> dict[str, list[Path]]:
-        extra_outputs = {}
-        for k, v in self.extra_outputs.items():
-            if isinstance(v, list):
-                extra_outputs[k] = [self._parse_io_dir(Path(x), project_fp) for x in v]
-            else:
-                extra_outputs[k] = [self._parse_io_dir(Path(v), project_fp)]
-        return extra_outputs
-
-
-class Config(BaseModel):
-    version: str
-    name: str
-    project_fp: Path
-    paired_end: bool = True
-    log_fp: str | Path = "logs"
-    # benchmark_dir: str = "benchmark" # TODO: Is this even a good way of doing this? Explore alternatives
-    # rerun_strategy: str = "lazy" # TODO: Implement this (should find the latest complete outputs and start from there)
-    # other strategies might be "force" (to delete everything and rerun) or "strict" (to rerun everything once a missing output is found (even if outputs down the line exist, overwrite them))
-    swm: str = "none"
-    runner: str = "local"
-    samples: dict[str, tuple[Path, ...]] = {}
-    flows: dict[str, FlowConfig] = (
-        {}
-    )  # Consider something like 'trimmomatic:param_set_1' as a key that can be parsed to run the same flow with different parameter sets
-
-    def get_log_fp(self) -> Path:
-        log_fp = Path(self.log_fp)
-        if not log_fp.is_absolute():
-            log_fp = self.project_fp / log_fp
-
-        return log_fp
-
-    def get_runner(self, flow_config: FlowConfig) -> AutobfxRunner:
-        try:
-            swm = swm_map[self.swm]()
-        except KeyError:
-            raise ValueError(
-                f"Software manager {self.swm} type is not supported or is not installed"
-            )
-
-        try:
-            return runner_map[self.runner](
-                swm,
-                options={
-                    "conda_env": flow_config.conda,
-                    "docker_img": flow_config.image,
-                    "params": flow_config.runner_config,
-                },
-            )
-        except KeyError:
-            raise ValueError(
-                f"Runner {self.runner} type is not supported or is not installed"
-            )
+from pathlib import Path
+from pydantic import BaseModel
+from autobfx.lib.envs import EnvRecord, provision, read_registry
+from autobfx.lib.runner import (
+    AutobfxRunner,
+    AutobfxSoftwareManager,
+    runner_map,
+    swm_map,
+)
+from autobfx.lib.scheduler import ResourceScheduler
+
+
+class RunnerConfig(BaseModel):
+    # All the options that can be passed to the runner
+    threads: int = 1
+    mem_mb: int = 8000
+    runtime_min: int = 120
+    # TODO: Add more options
+    # Any additional parameters that can be passed to specific runner types
+    parameters: dict[str, str | int | float | Path | list | dict] = {}
+
+
+class FlowConfig(BaseModel):
+    # A directory or list of directories containing input reads
+    input_reads: Path | str | list[Path | str] = ""
+    # A dictionary of extra input names mapping to the input directories or files
+    extra_inputs: dict[str, Path | str | list[Path | str]] = {}
+    # A directory or list of directories containing output reads
+    output_reads: Path | str | list[Path | str] = ""
+    # A dictionary of extra output names mapping to the output directories or files
+    extra_outputs: dict[str, Path | str | list[Path | str]] = {}
+    # TODO: Consider adding flow-level SWM override
+    conda: str = "base"
+    image: str = ""
+    parameters: dict[str, str | int | float | Path | list | dict] = {}
+    runner_config: RunnerConfig = RunnerConfig()
+
+    def _parse_io_dir(self, input_fp: Path, project_fp: Path) -> Path:
+        if not input_fp.is_absolute():
+            input_fp = project_fp / input_fp
+
+        return input_fp.resolve()
+
+    def get_input_reads(self, project_fp: Path) -> list[Path]:
+        if isinstance(self.input_reads, list):
+            return [self._parse_io_dir(Path(x), project_fp) for x in self.input_reads]
+        return [self._parse_io_dir(Path(self.input_reads), project_fp)]
+
+    def get_extra_inputs(self, project_fp: Path) -> dict[str, list[Path]]:
+        extra_inputs = {}
+        for k, v in self.extra_inputs.items():
+            if isinstance(v, list):
+                extra_inputs[k] = [self._parse_io_dir(Path(x), project_fp) for x in v]
+            else:
+                extra_inputs[k] = [self._parse_io_dir(Path(v), project_fp)]
+        return extra_inputs
+
+    def get_output_reads(self, project_fp: Path) -> list[Path]:
+        if isinstance(self.output_reads, list):
+            return [self._parse_io_dir(Path(x), project_fp) for x in self.output_reads]
+        return [self._parse_io_dir(Path(self.output_reads), project_fp)]
+
+    def get_extra_outputs(self, project_fp: Path) -> dict[str, list[Path]]:
+        extra_outputs = {}
+        for k, v in self.extra_outputs.items():
+            if isinstance(v, list):
+                extra_outputs[k] = [self._parse_io_dir(Path(x), project_fp) for x in v]
+            else:
+                extra_outputs[k] = [self._parse_io_dir(Path(v), project_fp)]
+        return extra_outputs
+
+
+class Config(BaseModel):
+    version: str
+    name: str
+    project_fp: Path
+    paired_end: bool = True
+    log_fp: str | Path = "logs"
+    # benchmark_dir: str = "benchmark" # TODO: Is this even a good way of doing this? Explore alternatives
+    # "lazy" reruns tasks with incomplete outputs or changed inputs and anything downstream whose inputs then change
+    # "force" reruns everything, "strict" reruns everything downstream of a task that reruns even if its inputs come out the same
+    rerun_strategy: str = "lazy"
+    # How to tell if inputs changed, "stat" compares size and mtime, "content" also hashes the files (with xxhash if installed)
+    fingerprint: str = "stat"
+    # Submit every SLURM job at once, chained with --dependency=afterok on upstream jobs, instead of one stage at a time
+    submit_dag: bool = False
+    swm: str = "none"
+    runner: str = "local"
+    # The cores and memory the local runner can use at once (0 for everything the machine has)
+    # Tasks wait for room for their runner config's threads and mem_mb before they start
+    local_cores: int = 0
+    local_mem_mb: int = 0
+    # A directory of conda environment yamls to build before running (with the conda or mamba swm)
+    # Each environment is named after its file, so a flow's `conda: "bwa"` uses the one built from bwa.yaml
+    env_specs: str | Path = ""
+    # Where to build them, shared between projects (defaults to $XDG_DATA_HOME/autobfx/envs)
+    envs_fp: str | Path = ""
+    # Also pack them with conda-pack, and unpack them to this node local directory in each job (e.g. "$TMPDIR")
+    pack_envs: bool = False
+    env_scratch: str = ""
+    samples: dict[str, tuple[Path, ...]] = {}
+    # Regexes for pulling sample names out of fastq file names, see autobfx.lib.discovery for the defaults
+    sample_patterns: list[str] = []
+    flows: dict[str, FlowConfig] = (
+        {}
+    )  # Consider something like 'trimmomatic:param_set_1' as a key that can be parsed to run the same flow with different parameter sets
+
+    def get_log_fp(self) -> Path:
+        log_fp = Path(self.log_fp)
+        if not log_fp.is_absolute():
+            log_fp = self.project_fp / log_fp
+
+        return log_fp
+
+    def get_envs_fp(self) -> Path | None:
+        return Path(self.envs_fp) if self.envs_fp else None
+
+    def provision_envs(self) -> dict[str, EnvRecord]:
+        """Build any environments in `env_specs` that are missing or whose spec changed, see `autobfx.lib.envs.provision`"""
+        if not self.env_specs or self.swm not in ("conda", "mamba"):
+            return {}
+        specs_fp = Path(self.env_specs)
+        if not specs_fp.is_absolute():
+            specs_fp = self.project_fp / specs_fp
+
+        return provision(
+            {fp.stem: fp for fp in sorted(specs_fp.glob("*.yaml"))},
+            self.get_envs_fp(),
+            solver=self.swm,
+            pack=self.pack_envs,
+        )
+
+    def get_runner(self, flow_config: FlowConfig) -> AutobfxRunner:
+        try:
+            swm = swm_map[self.swm]()
+        except KeyError:
+            raise ValueError(
+                f"Software manager {self.swm} type is not supported or is not installed"
+            )
+
+        if self.runner == "local":
+            ResourceScheduler.configure(self.local_cores, self.local_mem_mb)
+
+        options = {
+            "conda_env": flow_config.conda,
+            "docker_img": flow_config.image,
+            "params": flow_config.runner_config,
+        }
+        if self.env_specs and self.swm in ("conda", "mamba"):
+            record = read_registry(self.get_envs_fp()).get(flow_config.conda)
+            if record:
+                options["conda_env"] = str(record.prefix)
+                if record.pack and self.env_scratch:
+                    options["conda_pack"] = str(record.pack)
+                    options["env_scratch"] = self.env_scratch
+
+        try:
+            return runner_map[self.runner](swm, options=options)
+        except KeyError:
+            raise ValueError(
+                f"Runner {self.runner} type is not supported or is not installed"
+            )
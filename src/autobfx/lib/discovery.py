@@ -0,0 +1,86 @@
+import os
+import re
+import threading
+from pathlib import Path
+from autobfx.lib.io import IOReads
+
+
+# Patterns are regexes matched against file names, they need a `sample` group and paired end patterns need a `read` group
+# The first pattern that matches a file name wins
+# e.g. to fold lane suffixes into the sample name for single lane runs: r"^(?P<sample>.+?)_L\d{3}_R(?P<read>[12])_001\.fastq\.gz$"
+PAIRED_END_PATTERNS = [
+    r"^(?P<sample>.+)_R(?P<read>[12])(?:_001)?\.(?:fastq|fq)\.gz$",
+]
+SINGLE_END_PATTERNS = [
+    r"^(?P<sample>.+?)\.(?:fastq|fq)\.gz$",
+]
+
+# Directory -> (directory mtime, samples), kept for the lifetime of the process
+_cache: dict[tuple, tuple[int, dict[str, IOReads]]] = {}
+_lock = threading.Lock()
+
+
+def _scan(fp: Path, paired_end: bool, patterns: list[re.Pattern]) -> dict[str, IOReads]:
+    mates: dict[str, dict[str, Path]] = {}
+    with os.scandir(fp) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            for pattern in patterns:
+                if m := pattern.match(entry.name):
+                    break
+            else:
+                continue
+
+            sample = m.group("sample")
+            read = m.group("read") if paired_end else "1"
+            if read in mates.setdefault(sample, {}):
+                raise ValueError(
+                    f"Duplicate sample names in {fp}: {mates[sample][read].name} and {entry.name} are both {sample} R{read}"
+                )
+            mates[sample][read] = fp / entry.name
+
+    if paired_end:
+        unpaired = [s for s, m in mates.items() if len(m) != 2]
+        if unpaired:
+            raise ValueError(f"Samples missing R1 or R2 files in {fp}: {unpaired}")
+        return {s: IOReads(mates[s]["1"], mates[s]["2"]) for s in sorted(mates)}
+    return {s: IOReads(mates[s]["1"]) for s in sorted(mates)}
+
+
+def discover_samples(
+    fp: Path, paired_end: bool, patterns: list[str] = None
+) -> dict[str, IOReads]:
+    """
+    Find the samples in a directory of fastq files in a single listing, pairing mates by sample name
+    Results are cached per directory and reused until the directory's mtime changes (i.e. files are added, removed or renamed)
+
+    Returns an empty dict if the directory doesn't exist (yet)
+    """
+    fp = Path(fp).resolve()
+    patterns = tuple(
+        patterns
+        if patterns
+        else PAIRED_END_PATTERNS if paired_end else SINGLE_END_PATTERNS
+    )
+    key = (fp, paired_end, patterns)
+    try:
+        mtime = os.stat(fp).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    with _lock:
+        cached = _cache.get(key)
+    if cached and cached[0] == mtime:
+        return dict(cached[1])
+
+    samples = _scan(fp, paired_end, [re.compile(p) for p in patterns])
+    with _lock:
+        _cache[key] = (mtime, samples)
+
+    return dict(samples)
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
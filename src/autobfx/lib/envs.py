@@ -0,0 +1,294 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from pydantic import BaseModel
+
+
+# Set by bash itself rather than by activating anything
+IGNORED_VARS = {"_", "SHLVL", "PWD", "OLDPWD"}
+VAR_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Search paths that only have the entries activation added to them exported, ahead of whatever the job already has
+PATH_VARS = {"PATH", "LD_LIBRARY_PATH", "MANPATH", "PYTHONPATH"}
+# Bumped whenever what's cached changes
+CACHE_VERSION = 2
+
+# Activation commands hash -> {"env": changed variables, "marker": path, "mtime": marker mtime}
+_cache: dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def cache_dir() -> Path:
+    return (
+        Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser()
+        / "autobfx"
+        / "envs"
+    )
+
+
+def _env(script: str) -> dict[str, str] | None:
+    try:
+        out = subprocess.run(
+            ["bash", "-c", script], capture_output=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    env = {}
+    for entry in out.decode(errors="replace").split("\0"):
+        k, sep, v = entry.partition("=")
+        if sep and VAR_NAME.match(k) and k not in IGNORED_VARS:
+            env[k] = v
+    return env
+
+
+def _activate(lines: list[str]) -> dict[str, str | None] | None:
+    """
+    The variables that running `lines` changes (None for ones it unsets)
+    For PATH_VARS only the entries it added are kept, this shell's own entries are no use on another node
+    """
+    before = _env("env -0")
+    after = _env(" && ".join(lines + ["env -0"]))
+    if before is None or after is None:
+        return None
+
+    changed = {k: v for k, v in after.items() if before.get(k) != v}
+    changed.update({k: None for k in before if k not in after})
+    for k in PATH_VARS & changed.keys():
+        if changed[k] is None:
+            continue
+        old = set(before.get(k, "").split(":"))
+        added = [p for p in changed[k].split(":") if p and p not in old]
+        if added:
+            changed[k] = ":".join(added)
+        else:
+            del changed[k]
+    return changed
+
+
+def _mtime(fp: Path) -> int | None:
+    try:
+        return os.stat(fp).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def activated_env(lines: list[str], marker: str) -> dict[str, str | None] | None:
+    """
+    The variables an environment's activation commands set, running them only when the environment has changed
+    - `marker` is a path whose mtime changes when the environment does, formatted with the activated variables
+    (e.g. "{CONDA_PREFIX}/conda-meta")
+
+    Results are cached in memory and on disk (under $XDG_CACHE_HOME/autobfx/envs) and dropped when the marker's mtime changes
+    Returns None if activation fails
+    """
+    key = hashlib.sha256("\n".join([f"v{CACHE_VERSION}", *lines]).encode()).hexdigest()
+    cache_fp = cache_dir() / f"{key}.json"
+    with _lock:
+        entry = _cache.get(key)
+    if entry is None:
+        try:
+            entry = json.loads(cache_fp.read_text())
+        except (OSError, ValueError):
+            entry = None
+    if (
+        entry
+        and entry["mtime"] is not None
+        and entry["mtime"] == _mtime(entry["marker"])
+    ):
+        with _lock:
+            _cache[key] = entry
+        return entry["env"]
+
+    env = _activate(lines)
+    if env is None:
+        return None
+    try:
+        marker_fp = marker.format_map({k: v for k, v in env.items() if v is not None})
+    except (KeyError, ValueError):
+        marker_fp = None
+    entry = {"env": env, "marker": marker_fp, "mtime": _mtime(marker_fp)}
+    with _lock:
+        _cache[key] = entry
+    if entry["mtime"] is not None:
+        try:
+            cache_fp.parent.mkdir(parents=True, exist_ok=True)
+            cache_fp.write_text(json.dumps(entry))
+        except OSError:
+            pass
+
+    return env
+
+
+def export_lines(env: dict[str, str | None]) -> list[str]:
+    """Shell commands that apply the variables from `activated_env`"""
+    lines = []
+    unset = sorted(k for k, v in env.items() if v is None)
+    if unset:
+        lines.append(f"unset {' '.join(unset)}")
+    exports = [
+        # Added search path entries go ahead of the ones the job already has
+        (
+            f'{k}={shlex.quote(v)}"${{{k}:+:${k}}}"'
+            if k in PATH_VARS
+            else f"{k}={shlex.quote(v)}"
+        )
+        for k, v in sorted(env.items())
+        if v is not None
+    ]
+    if exports:
+        lines.append(f"export {' '.join(exports)}")
+    return lines
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+# Written into an environment's prefix once it's been built
+BUILT_MARKER = ".autobfx-built"
+
+
+class EnvRecord(BaseModel):
+    name: str
+    # Hash of the spec the environment was built from
+    hash: str
+    prefix: Path
+    # conda-pack tarball of the environment, if one was made
+    pack: Path | None = None
+
+
+def envs_dir() -> Path:
+    return (
+        Path(os.environ.get("XDG_DATA_HOME", "~/.local/share")).expanduser()
+        / "autobfx"
+        / "envs"
+    )
+
+
+def spec_hash(spec_fp: Path) -> str:
+    return hashlib.sha256(Path(spec_fp).read_bytes()).hexdigest()
+
+
+def read_registry(root: Path = None) -> dict[str, EnvRecord]:
+    """The environments built by `provision` under `root`, keyed by name"""
+    root = Path(root) if root else envs_dir()
+    try:
+        records = json.loads((root / "registry.json").read_text())
+    except (OSError, ValueError):
+        return {}
+    return {name: EnvRecord(**r) for name, r in records.items()}
+
+
+@contextmanager
+def _registry_lock(root: Path):
+    # Only one process builds environments under the same root at a time
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / "registry.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def provision(
+    specs: dict[str, Path],
+    root: Path = None,
+    solver: str = "conda",
+    pack: bool = False,
+    packer: str = "conda-pack",
+) -> dict[str, EnvRecord]:
+    """
+    Make sure there's an environment built from each spec (name -> environment yaml), building any that are missing at once
+    - Environments live under `root` (`envs_dir()` by default) at a prefix named after the spec's hash,
+      so changing a spec builds a new environment and an unchanged one is never rebuilt (unless its build didn't finish)
+    - With `pack`, each environment is also packed into a tarball with conda-pack that jobs can unpack to node local scratch
+
+    Build output goes to `root/logs/<name>.log`
+    Raises RuntimeError naming any environments that failed to build
+    """
+    from autobfx.lib.process import ProcessEngine
+
+    root = Path(root) if root else envs_dir()
+    with _registry_lock(root):
+        registry = read_registry(root)
+        engine = ProcessEngine.shared()
+        builds = {}
+        for name, spec_fp in specs.items():
+            h = spec_hash(spec_fp)
+            record = registry.get(name)
+            if (
+                record
+                and record.hash == h
+                and record.prefix.exists()
+                and (not pack or (record.pack and record.pack.exists()))
+            ):
+                continue
+
+            prefix = root / f"{name}-{h[:16]}"
+            cmds = []
+            # conda makes the prefix long before it's done, so anything left by a failed build is thrown away
+            built = (prefix / BUILT_MARKER).exists() or (
+                record and record.hash == h and record.prefix.exists()
+            )
+            if not built:
+                cmds += [
+                    f"rm -rf {prefix}",
+                    f"{solver} env create -q -y -f {spec_fp} -p {prefix}",
+                    f"touch {prefix / BUILT_MARKER}",
+                ]
+            record = EnvRecord(
+                name=name,
+                hash=h,
+                prefix=prefix,
+                pack=prefix.with_suffix(".tar.gz") if pack else None,
+            )
+            if pack and not record.pack.exists():
+                cmds.append(f"{packer} -q -p {prefix} -o {record.pack}")
+            (root / "logs").mkdir(exist_ok=True)
+            builds[name] = (
+                record,
+                engine.submit(
+                    " && ".join(cmds) if cmds else "true", root / "logs" / f"{name}.log"
+                ),
+            )
+
+        failed = []
+        for name, (record, future) in builds.items():
+            if future.result().ok:
+                registry[name] = record
+            else:
+                failed.append(name)
+
+        (root / "registry.json").write_text(
+            json.dumps(
+                {name: r.model_dump(mode="json") for name, r in registry.items()}
+            )
+        )
+
+    if failed:
+        raise RuntimeError(
+            f"Failed to build environments {failed}, see the logs in {root / 'logs'}"
+        )
+    return registry
+
+
+def unpack_lines(pack: Path, scratch: str) -> list[str]:
+    """
+    Shell commands that unpack an environment's tarball to `scratch` (once per node, whoever gets there first) and activate it
+    `scratch` is left for the shell to expand so it can be something like $TMPDIR
+    """
+    dest = f"{scratch}/autobfx-envs/{Path(pack).name.removesuffix('.tar.gz')}"
+    unpack = f"[ -e {dest}/.unpacked ] || (tar -xzf {pack} -C {dest} && {dest}/bin/conda-unpack && touch {dest}/.unpacked)"
+    return [
+        f"mkdir -p {dest}",
+        f"flock {dest}.lock -c {shlex.quote(unpack)}",
+        f"source {dest}/bin/activate",
+    ]
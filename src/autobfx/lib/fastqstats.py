@@ -0,0 +1,123 @@
+import gzip
+import json
+import numpy as np
+from pathlib import Path
+from typing import BinaryIO
+
+
+# Decompressed bytes parsed at a time
+BLOCK_SIZE = 16 * 1024 * 1024
+BASES = "ACGTN"
+# A/C/G/T (either case) to 0-3, anything else to 4 (N)
+_CODES = np.full(256, 4, dtype=np.uint8)
+for i, bases in enumerate([b"Aa", b"Cc", b"Gg", b"Tt"]):
+    _CODES[list(bases)] = i
+
+
+def _grow(a: np.ndarray, n: int) -> np.ndarray:
+    if len(a) >= n:
+        return a
+    return np.concatenate([a, np.zeros((n - len(a), *a.shape[1:]), dtype=a.dtype)])
+
+
+class FastqStats:
+    """
+    Running read counts, length histogram, per position base composition and per position quality sums of a fastq,
+    added to a block of records at a time
+    """
+
+    def __init__(self):
+        self.reads = 0
+        self.lengths = np.zeros(0, dtype=np.int64)
+        self.composition = np.zeros((0, len(BASES)), dtype=np.int64)
+        self.quality = np.zeros(0, dtype=np.int64)
+
+    def add_block(self, buf: np.ndarray) -> int:
+        """Add the complete records at the start of `buf` (bytes as uint8), returning how many bytes they took up"""
+        newlines = np.flatnonzero(buf == ord("\n"))
+        n = len(newlines) // 4
+        if not n:
+            return 0
+        lines = newlines[: 4 * n].reshape(n, 4)
+        header_starts = np.concatenate(([0], lines[:-1, 3] + 1))
+        if (buf[header_starts] != ord("@")).any() or (
+            buf[lines[:, 1] + 1] != ord("+")
+        ).any():
+            raise ValueError("Not a fastq, or records span more than four lines")
+
+        seq_starts, qual_starts = lines[:, 0] + 1, lines[:, 2] + 1
+        # Lines can end in \r\n
+        seq_ends = lines[:, 1] - (buf[lines[:, 1] - 1] == ord("\r"))
+        qual_ends = lines[:, 3] - (buf[lines[:, 3] - 1] == ord("\r"))
+        lens = seq_ends - seq_starts
+        if (qual_ends - qual_starts != lens).any():
+            raise ValueError("Sequence and quality lengths differ")
+
+        # Every base's position in its read, and where it and its quality are in the block
+        pos = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+        bases = _CODES[buf[np.repeat(seq_starts, lens) + pos]]
+        quals = buf[np.repeat(qual_starts, lens) + pos].astype(np.int64) - 33
+
+        max_len = int(lens.max())
+        self.reads += n
+        self.lengths = _grow(self.lengths, max_len + 1)
+        self.lengths[: max_len + 1] += np.bincount(lens, minlength=max_len + 1)
+        self.composition = _grow(self.composition, max_len)
+        self.composition[:max_len] += np.bincount(
+            pos * len(BASES) + bases, minlength=max_len * len(BASES)
+        ).reshape(max_len, len(BASES))
+        self.quality = _grow(self.quality, max_len)
+        self.quality[:max_len] += np.bincount(
+            pos, weights=quals, minlength=max_len
+        ).astype(np.int64)
+
+        return int(lines[-1, 3]) + 1
+
+    def to_dict(self) -> dict:
+        covered = self.composition.sum(axis=1)
+        totals = self.composition.sum(axis=0)
+        bases = int(totals.sum())
+        return {
+            "reads": self.reads,
+            "bases": bases,
+            "gc": float(totals[1:3].sum() / bases) if bases else None,
+            # [length, reads] for each length there are reads of
+            "lengths": [
+                [int(l), int(self.lengths[l])] for l in np.flatnonzero(self.lengths)
+            ],
+            "mean_quality": np.round(self.quality / np.maximum(covered, 1), 2).tolist(),
+            "composition": {
+                b: np.round(self.composition[:, i] / np.maximum(covered, 1), 4).tolist()
+                for i, b in enumerate(BASES)
+            },
+        }
+
+
+def _open(fp: Path) -> BinaryIO:
+    return gzip.open(fp) if str(fp).endswith(".gz") else open(fp, "rb")
+
+
+def fastq_stats(fp: Path) -> dict:
+    """Stats for a (gzipped) fastq, parsed `BLOCK_SIZE` bytes at a time"""
+    stats = FastqStats()
+    carry = b""
+    with _open(fp) as f:
+        while block := f.read(BLOCK_SIZE):
+            buf = carry + block
+            carry = buf[stats.add_block(np.frombuffer(buf, dtype=np.uint8)) :]
+    if carry.strip():
+        # A last record without a trailing newline
+        buf = carry.rstrip(b"\n") + b"\n"
+        if stats.add_block(np.frombuffer(buf, dtype=np.uint8)) != len(buf):
+            raise ValueError(f"{fp} is truncated")
+
+    return stats.to_dict()
+
+
+def sample_stats(read_fps: list[Path], out_fp: Path) -> dict:
+    """Stats for each of a sample's fastqs (R1 and R2), written to `out_fp` as JSON keyed by file name"""
+    stats = {Path(fp).name: fastq_stats(fp) for fp in read_fps}
+    Path(out_fp).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_fp, "w") as f:
+        json.dump(stats, f)
+    return {name: s["reads"] for name, s in stats.items()}
@@ -0,0 +1,101 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from autobfx.lib.store import CompletionStore
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+FINGERPRINT_METHODS = ["stat", "content"]
+BLOCK_SIZE = 4 * 1024 * 1024
+MAX_WORKERS = 8
+
+
+def _stat(fp: str) -> list | None:
+    try:
+        st = os.stat(fp)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns, None]
+
+
+def hash_file(fp: str) -> str:
+    """Hash a file's content, with xxhash if it's installed and blake2b otherwise"""
+    if xxhash:
+        h, prefix = xxhash.xxh3_128(), "xxh3"
+    else:
+        h, prefix = hashlib.blake2b(digest_size=16), "blake2b"
+    with open(fp, "rb") as f:
+        while block := f.read(BLOCK_SIZE):
+            h.update(block)
+    return f"{prefix}:{h.hexdigest()}"
+
+
+def fingerprint(
+    fps: list[Path | str], method: str = "stat", store: CompletionStore = None
+) -> dict[str, list | None]:
+    """
+    Fingerprint files as [size, mtime_ns, digest] (or None if the file doesn't exist)
+    - "stat" only stats the files, digest is None
+    - "content" also hashes the files' content in a thread pool
+      If a store is given, digests are cached in it by size and mtime so unchanged files are never rehashed
+    """
+    if method not in FINGERPRINT_METHODS:
+        raise ValueError(
+            f"Fingerprint method {method} is not one of {FINGERPRINT_METHODS}"
+        )
+
+    fps = list(dict.fromkeys(str(fp) for fp in fps))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        fingerprints = dict(zip(fps, pool.map(_stat, fps)))
+        if method == "stat":
+            return fingerprints
+
+        cached = store.digests(fps) if store else {}
+        to_hash = []
+        for fp, fingerprint in fingerprints.items():
+            if fingerprint is None:
+                continue
+            if fp in cached and cached[fp][:2] == fingerprint[:2]:
+                fingerprint[2] = cached[fp][2]
+            else:
+                to_hash.append(fp)
+
+        for fp, digest in zip(to_hash, pool.map(hash_file, to_hash)):
+            fingerprints[fp][2] = digest
+
+    if store and to_hash:
+        store.set_digests({fp: fingerprints[fp] for fp in to_hash})
+
+    return fingerprints
+
+
+def changed(recorded: dict[str, list], current: dict[str, list | None]) -> list[str]:
+    """
+    Which of the current fingerprints differ from the recorded ones
+    Content digests are compared when both sides have one (so touching a file doesn't count as a change), size and mtime otherwise
+    Records without any fingerprints (e.g. imported from .done files) are assumed to be unchanged
+    """
+    if not recorded:
+        return []
+
+    diffs = []
+    for fp, cur in current.items():
+        rec = recorded.get(fp)
+        if rec == []:
+            # Only ever existed on node local scratch (see AutobfxTaskChain), so it only changes by showing up
+            if cur is not None:
+                diffs.append(fp)
+        elif rec is None or cur is None:
+            diffs.append(fp)
+        elif len(rec) > 2 and rec[2] and cur[2]:
+            if rec[0] != cur[0] or rec[2] != cur[2]:
+                diffs.append(fp)
+        elif rec[:2] != cur[:2]:
+            diffs.append(fp)
+
+    return diffs
@@ -1,177 +1,662 @@
-import networkx as nx
-from autobfx.lib.config import Config
-from autobfx.lib.io import IOObject, IOReads
-from autobfx.lib.iterator import AutobfxIterator
-from autobfx.lib.task import AutobfxTask
-from pathlib import Path
-from prefect import flow
-
-
-class AutobfxFlow:
-    def __init__(self, name: str, dag: nx.DiGraph):
-        self.name = name
-        self.dag = dag
-
-        # Keeping this in the constructor so that it's easy to run pre/post processing around it down the line
-        @flow
-        def _flow():
-            submissions = [
-                t.submit(dependencies=dag.predecessors(t))
-                for t in nx.topological_sort(dag)
-            ]
-            return [s.result() for s in submissions]
-
-        self.flow = _flow
-
-    def __str__(self):
-        return (
-            f"AutobfxFlow({self.name}): {[(n.name, n.id_dict) for n in self.dag.nodes]}"
-        )
-
-    @classmethod
-    def from_tasks(cls, name: str, tasks: list[AutobfxTask]) -> "AutobfxFlow":
-        """
-        Create an unconnected flow from a list of tasks
-        """
-        dag = nx.DiGraph()
-        for task in tasks:
-            dag.add_node(task)
-
-        return cls(name, dag)
-
-    @classmethod
-    def empty_flow(cls, name: str) -> "AutobfxFlow":
-        return cls(name, nx.DiGraph())
-
-    @classmethod
-    def compose_flows(cls, name: str, flows: list["AutobfxFlow"]) -> "AutobfxFlow":
-        dag = nx.compose_all([flow.dag for flow in flows])
-        return cls(name, dag)
-
-    @staticmethod
-    def gather_files(
-        fp: Path, ext: str, iterator: AutobfxIterator = None
-    ) -> dict[str, IOObject]:
-        if iterator:
-            return {
-                v: IOObject(fp / f"{v}.{ext}") for d in iterator for k, v in d.items()
-            }
-        return {x.stem: x.resolve() for x in fp.glob(f"*.{ext}")}
-
-    @staticmethod
-    def gather_samples(
-        fp: Path,
-        paired_end: bool,
-        config_samples: dict[str, tuple[Path, ...]] = None,
-        sample_iterator: AutobfxIterator = None,
-    ) -> dict[str, IOReads]:
-        """
-        Gather samples from a directory of fastq files
-        - If a value for `sample_iterator` is provided it will use that and `fp` to construct IOReads and return it
-        - If a value for `config_samples` is provided it will convert that to IOReads and return it
-        - After that it will look for fastq.gz files in `fp` and assume that the sample name is the part of the filename before '_R1' or '.fastq.gz'
-
-        The intended use cases are as follows:
-        - If this is a component of another flow and isn't the start, the `sample_iterator` arg will be passed so that we aren't trying to gather samples from a directory that doesn't exist yet
-        - If you're trying to run a subset of samples, you can define them in the config and pass them in as `config_samples`
-        - Otherwise, this will make it easy to gather samples from a directory of fastq files
-        """
-        if sample_iterator:
-            if paired_end:
-                return {
-                    d["sample"]: IOReads(
-                        fp / f"{d['sample']}_R1.fastq.gz",
-                        fp / f"{d['sample']}_R2.fastq.gz",
-                    )
-                    for d in sample_iterator
-                }
-            else:
-                return {
-                    d["sample"]: IOReads(fp / f"{d['sample']}.fastq.gz")
-                    for d in sample_iterator
-                }
-        if config_samples:
-            return {k: IOReads(*v) for k, v in config_samples.items()}
-        if paired_end:
-            r1 = [x.resolve() for x in fp.glob("*.fastq.gz") if "_R1" in x.name]
-            r2 = [x.resolve() for x in fp.glob("*.fastq.gz") if "_R2" in x.name]
-            sample_names = [x.name.split("_R1")[0] for x in r1]
-            sample_names_2 = [x.name.split("_R2")[0] for x in r2]
-            if sample_names != sample_names_2:
-                print(sample_names)
-                print(sample_names_2)
-                raise ValueError(f"Sample names do not match in {fp}")
-            if len(sample_names) != len(set(sample_names)):
-                print(sample_names)
-                raise ValueError(
-                    f"Duplicate sample names in {fp} (Only what's in front of '_R1'/'_R2' is considered)"
-                )
-
-            if len(r1) != len(r2):
-                print(r1)
-                print(r2)
-                raise ValueError(f"Number of R1 and R2 files do not match in {fp}")
-
-            return {x: IOReads(y, z) for x, y, z in zip(sample_names, r1, r2)}
-        else:
-            r1 = list(fp.glob("*.fastq.gz"))
-            sample_names = [x.name.split(".fastq")[0] for x in r1]
-            if len(sample_names) != len(set(sample_names)):
-                print(sample_names)
-                raise ValueError(f"Duplicate sample names in {fp}")
-
-            return {x: IOReads(y) for x, y in zip(sample_names, r1)}
-
-    def connect_one_to_one(
-        self, iterator: AutobfxIterator, task_from: str, task_to: str
-    ):
-        for d in iterator:
-            self.dag.add_edge(
-                next(
-                    n
-                    for n in self.dag.nodes
-                    if n.name == task_from
-                    and all(n.id_dict[k] == v for k, v in d.items())
-                ),
-                next(
-                    n
-                    for n in self.dag.nodes
-                    if n.name == task_to
-                    and all(n.id_dict[k] == v for k, v in d.items())
-                ),
-            )
-
-    def connect_one_to_many(
-        self, iterator: AutobfxIterator, task_from: str, task_to: str
-    ):
-        for d in iterator:
-            for n in self.dag.nodes:
-                if n.name == task_to and all(n.id_dict[k] == v for k, v in d.items()):
-                    self.dag.add_edge(
-                        next(
-                            n
-                            for n in self.dag.nodes
-                            if n.name == task_from
-                            and all(n.id_dict[k] == v for k, v in d.items())
-                        ),
-                        n,
-                    )
-
-    def connect_many_to_one(
-        self, iterator: AutobfxIterator, task_from: str, task_to: str
-    ):
-        for d in iterator:
-            for n in self.dag.nodes:
-                if n.name == task_from and all(n.id_dict[k] == v for k, v in d.items()):
-                    self.dag.add_edge(
-                        n,
-                        next(
-                            n
-                            for n in self.dag.nodes
-                            if n.name == task_to
-                            and all(n.id_dict[k] == v for k, v in d.items())
-                        ),
-                    )
-
-    def run(self):
-        return self.flow()
+import networkx as nx
+import statistics
+import time
+from concurrent.futures import Future, as_completed
+from autobfx.lib.config import Config
+from autobfx.lib.discovery import discover_samples
+from autobfx.lib.fingerprint import fingerprint
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.iterator import AutobfxIterator
+from autobfx.lib.runner import CollectedCall
+from autobfx.lib.store import CompletionStore
+from autobfx.lib.task import (
+    AutobfxTask,
+    AutobfxTaskArray,
+    AutobfxTaskBundle,
+    AutobfxTaskChain,
+)
+from pathlib import Path
+from prefect import flow
+
+
+RERUN_STRATEGIES = ["lazy", "force", "strict"]
+
+
+class AutobfxFlow:
+    def __init__(self, name: str, dag: nx.DiGraph):
+        self.name = name
+        self.dag = dag
+        # Secondary index from task name to the tasks with that name keyed by their sorted id items
+        # This is what lets the connect methods join on ids instead of scanning every node in the DAG
+        self.index: dict[str, dict[tuple[tuple[str, str], ...], AutobfxTask]] = {}
+        # Lazily built groupings of the index by a subset of id keys, dropped whenever a task is added
+        self._groups: dict[
+            tuple[str, tuple[str, ...]], dict[tuple[str, ...], list[AutobfxTask]]
+        ] = {}
+        for t in dag.nodes:
+            self._index_task(t)
+
+        # Keeping this in the constructor so that it's easy to run pre/post processing around it down the line
+        @flow
+        def _flow(
+            rerun_strategy: str = "lazy",
+            fingerprint_method: str = "stat",
+            submit_dag: bool = False,
+        ):
+            run, recheck = self.plan(rerun_strategy, fingerprint_method)
+            for t in dag.nodes:
+                t.submission = None
+            tasks = [t for t in nx.topological_sort(dag) if t in run or t in recheck]
+            # Runners pass these on to the local scheduler and SLURM
+            priorities = self.priorities(tasks)
+            for t, priority in priorities.items():
+                t.runner.options["priority"] = priority
+            chains = self._chains(tasks, run, priorities)
+            batches = self._batches([t for t in tasks if t not in chains])
+            units = self._submission_order(tasks, {**batches, **chains}, priorities)
+            if submit_dag:
+                return self._submit_dag(units, fingerprint_method)
+            submissions = []
+            for unit in units:
+                if isinstance(unit, AutobfxTaskArray):
+                    unit.submit(
+                        dependencies={
+                            p for t in unit.tasks for p in dag.predecessors(t)
+                        },
+                        recheck=recheck,
+                        fingerprint_method=fingerprint_method,
+                    )
+                    submissions += [t.submission for t in unit.tasks]
+                elif isinstance(unit, AutobfxTaskChain):
+                    unit.submit(
+                        dependencies={
+                            p
+                            for t in unit.tasks
+                            for p in dag.predecessors(t)
+                            if p not in unit.tasks
+                        },
+                        fingerprint_method=fingerprint_method,
+                    )
+                    submissions += [t.submission for t in unit.tasks]
+                else:
+                    submissions.append(
+                        unit.submit(
+                            dependencies=dag.predecessors(unit),
+                            check=False,
+                            recheck=unit in recheck,
+                            fingerprint_method=fingerprint_method,
+                        )
+                    )
+            return [s.result() for s in submissions]
+
+        self.flow = _flow
+
+    def __str__(self):
+        return (
+            f"AutobfxFlow({self.name}): {[(n.name, n.id_dict) for n in self.dag.nodes]}"
+        )
+
+    @classmethod
+    def from_tasks(cls, name: str, tasks: list[AutobfxTask]) -> "AutobfxFlow":
+        """
+        Create an unconnected flow from a list of tasks
+        """
+        flow = cls.empty_flow(name)
+        for task in tasks:
+            flow.add_task(task)
+
+        return flow
+
+    @classmethod
+    def empty_flow(cls, name: str) -> "AutobfxFlow":
+        return cls(name, nx.DiGraph())
+
+    @classmethod
+    def compose_flows(cls, name: str, flows: list["AutobfxFlow"]) -> "AutobfxFlow":
+        dag = nx.compose_all([flow.dag for flow in flows])
+        return cls(name, dag)
+
+    @staticmethod
+    def gather_files(
+        fp: Path, ext: str, iterator: AutobfxIterator = None
+    ) -> dict[str, IOObject]:
+        if iterator is not None:
+            return {
+                v: IOObject(fp / f"{v}.{ext}") for d in iterator for k, v in d.items()
+            }
+        return {x.stem: x.resolve() for x in fp.glob(f"*.{ext}")}
+
+    @staticmethod
+    def gather_samples(
+        fp: Path,
+        paired_end: bool,
+        config_samples: dict[str, tuple[Path, ...]] = None,
+        sample_iterator: AutobfxIterator = None,
+        patterns: list[str] = None,
+    ) -> dict[str, IOReads]:
+        """
+        Gather samples from a directory of fastq files
+        - If a value for `sample_iterator` is provided it will use that and `fp` to construct IOReads and return it
+        - If a value for `config_samples` is provided it will convert that to IOReads and return it
+        - After that it will list the fastq.gz files in `fp` and take the sample name from the first of `patterns` that matches
+          (by default the part of the filename before '_R1'/'_R2' or '.fastq.gz', see `autobfx.lib.discovery`)
+
+        The intended use cases are as follows:
+        - If this is a component of another flow and isn't the start, the `sample_iterator` arg will be passed so that we aren't trying to gather samples from a directory that doesn't exist yet
+        - If you're trying to run a subset of samples, you can define them in the config and pass them in as `config_samples`
+        - Otherwise, this will make it easy to gather samples from a directory of fastq files
+        """
+        if sample_iterator is not None:
+            if paired_end:
+                return {
+                    d["sample"]: IOReads(
+                        fp / f"{d['sample']}_R1.fastq.gz",
+                        fp / f"{d['sample']}_R2.fastq.gz",
+                    )
+                    for d in sample_iterator
+                }
+            else:
+                return {
+                    d["sample"]: IOReads(fp / f"{d['sample']}.fastq.gz")
+                    for d in sample_iterator
+                }
+        if config_samples:
+            return {k: IOReads(*v) for k, v in config_samples.items()}
+
+        return discover_samples(fp, paired_end, patterns)
+
+    def _index_task(self, task: AutobfxTask):
+        self.index.setdefault(task.name, {})[tuple(sorted(task.id_dict.items()))] = task
+        for key in [k for k in self._groups if k[0] == task.name]:
+            del self._groups[key]
+
+    def add_task(self, task: AutobfxTask):
+        """Add a task to the DAG, keeping the index in sync"""
+        self.dag.add_node(task)
+        self._index_task(task)
+
+    def get_task(self, name: str, ids: dict[str, str]) -> AutobfxTask:
+        """Get the task with exactly these ids"""
+        return self.index[name][tuple(sorted(ids.items()))]
+
+    def _group_by(
+        self, name: str, keys: tuple[str, ...]
+    ) -> dict[tuple[str, ...], list[AutobfxTask]]:
+        try:
+            return self._groups[(name, keys)]
+        except KeyError:
+            groups = {}
+            for t in self.index.get(name, {}).values():
+                try:
+                    groups.setdefault(tuple(t.id_dict[k] for k in keys), []).append(t)
+                except KeyError:
+                    continue
+            self._groups[(name, keys)] = groups
+            return groups
+
+    def lookup(self, name: str, ids: dict[str, str]) -> list[AutobfxTask]:
+        """
+        Get all the tasks named `name` whose ids match every item in `ids`
+        e.g. lookup("align_to_host", {"sample": "s1"}) gives the task for every host for s1
+        """
+        return self._group_by(name, tuple(ids.keys())).get(tuple(ids.values()), [])
+
+    def _lookup_one(self, name: str, ids: dict[str, str]) -> AutobfxTask:
+        try:
+            return self.lookup(name, ids)[0]
+        except IndexError:
+            raise KeyError(f"No {name} task found matching {ids} in {self.name}")
+
+    def connect(self, task_from: str, task_to: str, on: list[str] = None) -> str:
+        """
+        Connect every `task_from` task to the `task_to` tasks that share its values for the `on` id keys
+        - If `on` isn't given, the id keys the two tasks have in common are used
+        - Producers and consumers are each grouped by their `on` values once, so wiring is linear in the number of tasks
+        - Groups without a match on the other side are left unconnected
+
+        Returns the cardinality inferred from the groups: "one_to_one", "one_to_many" or "many_to_one"
+        e.g. connect("build_host_index", "align_to_host") joins on "host" and gives "one_to_many"
+        """
+        if on is None:
+            try:
+                from_keys = next(iter(self.index[task_from].values())).id_dict.keys()
+                to_keys = next(iter(self.index[task_to].values())).id_dict.keys()
+            except (KeyError, StopIteration):
+                raise KeyError(
+                    f"Can't infer join keys for {task_from} -> {task_to} in {self.name}, one of them has no tasks"
+                )
+            on = [k for k in from_keys if k in to_keys]
+        keys = tuple(on)
+
+        from_groups = self._group_by(task_from, keys)
+        to_groups = self._group_by(task_to, keys)
+        matched = [(g, to_groups[k]) for k, g in from_groups.items() if k in to_groups]
+
+        many_from = any(len(g_from) > 1 for g_from, _ in matched)
+        many_to = any(len(g_to) > 1 for _, g_to in matched)
+        if many_from and many_to:
+            raise ValueError(
+                f"Joining {task_from} -> {task_to} on {list(keys)} is many-to-many, join on more keys"
+            )
+
+        self.dag.add_edges_from(
+            (u, v) for g_from, g_to in matched for u in g_from for v in g_to
+        )
+
+        if many_from:
+            return "many_to_one"
+        if many_to:
+            return "one_to_many"
+        return "one_to_one"
+
+    def connect_one_to_one(
+        self, iterator: AutobfxIterator, task_from: str, task_to: str
+    ):
+        for d in iterator:
+            self.dag.add_edge(
+                self._lookup_one(task_from, d), self._lookup_one(task_to, d)
+            )
+
+    def connect_one_to_many(
+        self, iterator: AutobfxIterator, task_from: str, task_to: str
+    ):
+        for d in iterator:
+            for n in self.lookup(task_to, d):
+                self.dag.add_edge(self._lookup_one(task_from, d), n)
+
+    def connect_many_to_one(
+        self, iterator: AutobfxIterator, task_from: str, task_to: str
+    ):
+        for d in iterator:
+            for n in self.lookup(task_from, d):
+                self.dag.add_edge(n, self._lookup_one(task_to, d))
+
+    def completed(self) -> set[str]:
+        """All the task outputs in the flow that are recorded as complete, with one batched query per project"""
+        outputs: dict[Path, list[Path]] = {}
+        for t in self.dag.nodes:
+            if not t.dryrun:
+                outputs.setdefault(t.project_fp, []).extend(o.fp for o in t.outputs)
+
+        return {
+            fp
+            for project_fp, fps in outputs.items()
+            for fp in CompletionStore.for_project(project_fp).completed(fps)
+        }
+
+    def plan(
+        self, rerun_strategy: str = "lazy", fingerprint_method: str = "stat"
+    ) -> tuple[set[AutobfxTask], set[AutobfxTask]]:
+        """
+        Decide which tasks need to run, returning the tasks to run and the tasks to recheck once their upstream tasks finish
+        - "force": Everything runs
+        - "lazy": Tasks run if their outputs are incomplete or their inputs changed since they were completed
+          Tasks downstream of those are rechecked after their inputs are regenerated and only run if the inputs actually changed
+        - "strict": Like lazy, but everything downstream of a task that runs is rerun as well
+        """
+        if rerun_strategy not in RERUN_STRATEGIES:
+            raise ValueError(
+                f"Rerun strategy {rerun_strategy} is not one of {RERUN_STRATEGIES}"
+            )
+
+        tasks = list(nx.topological_sort(self.dag))
+        if rerun_strategy == "force":
+            return set(tasks), set()
+
+        # One query and one round of fingerprinting per project for the whole flow
+        records: dict[str, dict] = {}
+        current: dict[str, list | None] = {}
+        by_project: dict[Path, list[AutobfxTask]] = {}
+        for t in tasks:
+            if not t.dryrun:
+                by_project.setdefault(t.project_fp, []).append(t)
+        for project_fp, project_tasks in by_project.items():
+            store = CompletionStore.for_project(project_fp)
+            records.update(store.get(o.fp for t in project_tasks for o in t.outputs))
+            # Outputs made before there was a store might still have .done markers
+            unrecorded = [
+                (t.name, t.id_dict, o.fp)
+                for t in project_tasks
+                for o in t.outputs
+                if str(o.fp) not in records
+            ]
+            if unrecorded and store.import_done_files(unrecorded):
+                records.update(store.get(fp for _, _, fp in unrecorded))
+            done = [t for t in project_tasks if t._done(records)]
+            current.update(
+                fingerprint(
+                    [p for t in done for p in t.input_paths()],
+                    fingerprint_method,
+                    store,
+                )
+            )
+
+        run, recheck = set(), set()
+        for t in tasks:
+            if t.dryrun or not t._done(records):
+                run.add(t)
+            elif t.changed_inputs(records=records, current=current):
+                print(f"Inputs changed for {t.name}: {t.ids}, rerunning")
+                run.add(t)
+            elif any(p in run for p in self.dag.predecessors(t)):
+                (run if rerun_strategy == "strict" else recheck).add(t)
+            elif any(p in recheck for p in self.dag.predecessors(t)):
+                recheck.add(t)
+
+        return run, recheck
+
+    @staticmethod
+    def _runtime_estimates(tasks: list[AutobfxTask]) -> dict[tuple[Path, str], float]:
+        """
+        Estimated runtime in minutes of each kind of task (keyed by project and task name)
+        from the median of its past runs, or its runner config's `runtime_min` if it hasn't run before
+        """
+        estimates = {}
+        for t in tasks:
+            key = (t.project_fp, t.name)
+            if key in estimates:
+                continue
+            runtimes = [] if t.dryrun else t.store.runtimes(t.name)
+            params = t.runner.options.get("params")
+            if runtimes:
+                estimates[key] = statistics.median(runtimes) / 60
+            else:
+                estimates[key] = params.runtime_min if params else 1
+        return estimates
+
+    @classmethod
+    def _bundle_size(cls, t: AutobfxTask) -> int:
+        """How many of `t`'s siblings to bundle together so each bundle holds about `bundle_target_min` minutes of work"""
+        params = t.runner.options["params"]
+        estimate_min = cls._runtime_estimates([t])[(t.project_fp, t.name)]
+        size = params.parameters.get("bundle_target_min", 30) / max(
+            estimate_min, 1 / 60
+        )
+        return max(1, min(int(size), params.parameters.get("bundle_max", 100)))
+
+    def priorities(self, tasks: list[AutobfxTask]) -> dict[AutobfxTask, float]:
+        """
+        Critical path priority of each of `tasks`: the estimated runtime of the longest chain of tasks from it to the end of the flow,
+        as a fraction of the longest chain overall
+        This puts the heads of long chains (e.g. build_host_index -> align_to_host -> sort_sam) ahead of short branches (e.g. fastqc)
+        """
+        estimates = self._runtime_estimates(tasks)
+        dag = self.dag.subgraph(tasks)
+        remaining: dict[AutobfxTask, float] = {}
+        for t in reversed(list(nx.topological_sort(dag))):
+            remaining[t] = estimates[(t.project_fp, t.name)] + max(
+                (remaining[s] for s in dag.successors(t)), default=0
+            )
+
+        longest = max(remaining.values(), default=0)
+        return {t: r / longest if longest else 0.0 for t, r in remaining.items()}
+
+    @classmethod
+    def _batches(cls, tasks: list[AutobfxTask]) -> dict[AutobfxTask, AutobfxTaskArray]:
+        """
+        Group sibling tasks (same name and runner config) to submit to SLURM together, if their runner supports it
+        - `array` in the runner parameters submits all of them as one array job
+        - `bundle` packs them into allocations of that many tasks, run `bundle_workers` at a time (default all at once)
+          "auto" sizes the bundles from past runtimes, see `_bundle_size`
+        """
+        groups: dict[tuple[str, str], list[AutobfxTask]] = {}
+        for t in tasks:
+            params = t.runner.options.get("params")
+            if (
+                hasattr(t.runner, "submit_array")
+                and params is not None
+                and (params.parameters.get("array") or params.parameters.get("bundle"))
+            ):
+                groups.setdefault((t.name, params.model_dump_json()), []).append(t)
+
+        batches = {}
+        for members in groups.values():
+            size = members[0].runner.options["params"].parameters.get("bundle")
+            if size:
+                size = cls._bundle_size(members[0]) if size == "auto" else int(size)
+                chunks = [members[i : i + size] for i in range(0, len(members), size)]
+            else:
+                chunks = [members]
+
+            for chunk in chunks:
+                if len(chunk) > 1:
+                    batch = (AutobfxTaskBundle if size else AutobfxTaskArray)(chunk)
+                    batches.update((t, batch) for t in chunk)
+        return batches
+
+    def _chains(
+        self,
+        tasks: list[AutobfxTask],
+        run: set[AutobfxTask],
+        priorities: dict[AutobfxTask, float] = {},
+    ) -> dict[AutobfxTask, AutobfxTaskChain]:
+        """
+        Find linear chains of tasks to fuse into single jobs, for flows with `fuse` in their runner parameters
+        Each step in a chain is a successor of the one before it with the same ids, the same kind of runner and software manager,
+        and `fuse` set as well
+        - Steps can have other predecessors (e.g. an index), the chain waits for them like any other job would,
+          as long as they don't depend on the chain themselves
+        - Steps can have other successors (e.g. trimmomatic -> fastqc beside trimmomatic -> heyfastq), the outputs those
+          (or any other task outside the chain) read are written out as usual. Where there's a choice, the chain goes on to the successor with the highest priority
+        - Steps with a `screen` only start chains, they need the outputs of the task before them to decide
+        Only tasks that are definitely running are fused, ones being rechecked might not need to run
+        """
+
+        def fusable(t: AutobfxTask) -> bool:
+            params = t.runner.options.get("params")
+            return (
+                t in run
+                and t not in chains
+                and params is not None
+                and params.parameters.get("fuse")
+            )
+
+        chains = {}
+        # The tasks reading each file, only gathered once there's a chain
+        readers: dict[Path, set[AutobfxTask]] = None
+        for t in tasks:
+            if not fusable(t):
+                continue
+            chain = [t]
+            # Anything downstream of the chain waits for it, so can't be something the chain waits for
+            downstream = nx.descendants(self.dag, t)
+            while True:
+                candidates = [
+                    s
+                    for s in self.dag.successors(chain[-1])
+                    if fusable(s)
+                    and not s.screen
+                    and s not in chain
+                    and s.id_dict == t.id_dict
+                    and type(s.runner) is type(t.runner)
+                    and type(s.runner.swm) is type(t.runner.swm)
+                    and not any(
+                        p in downstream and p not in chain
+                        for p in self.dag.predecessors(s)
+                    )
+                ]
+                if not candidates:
+                    break
+                chain.append(max(candidates, key=lambda s: priorities.get(s, 0)))
+
+            if len(chain) > 1:
+                if readers is None:
+                    readers = {}
+                    for u in self.dag.nodes:
+                        for p in u.input_paths():
+                            readers.setdefault(p, set()).add(u)
+                # Not just the members' successors, tasks further on can read their outputs too
+                members = set(chain)
+                external = {
+                    p
+                    for m in chain
+                    for o in m.outputs
+                    for p in o.paths()
+                    if readers.get(p, set()) - members
+                }
+                unit = AutobfxTaskChain(chain, external)
+                chains.update((m, unit) for m in chain)
+        return chains
+
+    def _submission_order(
+        self,
+        tasks: list[AutobfxTask],
+        batches: dict[AutobfxTask, AutobfxTaskArray | AutobfxTaskChain],
+        priorities: dict[AutobfxTask, float] = {},
+    ) -> list[AutobfxTask | AutobfxTaskArray | AutobfxTaskChain]:
+        """
+        Topologically sort `tasks` with the members of each array, bundle or chain collapsed into it,
+        going for the highest priority of whatever's ready next
+        """
+        unit_priorities: dict[
+            AutobfxTask | AutobfxTaskArray | AutobfxTaskChain, float
+        ] = {}
+        for t in tasks:
+            unit = batches.get(t, t)
+            unit_priorities[unit] = max(
+                unit_priorities.get(unit, 0), priorities.get(t, 0)
+            )
+
+        if batches:
+            units = nx.DiGraph()
+            units.add_nodes_from(unit_priorities)
+            units.add_edges_from(
+                (batches.get(u, u), batches.get(v, v))
+                for u, v in self.dag.subgraph(tasks).edges
+                if batches.get(u, u) is not batches.get(v, v)
+            )
+        else:
+            units = self.dag.subgraph(tasks)
+
+        return list(
+            nx.lexicographical_topological_sort(
+                units, key=lambda u: -unit_priorities[u]
+            )
+        )
+
+    def _submit_dag(
+        self,
+        units: list[AutobfxTask | AutobfxTaskArray | AutobfxTaskChain],
+        fingerprint_method: str = "stat",
+    ) -> list:
+        """
+        Submit every job up front in topological order, each depending (`--dependency=afterok:<ids>`) on its predecessors' jobs,
+        then wait for them all to reach terminal states
+        SLURM starts downstream jobs as soon as their dependencies finish (or cancels them if one fails),
+        so nothing goes back through the orchestrator between stages
+
+        Tasks can't be rechecked before their dependencies have run, so everything planned to run or be rechecked is submitted
+        Funcs are pickled and run in the job with `python -m autobfx.lib.remote`, their results are loaded once it's done
+        Screens need what the tasks before them make though, so tasks with a `screen` wait for their predecessors' jobs
+        to finish before they're submitted (or recorded as screened out, along with everything downstream of them)
+        """
+        job_ids: dict[AutobfxTask, str] = {}
+        futures: dict[AutobfxTask, Future] = {}
+        cmds: dict[AutobfxTask, object] = {}
+        # Inputs that only existed on scratch in a fused chain
+        transient: dict[AutobfxTask, set[str]] = {}
+        screened: set[AutobfxTask] = set()
+        finished: set[AutobfxTask] = set()
+        failed = []
+        started = time.time()
+
+        def finish(t: AutobfxTask):
+            if t in finished:
+                return
+            finished.add(t)
+            try:
+                status = futures[t].result()
+                if not status.ok:
+                    failed.append(
+                        f"{t.name} {t.ids} (job {status.job_id}): {status.state}"
+                    )
+                    return
+                if isinstance(cmds[t], CollectedCall):
+                    cmds[t] = cmds[t].result()
+                t._record(cmds[t], fingerprint_method, started, transient.get(t, set()))
+            except Exception as e:
+                failed.append(f"{t.name} {t.ids} (job {job_ids[t]}): {e!r}")
+
+        def unscreened(t: AutobfxTask) -> bool:
+            predecessors = set(self.dag.predecessors(t))
+            if t.screen:
+                for p in predecessors & futures.keys():
+                    finish(p)
+            elif not predecessors & screened:
+                return True
+            if t._screened_out(fingerprint_method):
+                screened.add(t)
+                return False
+            # Outputs of jobs that haven't run yet might have stale records from being screened out before
+            t.dropped -= {
+                str(fp)
+                for p in predecessors - finished
+                if p in futures
+                for o in p.outputs
+                for fp in o.paths()
+            }
+            return True
+
+        for unit in units:
+            members = (
+                unit.tasks
+                if isinstance(unit, (AutobfxTaskArray, AutobfxTaskChain))
+                else [unit]
+            )
+            if not all(hasattr(t.runner, "submit_job") for t in members):
+                raise ValueError(
+                    f"Runner {members[0].runner.name} for {unit.name} can't submit jobs with dependencies"
+                )
+            running = [t for t in members if unscreened(t)]
+            if not running:
+                continue
+            if running != members:
+                if len(running) == 1:
+                    unit = running[0]
+                elif isinstance(unit, AutobfxTaskChain):
+                    unit = AutobfxTaskChain(running, unit.external)
+                else:
+                    unit = type(unit)(running)
+                members = running
+            dependency = sorted(
+                {
+                    job_ids[p]
+                    for t in members
+                    for p in self.dag.predecessors(t)
+                    if p in job_ids
+                }
+            )
+
+            elements = []
+            for t in members:
+                t._setup_run()
+                cmds[t], task_cmds = t._collect(funcs=True)
+                elements.append(task_cmds)
+
+            if isinstance(unit, (AutobfxTaskArray, AutobfxTaskChain)):
+                jobs = unit.submit_job(elements, dependency)
+            else:
+                job_id = unit.runner.submit_job(elements[0], {"dependency": dependency})
+                jobs = [(job_id, unit.runner.watch(job_id))]
+            for t, (job_id, future) in zip(members, jobs):
+                job_ids[t] = job_id
+                futures[t] = future
+                if isinstance(unit, AutobfxTaskChain):
+                    transient[t] = set(unit.moved)
+
+        by_future = {f: t for t, f in futures.items()}
+        for future in as_completed(by_future):
+            finish(by_future[future])
+
+        if failed:
+            raise RuntimeError(f"{len(failed)} SLURM jobs did not complete: {failed}")
+
+        return [cmds[t] for t in job_ids]
+
+    def run(
+        self,
+        rerun_strategy: str = "lazy",
+        fingerprint_method: str = "stat",
+        submit_dag: bool = False,
+    ):
+        return self.flow(rerun_strategy, fingerprint_method, submit_dag)
@@ -0,0 +1,72 @@
+import argparse
+import json
+import shlex
+import sys
+from pathlib import Path
+from typing import BinaryIO
+from autobfx.lib.remote import SRC_DIR
+
+
+# Between the host name and the original contig name in a combined index, e.g. ">human|chr1"
+SEP = "|"
+# Unmapped, secondary and supplementary
+SKIP_FLAGS = 0x4 | 0x100 | 0x800
+
+
+def combine_fastas_cmd(hosts: dict[str, Path], out_fp: Path) -> str:
+    """The command to concatenate (gzipped or not) host fastas into one, prefixing each contig with its host's name"""
+    return " && ".join(
+        f"gzip -cdf {shlex.quote(str(fp))} | sed 's/^>/>{host}{SEP}/' {'>' if i == 0 else '>>'} {shlex.quote(str(out_fp))}"
+        for i, (host, fp) in enumerate(hosts.items())
+    )
+
+
+def count_hosts(sam: BinaryIO, out: BinaryIO | None = None) -> dict[str, int]:
+    """
+    Count the primary mapped reads (mates separately) to each host in a SAM stream aligned to a combined index,
+    by the prefix of the contig they mapped to, passing the stream through to `out` unchanged
+    """
+    counts: dict[str, int] = {}
+    for line in sam:
+        if out is not None:
+            out.write(line)
+        if line.startswith(b"@"):
+            # Every host gets a count, even with no reads
+            if line.startswith(b"@SQ\t"):
+                name = line.split(b"SN:", 1)[1].split(b"\t", 1)[0].rstrip()
+                counts.setdefault(name.split(SEP.encode(), 1)[0].decode(), 0)
+            continue
+        fields = line.split(b"\t", 3)
+        if int(fields[1]) & SKIP_FLAGS:
+            continue
+        host = fields[2].split(SEP.encode(), 1)[0].decode()
+        counts[host] = counts.get(host, 0) + 1
+    return counts
+
+
+def count_cmd(counts_fp: Path, python: str = "python") -> list[str]:
+    """The command to run `count_hosts` as a filter in a pipe with `python`, with this copy of autobfx importable"""
+    return [
+        f"PYTHONPATH={SRC_DIR}${{PYTHONPATH:+:$PYTHONPATH}}",
+        python,
+        "-m",
+        "autobfx.lib.hosts",
+        str(counts_fp),
+    ]
+
+
+def main(argv: list[str] = sys.argv[1:]):
+    parser = argparse.ArgumentParser(
+        description="Count reads per host in a SAM stream (stdin to stdout) aligned to a combined host index"
+    )
+    parser.add_argument("counts", type=Path, help="Where to write the counts (JSON)")
+    args = parser.parse_args(argv)
+
+    counts = count_hosts(sys.stdin.buffer, sys.stdout.buffer)
+    with open(args.counts, "w") as f:
+        json.dump(counts, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
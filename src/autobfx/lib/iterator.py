@@ -1,5 +1,7 @@
-from autobfx.lib.io import IOObject, IOReads
-from pathlib import Path
+import itertools
+import math
+import sys
+from typing import Callable, Iterator
 
 
 class AutobfxIterator:
@@ -8,19 +10,200 @@ class AutobfxIterator:
     The `iterable` attribute maps the variable name to the value e.g. "sample": "sample1" for each task
 
     [{"sample": "sample1", "host": "host1"}, {"sample": "sample1", "host": "host2"}, ...]
+
+    Under the hood the rows are stored as a product of columnar factors, each one a table of interned id columns
+    This way each id column is only stored once and e.g. 100k samples x 20 hosts is two factors of 100k and 20 values
+    Rows are only turned into dicts as they're iterated over
     """
 
-    def __init__(self, iterable: list[dict[str, str]]):
-        self.iterable = iterable
+    def __init__(self, iterable: list[dict[str, str]] = []):
+        # Each factor is (number of rows, {key: column}), the rows of the iterator are the product of the factors
+        self.factors: list[tuple[int, dict[str, list[str]]]] = [
+            self._to_factor(iterable)
+        ]
+
+    @staticmethod
+    def _to_factor(iterable: list[dict[str, str]]) -> tuple[int, dict[str, list[str]]]:
+        iterable = list(iterable)
+        if not iterable:
+            return 0, {}
+
+        keys = list(iterable[0].keys())
+        columns = {k: [] for k in keys}
+        for d in iterable:
+            if d.keys() != columns.keys():
+                raise ValueError(
+                    f"All entries of an AutobfxIterator need the same keys, got {list(d.keys())} and {keys}"
+                )
+            for k, v in d.items():
+                columns[k].append(sys.intern(str(v)))
+
+        return len(iterable), columns
+
+    @classmethod
+    def _from_factors(
+        cls, factors: list[tuple[int, dict[str, list[str]]]]
+    ) -> "AutobfxIterator":
+        iterator = cls()
+        iterator.factors = factors if factors else [(0, {})]
+        return iterator
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, list[str]]) -> "AutobfxIterator":
+        """
+        Create an iterator from equal length id columns e.g. {"sample": ["s1", "s2"]}
+        """
+        lengths = {len(c) for c in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {lengths}")
+
+        return cls._from_factors(
+            [
+                (
+                    lengths.pop() if lengths else 0,
+                    {k: [sys.intern(str(v)) for v in c] for k, c in columns.items()},
+                )
+            ]
+        )
+
+    def _factor_rows(self) -> list[list[tuple[str, ...]]]:
+        return [list(zip(*columns.values())) for _, columns in self.factors]
 
-    def __iter__(self):
-        return iter(self.iterable)
+    def _columns(self) -> dict[str, list[str]]:
+        """Materialize the iterator into a single columnar table"""
+        if len(self.factors) == 1:
+            return self.factors[0][1]
+
+        columns = {k: [] for k in self.keys()}
+        for d in self:
+            for k, v in d.items():
+                columns[k].append(v)
+        return columns
+
+    def __iter__(self) -> Iterator[dict[str, str]]:
+        keys = self.keys()
+        if len(self.factors) == 1:
+            return (dict(zip(keys, row)) for row in self._factor_rows()[0])
+
+        return (
+            dict(zip(keys, itertools.chain.from_iterable(rows)))
+            for rows in itertools.product(*self._factor_rows())
+        )
+
+    def __len__(self) -> int:
+        return math.prod(n for n, _ in self.factors)
 
     def __str__(self):
-        return f"{self.iterable}"
+        head = list(itertools.islice(self, 10))
+        return f"{head}{' ...' if len(self) > len(head) else ''}"
+
+    @property
+    def iterable(self) -> list[dict[str, str]]:
+        return list(self)
+
+    def keys(self) -> list[str]:
+        return [k for _, columns in self.factors for k in columns]
 
     def degree(self):
-        return len(self.iterable[0].items())
+        return len(self.keys())
+
+    def product(self, *others: "AutobfxIterator") -> "AutobfxIterator":
+        """
+        Cartesian product with other iterators, e.g. every sample with every host
+        This is lazy, none of the rows are materialized
+        """
+        factors = self.factors + [f for o in others for f in o.factors]
+        keys = [k for _, columns in factors for k in columns]
+        if len(keys) != len(set(keys)):
+            raise ValueError(
+                f"Can't take the product of iterators sharing keys: {keys}"
+            )
+
+        return self._from_factors(factors)
+
+    def zip(self, *others: "AutobfxIterator") -> "AutobfxIterator":
+        """
+        Pair up the rows of iterators of the same length
+        """
+        iterators = [self, *others]
+        if len({len(i) for i in iterators}) > 1:
+            raise ValueError(
+                f"Can't zip iterators of different lengths: {[len(i) for i in iterators]}"
+            )
+        keys = [k for i in iterators for k in i.keys()]
+        if len(keys) != len(set(keys)):
+            raise ValueError(f"Can't zip iterators sharing keys: {keys}")
+
+        return self._from_factors(
+            [(len(self), {k: c for i in iterators for k, c in i._columns().items()})]
+        )
+
+    def filter(self, predicate: Callable[[dict[str, str]], bool]) -> "AutobfxIterator":
+        """
+        Keep the rows that `predicate` returns True for
+        """
+        columns = {k: [] for k in self.keys()}
+        n = 0
+        for d in self:
+            if predicate(d):
+                n += 1
+                for k, v in d.items():
+                    columns[k].append(v)
+
+        return self._from_factors([(n, columns)])
+
+    def select(self, *keys: str) -> "AutobfxIterator":
+        """
+        Project onto a subset of keys, dropping duplicate rows
+        e.g. selecting "sample" from sample x host gives each sample once
+        """
+        missing = [k for k in keys if k not in self.keys()]
+        if missing:
+            raise KeyError(f"{missing} not in iterator keys {self.keys()}")
+        if len(self) == 0:
+            return self._from_factors([(0, {k: [] for k in keys})])
+
+        # Deduplicating the projection of a product is the same as deduplicating the projection of each factor
+        factors = []
+        for _, columns in self.factors:
+            selected = [k for k in columns if k in keys]
+            if not selected:
+                continue
+            rows = list(dict.fromkeys(zip(*(columns[k] for k in selected))))
+            factors.append(
+                (len(rows), {k: [r[i] for r in rows] for i, k in enumerate(selected)})
+            )
+
+        return self._from_factors(factors)
+
+    def join(self, other: "AutobfxIterator", on: list[str] = None) -> "AutobfxIterator":
+        """
+        Inner join with another iterator on shared keys
+        If `on` isn't given, all the keys the two iterators have in common are used
+        """
+        if on is None:
+            on = [k for k in self.keys() if k in other.keys()]
+        if not on:
+            return self.product(other)
+
+        other_keys = [k for k in other.keys() if k not in on]
+        groups: dict[tuple[str, ...], list[tuple[str, ...]]] = {}
+        for d in other:
+            groups.setdefault(tuple(d[k] for k in on), []).append(
+                tuple(d[k] for k in other_keys)
+            )
+
+        columns = {k: [] for k in self.keys() + other_keys}
+        n = 0
+        for d in self:
+            for row in groups.get(tuple(d[k] for k in on), []):
+                n += 1
+                for k, v in d.items():
+                    columns[k].append(v)
+                for k, v in zip(other_keys, row):
+                    columns[k].append(v)
+
+        return self._from_factors([(n, columns)])
 
     @classmethod
     def gather(
@@ -28,7 +211,7 @@ class AutobfxIterator:
         iterable: list[dict[str, str]],
         override: "AutobfxIterator" = None,
     ):
-        if override:
+        if override is not None:
             return override
 
         return AutobfxIterator(iterable)
@@ -36,16 +219,11 @@ class AutobfxIterator:
     @classmethod
     def expand(cls, iterators: list["AutobfxIterator"]):
         """
-        Expand multiple iterators into a single iterator
+        Expand multiple iterators into a single iterator over every combination of their values
         """
         if not iterators:
             return cls([])
         elif len(iterators) == 1:
             return iterators[0]
         else:
-            return cls(
-                [
-                    {k: v for d in dicts for k, v in d.items()}
-                    for dicts in zip(*[i.iterable for i in iterators])
-                ]
-            )
+            return iterators[0].product(*iterators[1:])
@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from pydantic import BaseModel
+
+
+class ProcessResult(BaseModel):
+    cmd: str
+    exit_code: int
+    wall_s: float
+    # User + system CPU time
+    cpu_s: float
+    max_rss_kb: int
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0
+
+
+class ProcessEngine:
+    """
+    Runs shell commands from a single asyncio event loop on a background thread, so thousands can run at once without a thread each
+    - Output goes straight from the process to a log file (the process writes to the file itself, nothing is buffered here)
+    - Processes are reaped with `os.wait4` once their pidfd says they've exited, which also gives their resource usage
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="process-engine", daemon=True
+        )
+        self._thread.start()
+        self._pool: ProcessPoolExecutor = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "ProcessEngine":
+        """Get the engine shared by everything in this process"""
+        global _shared
+        with _shared_lock:
+            if _shared is None:
+                _shared = cls()
+            return _shared
+
+    async def _wait(self, pid: int) -> tuple[int, object]:
+        try:
+            pidfd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            # No pidfds (not Linux or an old kernel), so block a worker thread instead
+            _, status, rusage = await self._loop.run_in_executor(None, os.wait4, pid, 0)
+            return status, rusage
+
+        exited = self._loop.create_future()
+        self._loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            self._loop.remove_reader(pidfd)
+            os.close(pidfd)
+        _, status, rusage = os.wait4(pid, 0)
+        return status, rusage
+
+    async def arun(self, cmd: str, log_fp: Path = None) -> ProcessResult:
+        """Run `cmd` with bash, appending its stdout and stderr to `log_fp` (or passing them through if it's None)"""
+        log = open(log_fp, "ab") if log_fp else None
+        try:
+            started = time.monotonic()
+            proc = subprocess.Popen(
+                cmd,
+                shell=True,
+                executable="/bin/bash",
+                stdout=log,
+                stderr=subprocess.STDOUT if log else None,
+            )
+        finally:
+            # The child has its own copy of the file descriptor
+            if log:
+                log.close()
+
+        status, rusage = await self._wait(proc.pid)
+        # Let Popen know the process has been reaped
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        return ProcessResult(
+            cmd=cmd,
+            exit_code=proc.returncode,
+            wall_s=time.monotonic() - started,
+            cpu_s=rusage.ru_utime + rusage.ru_stime,
+            max_rss_kb=rusage.ru_maxrss,
+        )
+
+    def submit(self, cmd: str, log_fp: Path = None) -> Future:
+        """Start `cmd` from any thread, returning a future for its ProcessResult"""
+        return asyncio.run_coroutine_threadsafe(self.arun(cmd, log_fp), self._loop)
+
+    def run(self, cmd: str, log_fp: Path = None) -> ProcessResult:
+        return self.submit(cmd, log_fp).result()
+
+    def call(self, func: callable, args: list = [], kwargs: dict = {}):
+        """
+        Call `func(*args, **kwargs)` in a pool of worker processes that's started once and reused
+        `func` and its arguments have to be picklable, so `func` needs to be defined at the top level of a module
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                # Forking a process with running threads (like this one) isn't safe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=os.cpu_count(),
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+        return self._pool.submit(func, *args, **kwargs).result()
+
+
+_shared: ProcessEngine = None
+_shared_lock = threading.Lock()
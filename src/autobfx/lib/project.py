@@ -1,9 +1,9 @@
-from pathlib import Path
-
-
-class OutputDir:
-    def __init__(self, output_dir: Path):
-        self.output_dir = output_dir
-
-    def gather_samples(self):
-        pass
+from pathlib import Path
+
+
+class OutputDir:
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+
+    def gather_samples(self):
+        pass
@@ -0,0 +1,149 @@
+import gzip
+import itertools
+import shutil
+import subprocess
+import numpy as np
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+
+# Reads handled at a time, bounding memory to a block of reads plus 8 bytes per host read
+BLOCK_SIZE = 100000
+FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def read_name(header: bytes) -> bytes:
+    """A read's name from its SAM field or FASTQ header, without any /1 or /2 mate suffix"""
+    name = header.lstrip(b"@").split(None, 1)[0]
+    return name[:-2] if name[-2:] in (b"/1", b"/2") else name
+
+
+def hash_names(names: list[bytes]) -> np.ndarray:
+    """64 bit FNV-1a hashes of `names`, hashed a character position at a time across all of them"""
+    lens = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    if not len(names) or not lens.max():
+        return np.full(len(names), FNV_OFFSET, dtype=np.uint64)
+    starts = np.cumsum(lens) - lens
+    chars = np.frombuffer(b"".join(names), dtype=np.uint8)
+
+    hashes = np.full(len(names), FNV_OFFSET, dtype=np.uint64)
+    for j in range(lens.max()):
+        live = lens > j
+        c = chars[np.minimum(starts + j, len(chars) - 1)].astype(np.uint64)
+        hashes = np.where(live, (hashes ^ c) * FNV_PRIME, hashes)
+    return hashes
+
+
+def host_read_hashes(sams: Iterable[Iterable[bytes]]) -> np.ndarray:
+    """The sorted, unique hashed names of the reads in SAM streams (without headers), e.g. the mapped reads for each host"""
+    blocks = []
+    for sam in sams:
+        lines = iter(sam)
+        while block := list(itertools.islice(lines, BLOCK_SIZE)):
+            blocks.append(
+                np.unique(hash_names([read_name(l.split(b"\t", 1)[0]) for l in block]))
+            )
+            # Keep duplicates (mates, secondary alignments, other hosts) from piling up
+            if len(blocks) > 64:
+                blocks = [np.unique(np.concatenate(blocks))]
+    return np.unique(np.concatenate(blocks)) if blocks else np.empty(0, np.uint64)
+
+
+def contains(sorted_hashes: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    if not len(sorted_hashes):
+        return np.zeros(len(hashes), dtype=bool)
+    idx = np.minimum(np.searchsorted(sorted_hashes, hashes), len(sorted_hashes) - 1)
+    return sorted_hashes[idx] == hashes
+
+
+def _open(fp: Path) -> BinaryIO:
+    return gzip.open(fp) if str(fp).endswith(".gz") else open(fp, "rb")
+
+
+@contextmanager
+def gzip_writer(fp: Path, threads: int = 1) -> Iterator[BinaryIO]:
+    """Write gzipped output with pigz on `threads` threads, or gzip in this process if there's no pigz"""
+    if not shutil.which("pigz"):
+        with gzip.open(fp, "wb", compresslevel=6) as f:
+            yield f
+        return
+
+    with open(fp, "wb") as out:
+        proc = subprocess.Popen(
+            ["pigz", "-p", str(threads), "-6", "-c"], stdin=subprocess.PIPE, stdout=out
+        )
+        try:
+            yield proc.stdin
+        finally:
+            proc.stdin.close()
+            if proc.wait():
+                raise RuntimeError(
+                    f"pigz writing {fp} failed with exit code {proc.returncode}"
+                )
+
+
+def filter_fastqs(
+    read_fps: list[Path], out_fps: list[Path], host: np.ndarray, threads: int = 1
+) -> dict[str, int]:
+    """
+    Stream fastqs (R1 and R2 in lockstep) to `out_fps`, leaving out reads whose hashed names are in `host`
+    Returns how many reads (pairs) there were and how many were left out
+    """
+    counts = {"reads": 0, "host": 0}
+    with ExitStack() as stack:
+        readers = [stack.enter_context(_open(fp)) for fp in read_fps]
+        writers = [
+            stack.enter_context(gzip_writer(fp, max(1, threads // len(out_fps))))
+            for fp in out_fps
+        ]
+        while True:
+            blocks = [list(itertools.islice(r, 4 * BLOCK_SIZE)) for r in readers]
+            if any(len(b) != len(blocks[0]) for b in blocks) or len(blocks[0]) % 4:
+                raise ValueError(
+                    f"{read_fps} are truncated or have different read counts"
+                )
+            if not blocks[0]:
+                break
+
+            is_host = contains(host, hash_names([read_name(h) for h in blocks[0][::4]]))
+            keep = np.flatnonzero(~is_host)
+            for w, b in zip(writers, blocks):
+                w.write(b"".join(l for i in keep for l in b[4 * i : 4 * i + 4]))
+            counts["reads"] += len(is_host)
+            counts["host"] += int(is_host.sum())
+
+    return counts
+
+
+def mapped_cmd(fp: Path, threads: int = 1) -> list[str]:
+    """The command streaming the mapped reads (any alignment) from a SAM or BAM, without its header"""
+    return ["samtools", "view", "-F", "4", "-@", str(threads), str(fp)]
+
+
+def filter_host_reads(
+    alignment_fps: list[Path],
+    read_fps: list[Path],
+    out_fps: list[Path],
+    threads: int = 1,
+) -> dict[str, int]:
+    """
+    Write the reads (pairs) that didn't map to any host, in one pass over the alignments to every host and one over the reads
+    Host mapped read names are only kept as 64 bit hashes, so memory is bounded by 8 bytes per host read
+    """
+
+    def mapped(fp: Path) -> Iterator[bytes]:
+        proc = subprocess.Popen(mapped_cmd(fp, threads), stdout=subprocess.PIPE)
+        yield from proc.stdout
+        if proc.wait():
+            raise RuntimeError(
+                f"Reading alignments from {fp} failed with exit code {proc.returncode}"
+            )
+
+    host = host_read_hashes(mapped(fp) for fp in alignment_fps)
+    for fp in out_fps:
+        Path(fp).parent.mkdir(parents=True, exist_ok=True)
+    counts = filter_fastqs(read_fps, out_fps, host, threads)
+    print(f"Removed {counts['host']} of {counts['reads']} reads mapping to hosts")
+    return counts
@@ -0,0 +1,71 @@
+import pickle
+import sys
+from pathlib import Path
+
+# Only the standard library is imported here so this can run in any environment with autobfx on its PYTHONPATH
+# The directory this copy of autobfx is imported from
+SRC_DIR = Path(__file__).resolve().parents[2]
+
+
+def result_fp(call_fp: Path) -> Path:
+    return Path(call_fp).with_suffix(".result")
+
+
+def dump_call(call_fp: Path, func: callable, args: list = [], kwargs: dict = {}):
+    """
+    Pickle a call to `func` for `python -m autobfx.lib.remote` to run somewhere else
+    `func` is pickled by reference, so it needs to be importable (defined at the top level of a module) wherever it runs
+    """
+    call_fp = Path(call_fp)
+    call_fp.parent.mkdir(parents=True, exist_ok=True)
+    with open(call_fp, "wb") as f:
+        pickle.dump((func, list(args), dict(kwargs)), f)
+
+
+def remote_cmd(call_fp: Path, python: str = "python") -> list[str]:
+    """The command to run a pickled call with `python`, with this copy of autobfx importable"""
+    return [
+        f"PYTHONPATH={SRC_DIR}${{PYTHONPATH:+:$PYTHONPATH}}",
+        python,
+        "-m",
+        "autobfx.lib.remote",
+        str(call_fp),
+    ]
+
+
+def load_result(call_fp: Path):
+    """The return value of a call that ran remotely, re-raising its exception if it failed"""
+    try:
+        with open(result_fp(call_fp), "rb") as f:
+            ok, value = pickle.load(f)
+    except FileNotFoundError:
+        raise RuntimeError(f"No result for {call_fp}, the call never finished")
+    if not ok:
+        raise value
+    return value
+
+
+def main(argv: list[str] = sys.argv[1:]) -> int:
+    call_fp = Path(argv[0])
+    with open(call_fp, "rb") as f:
+        func, args, kwargs = pickle.load(f)
+
+    try:
+        result = (True, func(*args, **kwargs))
+    except Exception as e:
+        result = (False, e)
+
+    with open(result_fp(call_fp), "wb") as f:
+        try:
+            pickle.dump(result, f)
+        except Exception as e:
+            # e.g. the function returned something that can't be pickled
+            f.seek(0)
+            f.truncate()
+            pickle.dump((False, RuntimeError(f"Can't return {result[1]!r}: {e}")), f)
+
+    return 0 if result[0] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
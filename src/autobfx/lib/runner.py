@@ -1,368 +1,619 @@
-import os
-import subprocess
-import time
-from abc import ABC, abstractmethod
-from prefect_shell import ShellOperation
-from simple_slurm import Slurm
-from typing import Type
-
-
-class RunnerOptions:
-    def __init__(self, conda_env: str = "", docker_img: str = ""):
-        self.conda_env = conda_env
-        self.docker_img = docker_img
-
-
-class AutobfxSoftwareManager(ABC):
-    def __init__(self):
-        self.name = "abstract"
-        # TODO: Consider adding options for the manager as a whole as well
-
-    # TODO: Consider renaming this to something like 'get_run_cmds'
-    @abstractmethod
-    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
-        pass
-
-    @abstractmethod
-    def run_func(
-        self,
-        func: callable,
-        func_args: list = [],
-        func_kwargs: dict = {},
-        options: dict = {},
-    ):
-        pass
-
-
-class NoManager(AutobfxSoftwareManager):
-    def __init__(self):
-        self.name = "none"
-
-    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
-        return [" ".join(cmd)]
-
-    def run_func(
-        self,
-        func: callable,
-        func_args: list = [],
-        func_kwargs: dict = {},
-        options: dict = {},
-    ):
-        print(
-            f"Running func {func.__name__} with args {func_args} and kwargs {func_kwargs}"
-        )
-
-        func(*func_args, **func_kwargs)
-
-
-class VenvManager(AutobfxSoftwareManager):
-    def __init__(self):
-        self.name = "venv"
-
-    def _prep(self, options: dict = {}) -> str:
-        try:
-            venv = options["venv"]
-        except KeyError:
-            raise KeyError("VenvManager requires a venv key in options")
-
-        return venv
-
-    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
-        venv = self._prep(options)
-
-        return [
-            f"source {options['venv']}/bin/activate",
-            " ".join(cmd),
-        ]
-
-    def run_func(
-        self,
-        func: callable,
-        func_args: list = [],
-        func_kwargs: dict = {},
-        options: dict = {},
-    ):
-        pass  # TODO
-
-
-class CondaManager(AutobfxSoftwareManager):
-    def __init__(self):
-        self.name = "conda"
-
-    def _prep(self, options: dict = {}) -> tuple[str, str]:
-        try:
-            env = options["conda_env"]
-        except KeyError:
-            raise KeyError("CondaManager requires a conda_env key in options")
-
-        try:
-            solver_cmd = options["solver"]
-        except KeyError:
-            solver_cmd = "conda"
-
-        return env, solver_cmd
-
-    def run_cmd(self, cmd: list[str], options: dict[str, str]) -> list[str]:
-        env, solver_cmd = self._prep(options)
-
-        return [
-            f"source {os.environ.get('CONDA_PREFIX', '')}/etc/profile.d/conda.sh",
-            f"{solver_cmd} activate {env}",
-            " ".join(cmd),
-        ]
-
-    def run_func(
-        self,
-        func: callable,
-        func_args: list = [],
-        func_kwargs: dict = {},
-        options: dict = {},
-    ):
-        pass  # TODO
-
-
-class MambaManager(CondaManager):
-    def __init__(self):
-        self.name = "mamba"
-
-    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
-        options["solver"] = self.name
-        return super().run_cmd(cmd, options)
-
-    def run_func(
-        self,
-        func: callable,
-        func_args: list = [],
-        func_kwargs: dict = {},
-        options: dict = {},
-    ):
-        pass
-
-
-class DockerManager(AutobfxSoftwareManager):
-    def __init__(self):
-        self.name = "docker"
-
-    def _prep(self, options: dict = {}) -> str:
-        try:
-            img = options["docker_img"]
-        except KeyError:
-            raise KeyError("DockerManager requires a docker_img key in options")
-
-        return img
-
-    def run_cmd(self, cmd: list[str], options: dict = {}):
-        img = self._prep(options)
-
-        # TODO: Figure out how to do this right
-        return [f"docker run -v {os.getcwd()}:/data -w /data {img} {' '.join(cmd)}"]
-
-    def run_func(
-        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
-    ):
-        pass  # TODO
-
-
-class AutobfxRunner(ABC):
-    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
-        self.name = "abstract"
-        self.work_pool_name = "default"
-        self.worker_type = "process"
-        self.swm = swm
-        self.options = options
-
-    @abstractmethod
-    def run_cmd(self, cmd: list[str], options: dict = {}):
-        opts = self.options.copy()
-        opts.update(options)
-        self.swm.run_cmd(cmd, opts)
-
-    @abstractmethod
-    def run_func(
-        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
-    ):
-        opts = self.options.copy()
-        opts.update(options)
-        self.swm.run_func(func, args=args, kwargs=kwargs, options=opts)
-
-    # TODO: Consider a run_script method, not sure I really care though, either a func or a cmd gives plenty of flexibility
-
-
-class DryRunner(AutobfxRunner):
-    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
-        self.name = "dryrun"
-        self.work_pool_name = "default"
-        self.worker_type = "process"
-        self.swm = swm
-        self.options = options
-        print(f"DryRunner initialized with options: {options}")
-
-    def run_cmd(self, cmd: list[str], options: dict = {}):
-        opts = self.options.copy()
-        opts.update(options)
-
-        print(f"Would run: {self.swm.run_cmd(cmd, opts)}")
-        return 1
-
-    def run_func(
-        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
-    ):
-        opts = self.options.copy()
-        opts.update(options)
-
-        print(
-            f"Would run func {func.__name__} with args {args} and kwargs {kwargs} with options {opts}"
-        )
-        return 1
-
-
-class LocalRunner(AutobfxRunner):
-    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
-        self.name = "local"
-        self.work_pool_name = "default"
-        self.worker_type = "process"
-        self.swm = swm
-        self.options = options
-
-    def run_cmd(self, cmd: list[str], options: dict = {}):
-        opts = self.options.copy()
-        opts.update(options)
-
-        print(f"Running: {cmd}")
-        with ShellOperation(
-            commands=self.swm.run_cmd(cmd, opts),
-        ) as shell_operation:
-            shell_process = shell_operation.trigger()
-            shell_process.wait_for_completion()
-
-        return 1  # TODO: Return something useful
-
-    def run_func(
-        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
-    ):
-        pass  # TODO
-
-
-class SLURMRunner(AutobfxRunner):
-    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
-        self.name = "slurm"
-        self.work_pool_name = "slurm"
-        self.worker_type = "process"
-        self.swm = swm
-        self.options = options
-
-    def _wait_for_job_completion(self, job_id: int) -> bool:
-        sacct_results = subprocess.run(
-            ["sacct", "-j", job_id, "--format=JobID,State,ExitCode"]
-        )
-        try:
-            if sacct_results.stdout.splitlines()[2].split()[1] in [
-                "COMPLETED",
-                "FAILED",
-                "CANCELLED",
-                "TIMEOUT",
-                "NODE_FAIL",
-            ]:
-                return True
-            return False
-        except Exception as e:
-            print(f"Error checking job status: {e}")
-            return False
-
-    def run_cmd(self, cmd: list[str], options: dict = {}):
-        opts = self.options.copy()
-        opts.update(options)
-        # params is a RunnerConfig object from the flow config
-        # It can't be imported here because it would create a circular import
-        params = opts["params"]
-
-        slurm = Slurm(
-            cpus_per_task=params.threads,
-            mem=f"{params.mem_mb}M",
-            time=params.runtime_min,
-            job_name=opts["job_name"],
-            output=f"%x-%j.out",
-        )
-
-        cmds = self.swm.run_cmd(cmd, opts)
-        for cmd in cmds[:-1]:
-            slurm.add_cmd(cmd)
-        job_id = slurm.sbatch(
-            cmds[-1],
-            sbatch_cmd=params.parameters.get(
-                "sbatch_cmd", "/home/ctbus/Penn/autobfx/slurm/sbatch"
-            ),
-        )
-
-        # Wait for job to finish
-        while not self._wait_for_job_completion(job_id):
-            time.sleep(10)
-
-    def run_func(
-        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
-    ):
-        pass
-
-
-class ECSRunner(AutobfxRunner):
-    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
-        self.name = "ecs"
-        self.work_pool_name = "ecs"
-        self.worker_type = "ecs"
-        self.swm = swm
-        self.options = options
-
-    def run_cmd(self, cmd: list[str], options: dict = {}):
-        opts = self.options.copy()
-        opts.update(options)
-
-        print("NOT IMPLEMENTED")
-
-    def run_func(
-        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
-    ):
-        pass
-
-
-# TODO: Make proper registries for these (and flows) for plugins to work with
-swm_map: dict[str, Type[AutobfxSoftwareManager]] = {
-    "none": NoManager,
-    "venv": VenvManager,
-    "conda": CondaManager,
-    "mamba": MambaManager,
-}
-
-
-runner_map: dict[str, Type[AutobfxRunner]] = {
-    "local": LocalRunner,
-    "dryrun": DryRunner,
-    "slurm": SLURMRunner,
-    "ecs": ECSRunner,
-}
-
-
-class TestRunner(AutobfxRunner):
-    def __init__(
-        self,
-        run_cmd: callable,
-        run_func: callable,
-        swm: AutobfxSoftwareManager = NoManager(),
-        options: dict = {},
-    ):
-        self.name = "test"
-        self._run_cmd = run_cmd
-        self._run_func = run_func
-        self.swm = swm
-        self.options = options
-
-    def run_cmd(self, cmd: list[str], options: dict = {}):
-        opts = self.options.copy()
-        opts.update(options)
-        return self._run_cmd(cmd, opts)
-
-    def run_func(
-        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
-    ):
-        opts = self.options.copy()
-        opts.update(options)
-        return self._run_func(func, args=args, kwargs=kwargs, options=opts)
+import math
+import os
+import sys
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from contextlib import AbstractContextManager
+from pathlib import Path
+from simple_slurm import Slurm
+from typing import Type
+from autobfx.lib.bundle import read_results
+from autobfx.lib.envs import activated_env, export_lines, unpack_lines
+from autobfx.lib.process import ProcessEngine
+from autobfx.lib.remote import SRC_DIR, dump_call, load_result, remote_cmd, result_fp
+from autobfx.lib.scheduler import ResourceScheduler
+from autobfx.lib.slurm import SLURMJobMonitor, SLURMJobStatus
+
+
+class RunnerOptions:
+    def __init__(self, conda_env: str = "", docker_img: str = ""):
+        self.conda_env = conda_env
+        self.docker_img = docker_img
+
+
+class AutobfxSoftwareManager(ABC):
+    # The python to run funcs with inside the environment
+    python = "python"
+
+    def __init__(self):
+        self.name = "abstract"
+        # TODO: Consider adding options for the manager as a whole as well
+
+    # TODO: Consider renaming this to something like 'get_run_cmds'
+    @abstractmethod
+    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
+        pass
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ) -> list[str]:
+        """
+        Pickle the call to `options["call_fp"]` and return the commands that run it in this manager's environment
+        The result is written next to it, see `autobfx.lib.remote`
+        """
+        dump_call(options["call_fp"], func, args, kwargs)
+        return self.run_cmd(remote_cmd(options["call_fp"], self.python), options)
+
+    @staticmethod
+    def _activated(activate: list[str], marker: str, options: dict = {}) -> list[str]:
+        """
+        The commands that put a command in an environment, replacing `activate` with exporting the variables it sets
+        Activation (slow on shared filesystems) then only really runs once per change to the environment
+        Set `cache_activation` to False in options to always run `activate`
+        """
+        if not options.get("cache_activation", True):
+            return activate
+        env = activated_env(activate, marker)
+        return activate if env is None else export_lines(env)
+
+
+class NoManager(AutobfxSoftwareManager):
+    def __init__(self):
+        self.name = "none"
+        # No environment to switch to, so calls run with the same interpreter
+        self.python = sys.executable
+
+    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
+        return [" ".join(cmd)]
+
+
+class VenvManager(AutobfxSoftwareManager):
+    def __init__(self):
+        self.name = "venv"
+
+    def _prep(self, options: dict = {}) -> str:
+        try:
+            venv = options["venv"]
+        except KeyError:
+            raise KeyError("VenvManager requires a venv key in options")
+
+        return venv
+
+    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
+        venv = self._prep(options)
+
+        activate = [f"source {venv}/bin/activate"]
+        return [*self._activated(activate, f"{venv}/bin", options), " ".join(cmd)]
+
+
+class CondaManager(AutobfxSoftwareManager):
+    def __init__(self):
+        self.name = "conda"
+
+    def _prep(self, options: dict = {}) -> tuple[str, str]:
+        try:
+            env = options["conda_env"]
+        except KeyError:
+            raise KeyError("CondaManager requires a conda_env key in options")
+
+        try:
+            solver_cmd = options["solver"]
+        except KeyError:
+            solver_cmd = "conda"
+
+        return env, solver_cmd
+
+    def run_cmd(self, cmd: list[str], options: dict[str, str]) -> list[str]:
+        env, solver_cmd = self._prep(options)
+
+        # A packed environment gets unpacked to node local scratch instead of being read from shared storage
+        if options.get("conda_pack") and options.get("env_scratch"):
+            return [
+                *unpack_lines(options["conda_pack"], options["env_scratch"]),
+                " ".join(cmd),
+            ]
+
+        activate = [
+            f"source {os.environ.get('CONDA_PREFIX', '')}/etc/profile.d/conda.sh",
+            f"{solver_cmd} activate {env}",
+        ]
+        # conda-meta changes whenever packages are installed or removed
+        return [
+            *self._activated(activate, "{CONDA_PREFIX}/conda-meta", options),
+            " ".join(cmd),
+        ]
+
+
+class MambaManager(CondaManager):
+    def __init__(self):
+        self.name = "mamba"
+
+    def run_cmd(self, cmd: list[str], options: dict = {}) -> list[str]:
+        options["solver"] = self.name
+        return super().run_cmd(cmd, options)
+
+
+class DockerManager(AutobfxSoftwareManager):
+    def __init__(self):
+        self.name = "docker"
+
+    def _prep(self, options: dict = {}) -> str:
+        try:
+            img = options["docker_img"]
+        except KeyError:
+            raise KeyError("DockerManager requires a docker_img key in options")
+
+        return img
+
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        img = self._prep(options)
+
+        # TODO: Figure out how to do this right
+        return [f"docker run -v {os.getcwd()}:/data -w /data {img} {' '.join(cmd)}"]
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ) -> list[str]:
+        img = self._prep(options)
+        dump_call(options["call_fp"], func, args, kwargs)
+
+        # The call and autobfx itself are mounted at the same paths inside the container
+        call_dir = Path(options["call_fp"]).resolve().parent
+        return [
+            f"docker run -v {os.getcwd()}:/data -v {call_dir}:{call_dir} -v {SRC_DIR}:{SRC_DIR}:ro -e PYTHONPATH={SRC_DIR} -w /data {img} {' '.join(remote_cmd(options['call_fp'])[1:])}"
+        ]
+
+
+class AutobfxRunner(ABC):
+    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
+        self.name = "abstract"
+        self.work_pool_name = "default"
+        self.worker_type = "process"
+        self.swm = swm
+        self.options = options
+
+    @abstractmethod
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        opts = self.options.copy()
+        opts.update(options)
+        self.swm.run_cmd(cmd, opts)
+
+    @abstractmethod
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ):
+        opts = self.options.copy()
+        opts.update(options)
+        self.swm.run_func(func, args=args, kwargs=kwargs, options=opts)
+
+    @staticmethod
+    def _call_fp(func: callable, opts: dict) -> Path:
+        # Next to the task's log so it's on storage the job can see
+        call_dir = (
+            Path(opts["log_fp"]).parent / ".calls"
+            if opts.get("log_fp")
+            else Path(tempfile.gettempdir())
+        )
+        return (
+            call_dir
+            / f"{opts.get('job_name', func.__name__)}_{uuid.uuid4().hex[:8]}.call"
+        )
+
+    # TODO: Consider a run_script method, not sure I really care though, either a func or a cmd gives plenty of flexibility
+
+
+class DryRunner(AutobfxRunner):
+    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
+        self.name = "dryrun"
+        self.work_pool_name = "default"
+        self.worker_type = "process"
+        self.swm = swm
+        self.options = options
+        print(f"DryRunner initialized with options: {options}")
+
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        opts = self.options.copy()
+        opts.update(options)
+        # Nothing runs, so there's no need to activate anything to see what it would set
+        opts["cache_activation"] = False
+
+        print(f"Would run: {self.swm.run_cmd(cmd, opts)}")
+        return 1
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ):
+        opts = self.options.copy()
+        opts.update(options)
+
+        print(
+            f"Would run func {func.__name__} with args {args} and kwargs {kwargs} with options {opts}"
+        )
+        return 1
+
+
+class LocalRunner(AutobfxRunner):
+    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
+        self.name = "local"
+        self.work_pool_name = "default"
+        self.worker_type = "process"
+        self.swm = swm
+        self.options = options
+
+    @staticmethod
+    def _slot(opts: dict, what) -> AbstractContextManager:
+        # Wait for room on this machine for the resources the flow config asks for
+        # params is a RunnerConfig object from the flow config (if there is one)
+        params = opts.get("params")
+        scheduler = ResourceScheduler.shared()
+        threads, mem_mb = (params.threads, params.mem_mb) if params else (1, 0)
+        if not scheduler.has_room(threads, mem_mb):
+            print(f"Queueing {opts.get('job_name', what)}: {scheduler.stats()}")
+
+        return scheduler.slot(threads, mem_mb, opts.get("priority", 0))
+
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        opts = self.options.copy()
+        opts.update(options)
+
+        with self._slot(opts, cmd):
+            print(f"Running: {cmd}")
+            # Anything the command doesn't redirect itself goes to the task's log
+            result = ProcessEngine.shared().run(
+                " && ".join(self.swm.run_cmd(cmd, opts)), opts.get("log_fp")
+            )
+
+        if not result.ok:
+            raise RuntimeError(
+                f"{result.cmd} ({opts.get('job_name')}) failed with exit code {result.exit_code}"
+            )
+
+        return result
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ):
+        """
+        Call `func(*args, **kwargs)` and return the result
+        Without a software manager this goes to a pool of worker processes that's reused between calls,
+        otherwise the call is pickled and run with the environment's python
+        """
+        opts = self.options.copy()
+        opts.update(options)
+
+        with self._slot(opts, func.__name__):
+            print(f"Running func {func.__name__}")
+            if isinstance(self.swm, NoManager):
+                return ProcessEngine.shared().call(func, args, kwargs)
+
+            opts["call_fp"] = self._call_fp(func, opts)
+            result = ProcessEngine.shared().run(
+                " && ".join(self.swm.run_func(func, args, kwargs, opts)),
+                opts.get("log_fp"),
+            )
+
+        if not result.ok and not result_fp(opts["call_fp"]).exists():
+            raise RuntimeError(
+                f"{result.cmd} ({opts.get('job_name')}) failed with exit code {result.exit_code}"
+            )
+        return load_result(opts["call_fp"])
+
+
+class SLURMRunner(AutobfxRunner):
+    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
+        self.name = "slurm"
+        self.work_pool_name = "slurm"
+        self.worker_type = "process"
+        self.swm = swm
+        self.options = options
+
+    def _sbatch(self, opts: dict, lines: list[str], **kwargs) -> str:
+        # params is a RunnerConfig object from the flow config
+        # It can't be imported here because it would create a circular import
+        params = opts["params"]
+        if opts.get("dependency"):
+            # Jobs whose dependencies fail are cancelled rather than left pending forever
+            kwargs["dependency"] = "afterok:" + ":".join(opts["dependency"])
+            kwargs["kill_on_invalid_dep"] = "yes"
+        if params.parameters.get("nice") and "priority" in opts:
+            # Spread jobs from nice 0 on the flow's critical path (priority 1) up to `nice` for the least critical ones
+            kwargs["nice"] = round((1 - opts["priority"]) * params.parameters["nice"])
+
+        slurm = Slurm(
+            **{
+                "cpus_per_task": params.threads,
+                "mem": f"{params.mem_mb}M",
+                "time": params.runtime_min,
+                "job_name": opts["job_name"],
+                **kwargs,
+            }
+        )
+        for line in lines:
+            slurm.add_cmd(line)
+        return str(
+            slurm.sbatch(
+                sbatch_cmd=params.parameters.get(
+                    "sbatch_cmd", "/home/ctbus/Penn/autobfx/slurm/sbatch"
+                ),
+            )
+        )
+
+    def watch(self, job_id: str, options: dict = {}) -> Future:
+        """A future for the job's final SLURMJobStatus, all jobs in the process are polled together by the shared monitor"""
+        params = {**self.options, **options}["params"]
+        monitor = SLURMJobMonitor.shared(
+            sacct_cmd=params.parameters.get("sacct_cmd", "sacct"),
+            interval=params.parameters.get("poll_interval_s", 15),
+        )
+        return monitor.watch(str(job_id))
+
+    def submit_job(self, cmds: list[list[str]], options: dict = {}) -> str:
+        """
+        Submit one job running `cmds` in order without waiting for it, returning the job id
+        If `options["dependency"]` is a list of job ids, the job only starts once they've all completed successfully
+        """
+        opts = self.options.copy()
+        opts.update(options)
+
+        return self._sbatch(
+            opts,
+            [line for cmd in cmds for line in self.swm.run_cmd(cmd, opts)],
+            output=f"%x-%j.out",
+        )
+
+    def _write_manifest(self, elements: list[list[list[str]]], opts: dict) -> Path:
+        # One line per task, chaining the task's commands
+        manifest_fp = Path(opts["manifest_fp"])
+        manifest_fp.parent.mkdir(parents=True, exist_ok=True)
+        manifest_fp.write_text(
+            "".join(
+                " && ".join(
+                    line for cmd in cmds for line in self.swm.run_cmd(cmd, opts)
+                )
+                + "\n"
+                for cmds in elements
+            )
+        )
+        return manifest_fp
+
+    def submit_bundle(self, elements: list[list[list[str]]], options: dict = {}) -> str:
+        """
+        Submit several tasks' commands as one job that runs them `options["workers"]` at a time, returning the job id
+        The allocation is sized to fit that many tasks at once, with enough time to get through all of them
+        Each task's exit code goes to a results file next to the manifest, see `bundle_statuses`
+        """
+        opts = self.options.copy()
+        opts.update(options)
+        params = opts["params"]
+        manifest_fp = self._write_manifest(elements, opts)
+        workers = max(1, min(opts.get("workers") or len(elements), len(elements)))
+
+        return self._sbatch(
+            opts,
+            [
+                f"{params.parameters.get('python', sys.executable)} -m autobfx.lib.bundle {manifest_fp} {manifest_fp.with_suffix('.results')} --workers {workers}"
+            ],
+            cpus_per_task=params.threads * workers,
+            mem=f"{params.mem_mb * workers}M",
+            time=params.runtime_min * math.ceil(len(elements) / workers),
+            output=f"%x-%j.out",
+        )
+
+    @staticmethod
+    def bundle_statuses(
+        status: SLURMJobStatus, n: int, options: dict
+    ) -> list[SLURMJobStatus]:
+        """
+        Per task statuses for a finished bundle job, in manifest order
+        Tasks without a result (e.g. the job timed out before getting to them) get the state of the job itself
+        """
+        results = read_results(Path(options["manifest_fp"]).with_suffix(".results"))
+        statuses = []
+        for i in range(n):
+            if i in results:
+                exit_code = results[i]["exit_code"]
+                statuses.append(
+                    SLURMJobStatus(
+                        job_id=f"{status.job_id}+{i}",
+                        state="COMPLETED" if exit_code == 0 else "FAILED",
+                        exit_code=f"{exit_code}:0",
+                    )
+                )
+            else:
+                statuses.append(
+                    SLURMJobStatus(
+                        job_id=f"{status.job_id}+{i}",
+                        state=status.state if status.state != "COMPLETED" else "FAILED",
+                        exit_code=status.exit_code,
+                    )
+                )
+        return statuses
+
+    def run_bundle(
+        self, elements: list[list[list[str]]], options: dict = {}
+    ) -> list[SLURMJobStatus]:
+        """
+        Submit several tasks' commands as one bundle job and wait for it
+        The statuses are returned in the same order as `elements`, failed tasks don't raise
+        """
+        job_id = self.submit_bundle(elements, options)
+        return self.bundle_statuses(
+            self.watch(job_id, options).result(), len(elements), options
+        )
+
+    def submit_array(self, elements: list[list[list[str]]], options: dict = {}) -> str:
+        """
+        Submit several tasks' commands as the elements of a single array job without waiting for it, returning the job id
+        Element i runs line i of a manifest written to `options["manifest_fp"]`
+        """
+        opts = self.options.copy()
+        opts.update(options)
+        params = opts["params"]
+        manifest_fp = self._write_manifest(elements, opts)
+
+        # e.g. 0-4999%500 to run at most 500 elements at a time
+        array = f"0-{len(elements) - 1}"
+        if params.parameters.get("array_max_running"):
+            array += f"%{params.parameters['array_max_running']}"
+        return self._sbatch(
+            opts,
+            [f'eval "$(sed -n "$((SLURM_ARRAY_TASK_ID + 1))p" {manifest_fp})"'],
+            array=array,
+            output=f"%x-%A_%a.out",
+        )
+
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        opts = self.options.copy()
+        opts.update(options)
+
+        job_id = self.submit_job([cmd], opts)
+        status = self.watch(job_id, opts).result()
+        if not status.ok:
+            raise RuntimeError(
+                f"SLURM job {job_id} ({opts['job_name']}) finished with state {status.state} (exit code {status.exit_code})"
+            )
+
+        return status
+
+    def run_array(
+        self, elements: list[list[list[str]]], options: dict = {}
+    ) -> list[SLURMJobStatus]:
+        """
+        Submit several tasks' commands as a single array job and wait for all of them
+        The statuses are returned in the same order as `elements`, failed elements don't raise
+        """
+        job_id = self.submit_array(elements, options)
+        futures = [self.watch(f"{job_id}_{i}", options) for i in range(len(elements))]
+        return [f.result() for f in futures]
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ):
+        """Call `func(*args, **kwargs)` in a job, pickled and run with the environment's python, and return the result"""
+        opts = self.options.copy()
+        opts.update(options)
+        opts["call_fp"] = self._call_fp(func, opts)
+
+        job_id = self._sbatch(
+            opts, self.swm.run_func(func, args, kwargs, opts), output=f"%x-%j.out"
+        )
+        status = self.watch(job_id, opts).result()
+        if not status.ok and not result_fp(opts["call_fp"]).exists():
+            raise RuntimeError(
+                f"SLURM job {job_id} ({opts.get('job_name', func.__name__)}) finished with state {status.state} (exit code {status.exit_code})"
+            )
+
+        return load_result(opts["call_fp"])
+
+
+class ECSRunner(AutobfxRunner):
+    def __init__(self, swm: AutobfxSoftwareManager, options: dict = {}):
+        self.name = "ecs"
+        self.work_pool_name = "ecs"
+        self.worker_type = "ecs"
+        self.swm = swm
+        self.options = options
+
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        opts = self.options.copy()
+        opts.update(options)
+
+        print("NOT IMPLEMENTED")
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ):
+        pass
+
+
+class CollectedCall:
+    """Stands in for the result of a func call collected as a command, until whatever ran the command has finished"""
+
+    def __init__(self, call_fp: Path):
+        self.call_fp = call_fp
+
+    def result(self):
+        return load_result(self.call_fp)
+
+
+class CollectingRunner(AutobfxRunner):
+    """
+    Records the commands a task would run instead of running them, so they can be handed off to run some other way
+    (e.g. as one element of a SLURM array job)
+    With `funcs`, func calls are pickled and collected as the command that runs them (see `autobfx.lib.remote`),
+    returning a `CollectedCall` for the result, otherwise they can't be collected
+    """
+
+    def __init__(self, runner: AutobfxRunner, funcs: bool = False):
+        self.name = "collecting"
+        self.work_pool_name = "default"
+        self.worker_type = "process"
+        self.swm = runner.swm
+        self.options = runner.options
+        self.funcs = funcs
+        self.cmds: list[list[str]] = []
+
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        self.cmds.append(cmd)
+        return 0
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ):
+        if not self.funcs:
+            raise NotImplementedError(
+                f"Can't collect func {func.__name__} as a command"
+            )
+        opts = self.options.copy()
+        opts.update(options)
+        call_fp = self._call_fp(func, opts)
+        dump_call(call_fp, func, args, kwargs)
+        # Whatever runs the commands puts this in the environment, like any other command
+        self.cmds.append(remote_cmd(call_fp, self.swm.python))
+        return CollectedCall(call_fp)
+
+
+# TODO: Make proper registries for these (and flows) for plugins to work with
+swm_map: dict[str, Type[AutobfxSoftwareManager]] = {
+    "none": NoManager,
+    "venv": VenvManager,
+    "conda": CondaManager,
+    "mamba": MambaManager,
+}
+
+
+runner_map: dict[str, Type[AutobfxRunner]] = {
+    "local": LocalRunner,
+    "dryrun": DryRunner,
+    "slurm": SLURMRunner,
+    "ecs": ECSRunner,
+}
+
+
+class TestRunner(AutobfxRunner):
+    def __init__(
+        self,
+        run_cmd: callable,
+        run_func: callable,
+        swm: AutobfxSoftwareManager = NoManager(),
+        options: dict = {},
+    ):
+        self.name = "test"
+        self._run_cmd = run_cmd
+        self._run_func = run_func
+        self.swm = swm
+        self.options = options
+
+    def run_cmd(self, cmd: list[str], options: dict = {}):
+        opts = self.options.copy()
+        opts.update(options)
+        return self._run_cmd(cmd, opts)
+
+    def run_func(
+        self, func: callable, args: list = [], kwargs: dict = {}, options: dict = {}
+    ):
+        opts = self.options.copy()
+        opts.update(options)
+        return self._run_func(func, args=args, kwargs=kwargs, options=opts)
@@ -0,0 +1,170 @@
+import argparse
+import gzip
+import itertools
+import json
+import math
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+from autobfx.lib.remote import SRC_DIR
+
+
+def chunk_count(size: int, chunk_mb: int = 2000, max_chunks: int = 32) -> int:
+    """How many chunks to split `size` bytes of (compressed) reads into so each is about `chunk_mb`"""
+    return max(1, min(math.ceil(size / (chunk_mb * 2**20)), max_chunks))
+
+
+def _open(fp: Path, mode: str):
+    if str(fp).endswith(".gz"):
+        # Chunks are only around until they're merged, so they aren't worth compressing hard
+        return gzip.open(fp, mode, compresslevel=1) if "w" in mode else gzip.open(fp)
+    return open(fp, mode)
+
+
+def split_fastq(
+    fps: list[Path], out_dir: Path, chunks: int, block: int = 10000
+) -> list[int]:
+    """
+    Split fastqs (R1 and R2 in lockstep) into `chunks` pieces each, written to `out_dir/<chunk>/<fastq name>`
+    Blocks of `block` reads are dealt to the chunks in turn, so the input is streamed once without knowing its length
+    Returns the number of reads in each chunk
+    """
+    counts = [0] * chunks
+    with ExitStack() as stack:
+        readers = [stack.enter_context(_open(fp, "rb")) for fp in fps]
+        writers = []
+        for i in range(chunks):
+            (Path(out_dir) / str(i)).mkdir(parents=True, exist_ok=True)
+            writers.append(
+                [
+                    stack.enter_context(
+                        _open(Path(out_dir) / str(i) / Path(fp).name, "wb")
+                    )
+                    for fp in fps
+                ]
+            )
+
+        for i in itertools.cycle(range(chunks)):
+            blocks = [list(itertools.islice(r, 4 * block)) for r in readers]
+            if any(len(b) != len(blocks[0]) for b in blocks) or len(blocks[0]) % 4:
+                raise ValueError(f"{fps} are truncated or have different read counts")
+            if not blocks[0]:
+                break
+            for w, b in zip(writers[i], blocks):
+                w.writelines(b)
+            counts[i] += len(blocks[0]) // 4
+
+    return counts
+
+
+def split_cmd(
+    fps: list[Path], out_dir: Path, chunks: int, python: str = "python"
+) -> list[str]:
+    """The command to run `split_fastq` with `python`, with this copy of autobfx importable"""
+    return [
+        f"PYTHONPATH={SRC_DIR}${{PYTHONPATH:+:$PYTHONPATH}}",
+        python,
+        "-m",
+        "autobfx.lib.scatter",
+        "split",
+        str(chunks),
+        str(out_dir),
+        *[str(fp) for fp in fps],
+    ]
+
+
+def _sum_counts(total: dict, counts: dict, fp: Path) -> dict:
+    for k, v in counts.items():
+        if isinstance(v, dict):
+            _sum_counts(total.setdefault(k, {}), v, fp)
+        elif isinstance(v, int) and not isinstance(v, bool):
+            total[k] = total.get(k, 0) + v
+        else:
+            raise ValueError(
+                f"{fp} has {k}: {v!r}, only JSON of integer counts can be merged by summing"
+            )
+    return total
+
+
+def merge_counts(out_fp: Path, chunk_fps: list[Path]) -> dict:
+    """Merge the chunks of a JSON output of (possibly nested) integer counts, e.g. reads per host, by summing them"""
+    total = {}
+    for fp in chunk_fps:
+        with open(fp) as f:
+            counts = json.load(f)
+        if not isinstance(counts, dict):
+            raise ValueError(f"{fp} isn't a JSON object of counts, it can't be merged")
+        _sum_counts(total, counts, fp)
+    with open(out_fp, "w") as f:
+        json.dump(total, f, indent=2)
+    return total
+
+
+def merge_cmd(
+    out_fp: Path, chunk_fps: list[Path], threads: int = 1, python: str = "python"
+) -> list[str]:
+    """
+    The command to merge the chunks of an output back together
+    - BAMs are merged with `samtools merge`, which keeps them sorted
+    - SAMs keep the header from the first chunk
+    - Fastqs (gzipped or not) are concatenated
+    - JSON is taken to be counts and summed with `merge_counts`, which fails on anything else
+    Raises a ValueError for anything else, there's no telling how it would merge
+    """
+    chunk_fps = [str(fp) for fp in chunk_fps]
+    if out_fp.suffix == ".json":
+        return [
+            f"PYTHONPATH={SRC_DIR}${{PYTHONPATH:+:$PYTHONPATH}}",
+            python,
+            "-m",
+            "autobfx.lib.scatter",
+            "merge_counts",
+            str(out_fp),
+            *chunk_fps,
+        ]
+    if out_fp.suffix == ".bam":
+        return ["samtools", "merge", "-f", "-@", str(threads), str(out_fp), *chunk_fps]
+    if out_fp.suffix == ".sam":
+        return [
+            "(",
+            "cat",
+            chunk_fps[0],
+            "&&",
+            "sed",
+            "'/^@/d'",
+            *chunk_fps[1:],
+            ")",
+            ">",
+            str(out_fp),
+        ]
+    if out_fp.name.endswith((".fastq", ".fq", ".fastq.gz", ".fq.gz")):
+        return ["cat", *chunk_fps, ">", str(out_fp)]
+    raise ValueError(
+        f"Can't merge chunks of {out_fp}, only BAM, SAM, fastq and JSON count outputs can be scattered"
+    )
+
+
+def main(argv: list[str] = sys.argv[1:]):
+    parser = argparse.ArgumentParser(
+        description="Split fastqs into chunks for autobfx to run a task on in parallel, and merge the outputs"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    split = subparsers.add_parser("split", help="Split fastqs into chunks")
+    split.add_argument("chunks", type=int)
+    split.add_argument("out_dir", type=Path, help="Chunk i goes to out_dir/i/")
+    split.add_argument("fastqs", type=Path, nargs="+", help="R1 (and R2)")
+    merge = subparsers.add_parser("merge_counts", help="Sum chunks of JSON counts")
+    merge.add_argument("out", type=Path)
+    merge.add_argument("chunks", type=Path, nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "merge_counts":
+        merge_counts(args.out, args.chunks)
+        return 0
+    counts = split_fastq(args.fastqs, args.out_dir, args.chunks)
+    print(f"Split {sum(counts)} reads into {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
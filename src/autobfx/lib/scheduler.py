@@ -0,0 +1,160 @@
+import bisect
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pydantic import BaseModel
+
+
+def total_mem_mb() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2**20
+    except (ValueError, OSError, AttributeError):
+        return 8000
+
+
+class SchedulerStats(BaseModel):
+    queued: int
+    running: int
+    cores_used: int
+    cores_total: int
+    mem_used_mb: int
+    mem_total_mb: int
+    # Average fraction of the cores in use since the scheduler started
+    utilization: float
+
+
+class ResourceScheduler:
+    """
+    Admits work on this machine against a budget of cores and memory
+    Waiting requests are admitted in priority order (then first come first served),
+    with smaller requests backfilling past bigger ones of the same priority that don't fit yet
+    Nothing of lower priority is admitted while a request is waiting though, so it gets the room it needs as soon as
+    running work finishes instead of being starved by a stream of small ones (e.g. `bwa mem -t 16` behind many fastqc jobs)
+    Requests bigger than the whole budget are shrunk to fit so they can still run, on their own
+    """
+
+    def __init__(self, cores: int = 0, mem_mb: int = 0):
+        self.cores = cores if cores else os.cpu_count() or 1
+        self.mem_mb = mem_mb if mem_mb else total_mem_mb()
+        self.cores_used = 0
+        self.mem_used_mb = 0
+        self.running = 0
+        # Sorted list of waiting requests as [-priority, arrival, cores, mem_mb, admitted]
+        self._queue: list[list] = []
+        self._arrivals = itertools.count()
+        self._cond = threading.Condition()
+        self._started = self._last = time.monotonic()
+        self._busy_core_s = 0.0
+
+    @classmethod
+    def shared(cls) -> "ResourceScheduler":
+        """Get the scheduler shared by everything running locally in this process"""
+        global _shared
+        with _shared_lock:
+            if _shared is None:
+                _shared = cls()
+            return _shared
+
+    @classmethod
+    def configure(cls, cores: int = 0, mem_mb: int = 0) -> "ResourceScheduler":
+        """Set the budget of the shared scheduler, 0 means everything the machine has"""
+        scheduler = cls.shared()
+        with scheduler._cond:
+            scheduler._tick()
+            scheduler.cores = cores if cores else os.cpu_count() or 1
+            scheduler.mem_mb = mem_mb if mem_mb else total_mem_mb()
+            scheduler._admit()
+            scheduler._cond.notify_all()
+        return scheduler
+
+    def _tick(self):
+        now = time.monotonic()
+        self._busy_core_s += min(self.cores_used, self.cores) * (now - self._last)
+        self._last = now
+
+    def _fits(self, cores: int, mem_mb: int) -> bool:
+        return (
+            self.cores_used + cores <= self.cores
+            and self.mem_used_mb + mem_mb <= self.mem_mb
+        )
+
+    def has_room(self, cores: int = 1, mem_mb: int = 0) -> bool:
+        """Whether a request for `cores` and `mem_mb` would start straight away"""
+        with self._cond:
+            return not self._queue and self._fits(
+                min(cores, self.cores), min(mem_mb, self.mem_mb)
+            )
+
+    def _admit(self):
+        # Called with the lock held
+        admitted = []
+        # The (negated) priority of the first request that didn't fit
+        waiting = None
+        for request in self._queue:
+            neg_priority, _, cores, mem_mb, _ = request
+            if waiting is not None and neg_priority > waiting:
+                # The queue is sorted, so everything from here on is lower priority
+                break
+            if self._fits(cores, mem_mb):
+                self.cores_used += cores
+                self.mem_used_mb += mem_mb
+                self.running += 1
+                request[4] = True
+                admitted.append(request)
+            elif waiting is None:
+                waiting = neg_priority
+        if admitted:
+            self._queue = [r for r in self._queue if not r[4]]
+
+    def acquire(self, cores: int = 1, mem_mb: int = 0, priority: float = 0) -> tuple:
+        """Block until there's room for `cores` and `mem_mb`, returning what was reserved (to pass to `release`)"""
+        cores = max(0, min(cores, self.cores))
+        mem_mb = max(0, min(mem_mb, self.mem_mb))
+        request = [-priority, next(self._arrivals), cores, mem_mb, False]
+        with self._cond:
+            self._tick()
+            bisect.insort(self._queue, request)
+            self._admit()
+            self._cond.notify_all()
+            while not request[4]:
+                self._cond.wait()
+        return cores, mem_mb
+
+    def release(self, cores: int, mem_mb: int):
+        with self._cond:
+            self._tick()
+            self.cores_used -= cores
+            self.mem_used_mb -= mem_mb
+            self.running -= 1
+            self._admit()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, cores: int = 1, mem_mb: int = 0, priority: float = 0):
+        reserved = self.acquire(cores, mem_mb, priority)
+        try:
+            yield self
+        finally:
+            self.release(*reserved)
+
+    def stats(self) -> SchedulerStats:
+        with self._cond:
+            self._tick()
+            elapsed = self._last - self._started
+            return SchedulerStats(
+                queued=len(self._queue),
+                running=self.running,
+                cores_used=self.cores_used,
+                cores_total=self.cores,
+                mem_used_mb=self.mem_used_mb,
+                mem_total_mb=self.mem_mb,
+                utilization=(
+                    self._busy_core_s / (elapsed * self.cores) if elapsed > 0 else 0.0
+                ),
+            )
+
+
+_shared: ResourceScheduler = None
+_shared_lock = threading.Lock()
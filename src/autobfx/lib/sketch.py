@@ -0,0 +1,149 @@
+import gzip
+import itertools
+import json
+import numpy as np
+from pathlib import Path
+
+
+# A/C/G/T (either case) to 0-3, anything else (N, IUPAC codes, newlines) to 4
+_CODES = np.full(256, 4, dtype=np.uint8)
+for i, bases in enumerate([b"Aa", b"Cc", b"Gg", b"Tt"]):
+    _CODES[list(bases)] = i
+
+# Bases of a FASTA record hashed at a time, bounding memory for chromosome sized records
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    # splitmix64's finalizer, so packed k-mers are spread evenly over the 64 bit range
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def kmer_hashes(seq: bytes, k: int = 21) -> np.ndarray:
+    """
+    Hashes of the canonical k-mers (the lesser of each k-mer and its reverse complement) in `seq`
+    K-mers with anything other than ACGT in them are skipped, so sequences can be joined with an N between them
+    """
+    if not 0 < k <= 32:
+        raise ValueError(f"k must be between 1 and 32, not {k}")
+    codes = _CODES[np.frombuffer(seq, dtype=np.uint8)]
+    n = len(codes) - k + 1
+    if n < 1:
+        return np.empty(0, dtype=np.uint64)
+
+    invalid = np.concatenate(([0], np.cumsum(codes > 3)))
+    ok = invalid[k:] == invalid[:n]
+    bases = np.minimum(codes, 3).astype(np.uint64)
+    fw = np.zeros(n, dtype=np.uint64)
+    rc = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        fw = (fw << np.uint64(2)) | bases[j : j + n]
+        rc |= (np.uint64(3) - bases[j : j + n]) << np.uint64(2 * j)
+
+    return _mix(np.minimum(fw, rc)[ok])
+
+
+def downsample(hashes: np.ndarray, scale: int) -> np.ndarray:
+    """Keep the unique hashes below 2^64 / `scale` (FracMinHash), about one in every `scale`"""
+    return np.unique(hashes[hashes <= np.uint64((2**64 - 1) // scale)])
+
+
+def _open(fp: Path):
+    return gzip.open(fp) if str(fp).endswith(".gz") else open(fp, "rb")
+
+
+def sketch_fasta(fp: Path, k: int = 21, scale: int = 1000) -> np.ndarray:
+    """The downsampled k-mer hashes of every record in a (gzipped) FASTA, streamed `CHUNK_SIZE` bases at a time"""
+    sketches, buf, size = [], [], 0
+
+    def flush(carry: bool) -> list[bytes]:
+        seq = b"".join(buf)
+        if len(seq) >= k:
+            sketches.append(downsample(kmer_hashes(seq, k), scale))
+        # The last k - 1 bases start k-mers that end in the next chunk
+        return [seq[-(k - 1) :]] if carry and k > 1 else []
+
+    with _open(fp) as f:
+        for line in f:
+            if line.startswith(b">"):
+                buf, size = flush(False), 0
+                continue
+            buf.append(line.rstrip())
+            size += len(buf[-1])
+            if size >= CHUNK_SIZE:
+                buf = flush(True)
+                size = len(buf[0]) if buf else 0
+        flush(False)
+
+    return np.unique(np.concatenate(sketches)) if sketches else np.empty(0, np.uint64)
+
+
+def build_sketch(fasta_fp: Path, out_fp: Path, k: int = 21, scale: int = 1000) -> dict:
+    """Sketch a host FASTA to `out_fp` (.npz), returning a summary of it"""
+    hashes = sketch_fasta(fasta_fp, k, scale)
+    Path(out_fp).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_fp, "wb") as f:
+        np.savez(f, hashes=hashes, k=k, scale=scale)
+    return {"hashes": len(hashes), "k": k, "scale": scale}
+
+
+def load_sketch(fp: Path) -> tuple[np.ndarray, int, int]:
+    """A sketch's hashes, k and scale"""
+    with np.load(fp) as sketch:
+        return sketch["hashes"], int(sketch["k"]), int(sketch["scale"])
+
+
+def sample_reads(fps: list[Path], n_reads: int = 100000) -> bytes:
+    """The sequences of the first `n_reads` reads of each fastq (R1 and R2), joined by Ns"""
+    seqs = []
+    for fp in fps:
+        with _open(fp) as f:
+            seqs += [line.rstrip() for line in itertools.islice(f, 1, 4 * n_reads, 4)]
+    return b"N".join(seqs)
+
+
+def screen_reads(
+    read_fps: list[Path],
+    sketch_fps: dict[str, Path],
+    out_fp: Path,
+    n_reads: int = 100000,
+    min_containment: float = 0.001,
+) -> dict:
+    """
+    Estimate how much of a sample's read k-mers are contained in each host's sketch, from a subsample of its reads,
+    and write the results to `out_fp` as JSON
+    Hosts below `min_containment` are listed under "screened_out", unless the subsample was too small to say anything
+    """
+    seqs = sample_reads(read_fps, n_reads)
+    sampled: dict[tuple[int, int], np.ndarray] = {}
+    results = {"hosts": {}, "screened_out": []}
+    for host, sketch_fp in sketch_fps.items():
+        sketch, k, scale = load_sketch(sketch_fp)
+        if (k, scale) not in sampled:
+            sampled[(k, scale)] = downsample(kmer_hashes(seqs, k), scale)
+        hashes = sampled[(k, scale)]
+
+        shared = int(np.isin(hashes, sketch, assume_unique=True).sum())
+        containment = shared / len(hashes) if len(hashes) else None
+        results["hosts"][host] = {
+            "containment": containment,
+            "shared": shared,
+            "sampled": len(hashes),
+        }
+        if containment is not None and containment < min_containment:
+            results["screened_out"].append(host)
+
+    Path(out_fp).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_fp, "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+
+def screened_out(screen_fp: Path, host: str) -> bool:
+    """Whether `screen_reads` screened `host` out of a sample"""
+    with open(screen_fp) as f:
+        return host in json.load(f)["screened_out"]
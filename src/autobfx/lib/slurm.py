@@ -0,0 +1,146 @@
+import subprocess
+import threading
+from concurrent.futures import Future
+from pydantic import BaseModel
+
+
+TERMINAL_STATES = {
+    "BOOT_FAIL",
+    "CANCELLED",
+    "COMPLETED",
+    "DEADLINE",
+    "FAILED",
+    "NODE_FAIL",
+    "OUT_OF_MEMORY",
+    "PREEMPTED",
+    "TIMEOUT",
+}
+
+
+class SLURMJobStatus(BaseModel):
+    job_id: str
+    state: str
+    exit_code: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.state == "COMPLETED"
+
+
+class SLURMJobMonitor:
+    """
+    Tracks the state of outstanding SLURM jobs with a single `sacct` call per interval for all of them
+    Anything waiting on a job gets a future that resolves to its SLURMJobStatus once the job reaches a terminal state
+    The polling thread only runs while there are jobs to watch
+    """
+
+    def __init__(self, sacct_cmd: str = "sacct", interval: float = 15):
+        self.sacct_cmd = sacct_cmd
+        self.interval = interval
+        self._jobs: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread = None
+
+    @classmethod
+    def shared(
+        cls, sacct_cmd: str = "sacct", interval: float = 15
+    ) -> "SLURMJobMonitor":
+        """Get the monitor shared by everything in this process using `sacct_cmd`"""
+        with _monitors_lock:
+            try:
+                monitor = _monitors[sacct_cmd]
+            except KeyError:
+                monitor = cls(sacct_cmd, interval)
+                _monitors[sacct_cmd] = monitor
+            # Use the most frequent interval anyone has asked for
+            monitor.interval = min(monitor.interval, interval)
+            return monitor
+
+    def watch(self, job_id: str) -> Future:
+        """Start watching a job (array elements are given as '<job>_<index>')"""
+        job_id = str(job_id)
+        with self._lock:
+            future = self._jobs.get(job_id)
+            if future is None:
+                future = Future()
+                self._jobs[job_id] = future
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="slurm-monitor", daemon=True
+                )
+                self._thread.start()
+        return future
+
+    def wait(self, job_id: str) -> SLURMJobStatus:
+        return self.watch(job_id).result()
+
+    def _sacct(self, job_ids: list[str]) -> str:
+        return subprocess.run(
+            [
+                self.sacct_cmd,
+                "-X",
+                "-n",
+                "-P",
+                "-j",
+                # Array elements are queried through their array job so a 5000 element array is one short id
+                ",".join(dict.fromkeys(j.split("_")[0] for j in job_ids)),
+                "--format=JobID,State,ExitCode",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    @staticmethod
+    def parse(sacct_output: str) -> dict[str, SLURMJobStatus]:
+        """Parse `sacct -n -P --format=JobID,State,ExitCode` output"""
+        statuses = {}
+        for line in sacct_output.splitlines():
+            fields = line.strip().split("|")
+            if len(fields) < 2 or "." in fields[0]:
+                # Skip blank lines and job steps (e.g. 1234.batch)
+                continue
+            # States can have trailing info e.g. 'CANCELLED by 1000'
+            statuses[fields[0]] = SLURMJobStatus(
+                job_id=fields[0],
+                state=fields[1].split()[0] if fields[1].split() else "",
+                exit_code=fields[2] if len(fields) > 2 else "",
+            )
+        return statuses
+
+    def poll(self):
+        """Query every outstanding job at once and resolve the futures of any that have finished"""
+        with self._lock:
+            job_ids = list(self._jobs.keys())
+        if not job_ids:
+            return
+
+        try:
+            statuses = self.parse(self._sacct(job_ids))
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error checking job status: {e}")
+            return
+
+        # Pending array jobs are listed as e.g. '1234_[0-99]' until their elements start
+        for job_id in job_ids:
+            status = statuses.get(job_id)
+            if status and status.state in TERMINAL_STATES:
+                with self._lock:
+                    future = self._jobs.pop(job_id)
+                future.set_result(status)
+
+    def _run(self):
+        # Jobs that were just submitted won't be done yet, so wait an interval before the first poll
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.poll()
+            with self._lock:
+                if not self._jobs:
+                    self._thread = None
+                    return
+
+
+_monitors: dict[str, SLURMJobMonitor] = {}
+_monitors_lock = threading.Lock()
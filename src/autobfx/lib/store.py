@@ -0,0 +1,232 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+
+# SQLite's default limit on variables in a single statement is 999 on older versions
+BATCH_SIZE = 900
+# Status of outputs a task skipped making because a screen found nothing for it to do (see AutobfxTask)
+SCREENED_OUT = "screened_out"
+# Status of outputs that were only ever on scratch or in a named pipe inside a fused chain (see AutobfxTaskChain)
+TRANSIENT = "transient"
+
+
+def _to_json(o):
+    # Runner options hold pydantic models (RunnerConfig) and Paths
+    if hasattr(o, "model_dump"):
+        return o.model_dump(mode="json")
+    return str(o)
+
+
+class CompletionStore:
+    """
+    Per-project record of completed task outputs, replacing the `.<output>.done` marker files
+    Lives at `<project>/.autobfx/autobfx.db` and records, for every output, the task that made it, the task ids,
+    the command, the runner options, the input fingerprints and when it started and finished
+    """
+
+    def __init__(self, db_fp: Path):
+        self.db_fp = Path(db_fp)
+        self.db_fp.parent.mkdir(parents=True, exist_ok=True)
+
+        # One connection shared between task threads, guarded by the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.db_fp, check_same_thread=False, isolation_level=None, timeout=60
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outputs (
+                fp TEXT PRIMARY KEY,
+                task TEXT NOT NULL,
+                ids TEXT NOT NULL,
+                cmd TEXT,
+                options TEXT,
+                inputs TEXT,
+                status TEXT NOT NULL,
+                started REAL,
+                finished REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outputs_task ON outputs (task)")
+        # Content digests of files keyed by their size and mtime, so files are only rehashed when they change
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                fp TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            )
+            """
+        )
+
+    @classmethod
+    def for_project(cls, project_fp: Path) -> "CompletionStore":
+        """Get the (shared) store for a project"""
+        project_fp = Path(project_fp).resolve()
+        with _stores_lock:
+            try:
+                return _stores[project_fp]
+            except KeyError:
+                store = cls(project_fp / ".autobfx" / "autobfx.db")
+                _stores[project_fp] = store
+                return store
+
+    def _select(
+        self, fps: Iterable[Path | str], columns: str, table: str = "outputs"
+    ) -> list[tuple]:
+        fps = [str(fp) for fp in fps]
+        rows = []
+        with self._lock:
+            for i in range(0, len(fps), BATCH_SIZE):
+                batch = fps[i : i + BATCH_SIZE]
+                rows += self._conn.execute(
+                    f"SELECT {columns} FROM {table} WHERE fp IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+        return rows
+
+    def completed(self, fps: Iterable[Path | str]) -> set[str]:
+        """Which of `fps` are recorded as complete, in as few queries as possible"""
+        return {fp for (fp,) in self._select(fps, "fp")}
+
+    def get(self, fps: Iterable[Path | str]) -> dict[str, dict]:
+        """The full records for any of `fps` that have one"""
+        return {
+            fp: {
+                "task": task,
+                "ids": json.loads(ids),
+                "cmd": json.loads(cmd) if cmd else None,
+                "options": json.loads(options) if options else None,
+                "inputs": json.loads(inputs) if inputs else {},
+                "status": status,
+                "started": started,
+                "finished": finished,
+            }
+            for fp, task, ids, cmd, options, inputs, status, started, finished in self._select(
+                fps, "fp, task, ids, cmd, options, inputs, status, started, finished"
+            )
+        }
+
+    def runtimes(self, task: str, limit: int = 1000) -> list[float]:
+        """Wall times in seconds of the most recent completed runs of `task`"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT MAX(finished - started) FROM outputs
+                WHERE task = ? AND started IS NOT NULL AND status IN (?, ?)
+                GROUP BY ids ORDER BY MAX(finished) DESC LIMIT ?
+                """,
+                (task, "completed", TRANSIENT, limit),
+            ).fetchall()
+        return [r for (r,) in rows]
+
+    def record(
+        self,
+        task: str,
+        ids: dict[str, str],
+        outputs: Iterable[Path | str],
+        cmd: list[str] | str = None,
+        options: dict = {},
+        inputs: dict[str, list] = {},
+        started: float = None,
+        finished: float = None,
+        status: str = "completed",
+    ):
+        """Mark `outputs` as complete, overwriting any previous records for them"""
+        finished = finished if finished else time.time()
+        row = (
+            task,
+            json.dumps(ids),
+            json.dumps(cmd, default=_to_json),
+            json.dumps(options, default=_to_json),
+            json.dumps(inputs),
+            status,
+            started,
+            finished,
+        )
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(str(fp), *row) for fp in outputs],
+            )
+            self._conn.execute("COMMIT")
+
+    def remove(self, fps: Iterable[Path | str]):
+        fps = [str(fp) for fp in fps]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for i in range(0, len(fps), BATCH_SIZE):
+                batch = fps[i : i + BATCH_SIZE]
+                self._conn.execute(
+                    f"DELETE FROM outputs WHERE fp IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            self._conn.execute("COMMIT")
+
+    def digests(self, fps: Iterable[Path | str]) -> dict[str, list]:
+        """Cached [size, mtime_ns, digest] for any of `fps` that have been hashed before"""
+        return {
+            fp: [size, mtime_ns, digest]
+            for fp, size, mtime_ns, digest in self._select(
+                fps, "fp, size, mtime_ns, digest", table="fingerprints"
+            )
+        }
+
+    def set_digests(self, fingerprints: dict[str, list]):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)",
+                [(fp, *f) for fp, f in fingerprints.items() if f and f[2]],
+            )
+            self._conn.execute("COMMIT")
+
+    def import_done_files(
+        self, outputs: Iterable[tuple[str, dict[str, str], Path]]
+    ) -> int:
+        """
+        Import the `.<output>.done` marker files older versions wrote next to `outputs`, given as (task name, task ids, output),
+        returning how many were imported
+        Flows call this for the outputs they plan on that don't have a record yet, so only those directories are looked in
+        """
+        n = 0
+        for task, ids, fp in outputs:
+            fp = Path(fp)
+            done_fp = fp.parent / f".{fp.name}.done"
+            options, cmd = {}, None
+            try:
+                # Marker files hold the runner options as json followed by a 'cmd: ...' line
+                text = done_fp.read_text()
+                finished = done_fp.stat().st_mtime
+            except OSError:
+                continue
+            try:
+                head, _, tail = text.partition("\ncmd: ")
+                options = json.loads(head) if head.strip() else {}
+                cmd = tail.strip() if tail else None
+            except ValueError:
+                pass
+
+            self.record(
+                task=task,
+                ids=ids,
+                outputs=[fp],
+                cmd=cmd,
+                options=options,
+                finished=finished,
+                status="imported",
+            )
+            n += 1
+
+        return n
+
+
+_stores: dict[Path, CompletionStore] = {}
+_stores_lock = threading.Lock()
@@ -1,156 +1,866 @@
-import json
-from pathlib import Path
-from prefect import tags, task
-from pydantic import BaseModel
-from typing import Callable
-from autobfx.lib.io import IOObject, IOReads
-from autobfx.lib.runner import AutobfxRunner, DryRunner, LocalRunner, NoManager
-
-
-class AutobfxTaskDefinition(BaseModel):
-    """
-    Represents a task definition that hasn't been expanded over any iterators yet.
-    """
-
-    name: str
-    func: Callable
-
-
-class AutobfxTask:
-    """
-    A class to represent a task to be executed by autobfx.
-    """
-
-    def __init__(
-        self,
-        name: str,
-        ids: dict[str, str],
-        func: Callable,
-        project_fp: Path,
-        input_reads: list[IOReads] = [],
-        extra_inputs: dict[str, list[IOObject]] = {},
-        output_reads: list[IOReads] = [],
-        extra_outputs: dict[str, list[IOObject]] = {},
-        log_fp: Path = Path(),
-        runner: AutobfxRunner = LocalRunner(swm=NoManager()),
-        args: list = [],
-        kwargs: dict = {},
-    ):
-        self.name = name  # The task name e.g. "trimmomatic"
-        self.id_dict = ids  # A dictionary of identifiers for the task run e.g. {"sample_name": "sample1", "host_name": "host1"}
-        self.ids = tuple(
-            ids.values()
-        )  # A hashable form of the task ids e.g. (sample_name) or (sample_name, host_name)
-        self._func = func
-        self.project_fp = project_fp
-        self.input_reads = input_reads
-        self.extra_inputs = extra_inputs
-        self.inputs = self.input_reads + [
-            i for ioo in self.extra_inputs.values() for i in ioo
-        ]
-        self.output_reads = output_reads
-        self.extra_outputs = extra_outputs
-        self.outputs = self.output_reads + [
-            i for ioo in self.extra_outputs.values() for i in ioo
-        ]
-        # submission is the Promise that is returned by submitting a task
-        # this is used for dependent tasks to wait on the completion of this task
-        self.submission = None
-        self.log_fp = log_fp
-        self.runner = runner
-        self.runner.options["job_name"] = f"{self.name}_{'_'.join(self.ids)}"
-        self.dryrun = True if isinstance(self.runner, DryRunner) else False
-        self.args = args
-        self.kwargs = kwargs
-
-        @task(name=self.runner.options["job_name"])
-        def _runner_func():
-            cmd = self._func(
-                self.input_reads,
-                self.extra_inputs,
-                self.output_reads,
-                self.extra_outputs,
-                self.log_fp,
-                self.runner,
-                *self.args,
-                **self.kwargs,
-            )
-
-            if not self.dryrun:
-                for o in self.outputs:
-                    with open(o.done_fp, "w") as f:
-                        # TODO: Write enough config here to make the step fully reproducible
-                        json.dump(self.runner.options, f, default=vars)
-                        f.write(f"\ncmd: {cmd}")
-
-            return cmd
-
-        self._runner_func = _runner_func
-
-    def __hash__(self):
-        return hash((self.name, self.ids))
-
-    def __eq__(self, other):
-        return hash(self) == hash(other)
-
-    def _check(self) -> bool:
-        # Will probably want to raise this to the flow level once we figure out more better flow abstraction
-        # E.g. checking input files from an S3 bucket for 100 samples
-        if not all(i.check() for i in self.inputs):
-            print(
-                f"{[i for i in self.inputs if not i.check()]} missing but required for {self.name}: {self.ids}"
-            )
-            return False
-
-        if any(o.done_fp.exists() for o in self.outputs):
-            if all(o.done_fp.exists() for o in self.outputs):
-                print(
-                    f"Task run already completed by {[o.done_fp for o in self.outputs]}"
-                )
-                return False
-            else:
-                print(
-                    f"Task run marked as partially completed by {[o.done_fp for o in self.outputs if o.done_fp.exists()]}, rerunning to generate all outputs"
-                )
-
-        return True
-
-    def _setup_run(self):
-        # TODO: Probably need a step here to remove stale outputs before creating empty dirs
-        # avoid problems with tools that don't like overwriting existing files (e.g. megahit)
-        for o in self.outputs:
-            if not o.fp.parent.exists():
-                o.fp.parent.mkdir(parents=True)
-
-        if not self.log_fp.parent.exists():
-            self.log_fp.parent.mkdir(parents=True)
-
-    def run(self):
-        """Ignore dependencies and run the task"""
-        if not self.dryrun:
-            if not self._check():
-                return None
-
-            self._setup_run()
-
-        with tags(self.name, *self.ids):
-            return self._runner_func()
-
-    def submit(self, dependencies: list["AutobfxTask"] = []):
-        """Submit the task for execution, submitting any dependencies first"""
-        if not self.dryrun:
-            if not self._check():
-
-                class AlreadyDone:
-                    def result(self):
-                        return None
-
-                return AlreadyDone()
-
-            self._setup_run()
-
-        with tags(self.name, *self.ids):
-            self.submission = self._runner_func.submit(
-                wait_for=[d.submission for d in dependencies]
-            )
-            return self.submission
+import copy
+import re
+import shlex
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from prefect import allow_failure, tags, task
+from pydantic import BaseModel
+from typing import Callable
+from autobfx.lib.fingerprint import changed, fingerprint
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.runner import (
+    AutobfxRunner,
+    CollectedCall,
+    CollectingRunner,
+    DryRunner,
+    LocalRunner,
+    NoManager,
+)
+from autobfx.lib.scatter import chunk_count, merge_cmd, split_cmd
+from autobfx.lib.store import SCREENED_OUT, TRANSIENT, CompletionStore
+
+
+class AutobfxTaskDefinition(BaseModel):
+    """
+    Represents a task definition that hasn't been expanded over any iterators yet.
+    """
+
+    name: str
+    func: Callable
+
+
+class AutobfxTask:
+    """
+    A class to represent a task to be executed by autobfx.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ids: dict[str, str],
+        func: Callable,
+        project_fp: Path,
+        input_reads: list[IOReads] = [],
+        extra_inputs: dict[str, list[IOObject]] = {},
+        output_reads: list[IOReads] = [],
+        extra_outputs: dict[str, list[IOObject]] = {},
+        log_fp: Path = Path(),
+        runner: AutobfxRunner = LocalRunner(swm=NoManager()),
+        args: list = [],
+        kwargs: dict = {},
+        screen: Callable[[], bool] = None,
+        drop_screened: bool = False,
+    ):
+        self.name = name  # The task name e.g. "trimmomatic"
+        self.id_dict = ids  # A dictionary of identifiers for the task run e.g. {"sample_name": "sample1", "host_name": "host1"}
+        self.ids = tuple(
+            ids.values()
+        )  # A hashable form of the task ids e.g. (sample_name) or (sample_name, host_name)
+        self._func = func
+        self.project_fp = project_fp
+        self.input_reads = input_reads
+        self.extra_inputs = self._to_io_objects(extra_inputs)
+        self.inputs = self.input_reads + [
+            i for ioo in self.extra_inputs.values() for i in ioo
+        ]
+        self.output_reads = output_reads
+        self.extra_outputs = self._to_io_objects(extra_outputs)
+        self.outputs = self.output_reads + [
+            i for ioo in self.extra_outputs.values() for i in ioo
+        ]
+        # submission is the Promise that is returned by submitting a task
+        # this is used for dependent tasks to wait on the completion of this task
+        self.submission = None
+        self.log_fp = log_fp
+        # Flows share one runner between all their tasks, so each task gets its own copy for its task specific options
+        self.runner = copy.copy(runner)
+        self.runner.options = {
+            **runner.options,
+            "job_name": f"{self.name}_{'_'.join(self.ids)}",
+            "log_fp": log_fp if log_fp.name else None,
+        }
+        self.dryrun = True if isinstance(self.runner, DryRunner) else False
+        self.args = args
+        self.kwargs = kwargs
+        # Called once the dependencies have finished, the task is screened out if it returns True
+        self.screen = screen
+        # Go without inputs that were screened out upstream instead of being screened out as well
+        self.drop_screened = drop_screened
+        self.dropped: set[str] = set()
+
+        @task(name=self.runner.options["job_name"])
+        def _runner_func(recheck: bool = False, fingerprint_method: str = "stat"):
+            if not self.dryrun and not self._ready(recheck, fingerprint_method):
+                return None
+
+            started = time.time()
+            chunks = self._chunks()
+            cmd = self._scatter(chunks) if chunks > 1 else self._call(self.runner)
+
+            if not self.dryrun:
+                self._record(cmd, fingerprint_method, started)
+
+            return cmd
+
+        self._runner_func = _runner_func
+
+    def _ready(self, recheck: bool = False, fingerprint_method: str = "stat") -> bool:
+        """
+        Check that the task can run once its dependencies have finished, and if rechecking, that it still needs to
+        Inputs made by upstream tasks only exist once those have finished, so this can't be done on submission
+        """
+        if self._screened_out(fingerprint_method):
+            return False
+        missing = [i for i in self.inputs if not i.check() and not self._dropped(i)]
+        if missing:
+            raise FileNotFoundError(
+                f"{[i.fp for i in missing]} missing but required for {self.name}: {self.ids}"
+            )
+        if recheck and not self.changed_inputs(fingerprint_method):
+            print(f"Inputs unchanged since last run, skipping {self.name}: {self.ids}")
+            return False
+
+        return True
+
+    def _screened_out(self, fingerprint_method: str = "stat") -> bool:
+        """
+        Check whether the task's `screen` says there's nothing for it to do, or an input it needs was screened out upstream
+        If so, its outputs are recorded as screened out instead of made, so downstream tasks and resumes skip them too
+        """
+        self.dropped = set()
+        missing = [p for p in self.input_paths() if not p.exists()]
+        if missing:
+            records = self.store.get(missing)
+            # A screen only holds for the inputs it was made from, once they change the upstream task has to screen again
+            screened = {
+                fp
+                for fp, r in records.items()
+                if r["status"] == SCREENED_OUT
+                and not changed(
+                    r["inputs"],
+                    fingerprint(list(r["inputs"]), fingerprint_method, self.store),
+                )
+            }
+            if screened and self.drop_screened:
+                self.dropped = screened
+                return False
+        else:
+            screened = bool(self.screen and self.screen())
+        if not screened:
+            return False
+
+        print(f"Screened out {self.name}: {self.ids}")
+        self._record(
+            None,
+            fingerprint_method,
+            transient=set(map(str, missing)),
+            status=SCREENED_OUT,
+        )
+        return True
+
+    def _dropped(self, i: IOObject) -> bool:
+        return all(str(p) in self.dropped for p in i.paths())
+
+    def _call(self, runner: AutobfxRunner):
+        return self._func(
+            [i for i in self.input_reads if not self._dropped(i)],
+            {
+                k: [i for i in v if not self._dropped(i)]
+                for k, v in self.extra_inputs.items()
+            },
+            self.output_reads,
+            self.extra_outputs,
+            self.log_fp,
+            runner,
+            *self.args,
+            **self.kwargs,
+        )
+
+    def _chunks(self) -> int:
+        """
+        How many chunks to split the task's input reads into, from `scatter` in the runner parameters
+        "auto" goes by the size of the reads, aiming for `chunk_mb` (default 2000) per chunk up to `max_chunks` (default 32)
+        """
+        params = self.runner.options.get("params")
+        scatter = params.parameters.get("scatter") if params else None
+        if not scatter or not self.input_reads or self.dryrun:
+            return 1
+        if scatter == "auto":
+            return chunk_count(
+                sum(p.stat().st_size for p in self.input_reads[0].paths()),
+                params.parameters.get("chunk_mb", 2000),
+                params.parameters.get("max_chunks", 32),
+            )
+        return int(scatter)
+
+    def _scatter(self, chunks: int) -> dict:
+        """
+        Run the task on `chunks` pieces of its first input reads at once, then merge each output back together
+        The pieces are written under .autobfx/chunks in the project and removed once the outputs are merged
+        Only the task's own outputs are recorded, so to the rest of the flow it's the same as running it in one go
+        """
+        params = self.runner.options["params"]
+        job_name = self.runner.options["job_name"]
+        chunk_dir = self.project_fp / ".autobfx" / "chunks" / job_name
+        reads = self.input_reads[0]
+        python = params.parameters.get("python", sys.executable)
+        outputs = [p for o in self.outputs for p in o.paths()]
+        # Before splitting anything, so outputs that can't be merged fail straight away
+        merges = [
+            merge_cmd(
+                p,
+                [chunk_dir / "out" / str(i) / str(j) / p.name for i in range(chunks)],
+                params.threads,
+                python,
+            )
+            for j, p in enumerate(outputs)
+        ]
+        split = split_cmd(reads.paths(), chunk_dir / "in", chunks, python)
+        self.runner.run_cmd(split)
+
+        def run_chunk(i: int):
+            moved = {
+                p: chunk_dir / "out" / str(i) / str(j) / p.name
+                for j, p in enumerate(outputs)
+            }
+            for fp in moved.values():
+                fp.parent.mkdir(parents=True, exist_ok=True)
+
+            def chunk(o: IOObject) -> IOObject:
+                if isinstance(o, IOReads):
+                    return IOReads(moved[o.fp], moved[o.r2] if o.r2 else None)
+                return IOObject(moved[o.fp])
+
+            runner = copy.copy(self.runner)
+            log_fp = (
+                self.log_fp.with_name(f"{self.log_fp.stem}.chunk{i}.log")
+                if self.log_fp.name
+                else self.log_fp
+            )
+            runner.options = {
+                **self.runner.options,
+                "job_name": f"{job_name}_chunk{i}",
+                "log_fp": log_fp if log_fp.name else None,
+            }
+            return self._func(
+                [
+                    IOReads(
+                        *[chunk_dir / "in" / str(i) / p.name for p in reads.paths()]
+                    ),
+                    *self.input_reads[1:],
+                ],
+                self.extra_inputs,
+                [chunk(o) for o in self.output_reads],
+                {k: [chunk(o) for o in v] for k, v in self.extra_outputs.items()},
+                log_fp,
+                runner,
+                *self.args,
+                **self.kwargs,
+            )
+
+        with ThreadPoolExecutor(max_workers=chunks) as pool:
+            chunk_cmds = list(pool.map(run_chunk, range(chunks)))
+
+        for merge in merges:
+            self.runner.run_cmd(merge)
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+        return {"split": split, "chunks": chunk_cmds, "merge": merges}
+
+    def _collect(self, funcs: bool = False) -> tuple[object, list[list[str]]]:
+        """
+        Call the task function without running anything, returning its result and the commands it would have run
+        With `funcs`, func calls are collected as commands too and the result is a `CollectedCall` if the function
+        returns one, see `CollectingRunner`
+        """
+        collector = CollectingRunner(self.runner, funcs)
+        return self._call(collector), collector.cmds
+
+    def _record(
+        self,
+        cmd,
+        fingerprint_method: str = "stat",
+        started: float = None,
+        transient: set[str] = set(),
+        status: str = "completed",
+    ):
+        """
+        `transient` files were only ever on scratch (or never made), as inputs they're recorded with an empty fingerprint
+        and as outputs they're recorded as transient so later runs don't expect to find them
+        """
+        # TODO: Write enough config here to make the step fully reproducible
+        inputs = self.input_fingerprints(fingerprint_method)
+        inputs.update((fp, []) for fp in transient | self.dropped if fp in inputs)
+        outputs = [o.fp for o in self.outputs]
+        if status == "completed":
+            kept = [fp for fp in outputs if str(fp) not in transient]
+            statuses = [
+                (kept, status),
+                ([fp for fp in outputs if fp not in kept], TRANSIENT),
+            ]
+        else:
+            statuses = [(outputs, status)]
+        for fps, s in statuses:
+            if fps:
+                self.store.record(
+                    task=self.name,
+                    ids=self.id_dict,
+                    outputs=fps,
+                    cmd=cmd,
+                    options=self.runner.options,
+                    inputs=inputs,
+                    started=started,
+                    status=s,
+                )
+
+    def _done(self, records: dict[str, dict]) -> bool:
+        """
+        Whether all the task's outputs are recorded in `records` and still there
+        Outputs that were screened out or only ever transient aren't expected to exist
+        """
+        return all(
+            str(o.fp) in records
+            and (records[str(o.fp)]["status"] in (SCREENED_OUT, TRANSIENT) or o.check())
+            for o in self.outputs
+        )
+
+    def _import_done_files(self, records: dict[str, dict]) -> dict[str, dict]:
+        """Import any old `.<output>.done` markers for outputs without records, returning the updated records"""
+        unrecorded = [o.fp for o in self.outputs if str(o.fp) not in records]
+        if unrecorded and self.store.import_done_files(
+            (self.name, self.id_dict, fp) for fp in unrecorded
+        ):
+            records = {**records, **self.store.get(unrecorded)}
+        return records
+
+    @staticmethod
+    def _to_io_objects(
+        io: dict[str, list[IOObject | Path | str]]
+    ) -> dict[str, list[IOObject]]:
+        return {
+            k: [i if isinstance(i, IOObject) else IOObject(i) for i in v]
+            for k, v in io.items()
+        }
+
+    @property
+    def store(self) -> CompletionStore:
+        return CompletionStore.for_project(self.project_fp)
+
+    def input_paths(self) -> list[Path]:
+        return [p for i in self.inputs for p in i.paths()]
+
+    def input_fingerprints(self, method: str = "stat") -> dict[str, list | None]:
+        return fingerprint(self.input_paths(), method, self.store)
+
+    def recorded_inputs(self, records: dict[str, dict] = None) -> dict[str, list]:
+        """The input fingerprints recorded when this task's outputs were last completed"""
+        if records is None:
+            records = self.store.get(o.fp for o in self.outputs)
+        recorded = {}
+        for o in self.outputs:
+            if str(o.fp) in records:
+                recorded.update(records[str(o.fp)]["inputs"])
+        return recorded
+
+    def changed_inputs(
+        self,
+        method: str = "stat",
+        records: dict[str, dict] = None,
+        current: dict[str, list | None] = None,
+    ) -> list[str]:
+        """The inputs whose fingerprints changed since this task's outputs were last completed"""
+        if current is None:
+            current = self.input_fingerprints(method)
+        return changed(
+            self.recorded_inputs(records),
+            {str(p): current[str(p)] for p in self.input_paths()},
+        )
+
+    def __hash__(self):
+        return hash((self.name, self.ids))
+
+    def __eq__(self, other):
+        return hash(self) == hash(other)
+
+    def _check(self, completed: set[str] = None) -> bool:
+        """
+        Check if the task should run, it's done if all its outputs are recorded as complete and still exist
+        `completed` limits which recorded outputs count as complete
+        """
+        # Will probably want to raise this to the flow level once we figure out more better flow abstraction
+        # E.g. checking input files from an S3 bucket for 100 samples
+        if not all(i.check() for i in self.inputs):
+            print(
+                f"{[i for i in self.inputs if not i.check()]} missing but required for {self.name}: {self.ids}"
+            )
+            return False
+
+        records = self._import_done_files(self.store.get(o.fp for o in self.outputs))
+        if completed is not None:
+            records = {fp: r for fp, r in records.items() if fp in completed}
+        done = [o.fp for o in self.outputs if str(o.fp) in records]
+        if done:
+            if self._done(records):
+                print(f"Task run already completed for {done}")
+                return False
+            elif len(done) == len(self.outputs):
+                print(
+                    f"Recorded outputs missing for {self.name}: {self.ids}, rerunning to regenerate them"
+                )
+            else:
+                print(
+                    f"Task run marked as partially completed for {done}, rerunning to generate all outputs"
+                )
+
+        return True
+
+    def _setup_run(self):
+        # TODO: Probably need a step here to remove stale outputs before creating empty dirs
+        # avoid problems with tools that don't like overwriting existing files (e.g. megahit)
+        for o in self.outputs:
+            if not o.fp.parent.exists():
+                o.fp.parent.mkdir(parents=True)
+
+        if not self.log_fp.parent.exists():
+            self.log_fp.parent.mkdir(parents=True)
+
+    def run(self):
+        """Ignore dependencies and run the task"""
+        if not self.dryrun:
+            if not self._check():
+                return None
+
+            self._setup_run()
+
+        with tags(self.name, *self.ids):
+            return self._runner_func()
+
+    def submit(
+        self,
+        dependencies: list["AutobfxTask"] = [],
+        completed: set[str] = None,
+        check: bool = True,
+        recheck: bool = False,
+        fingerprint_method: str = "stat",
+    ):
+        """
+        Submit the task for execution, submitting any dependencies first
+        - `check` checks whether the task is already done before submitting, flows turn this off once they've planned the run
+        - `recheck` compares input fingerprints once the dependencies have finished and skips the task if nothing changed
+        """
+        if not self.dryrun:
+            if check and not self._check(completed):
+
+                class AlreadyDone:
+                    def result(self):
+                        return None
+
+                return AlreadyDone()
+
+            self._setup_run()
+
+        with tags(self.name, *self.ids):
+            self.submission = self._runner_func.submit(
+                recheck=recheck,
+                fingerprint_method=fingerprint_method,
+                wait_for=[d.submission for d in dependencies if d.submission],
+            )
+            return self.submission
+
+
+@task
+def _array_element(results: dict, ids: tuple):
+    result = results[ids]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+class AutobfxTaskArray:
+    """
+    Sibling tasks (same name and runner config) run as the elements of a single array job
+    - One prefect task collects the commands of every member that needs to run and submits them all at once
+    - Each member then gets a lightweight prefect task for its own element's result,
+      so a failed element only holds back the tasks downstream of that member
+    """
+
+    kind = "array"
+
+    def __init__(self, tasks: list[AutobfxTask]):
+        self.tasks = tasks
+        self.name = tasks[0].name
+        self.runner = tasks[0].runner
+        self.submission = None
+
+        @task(name=f"{self.name}_{self.kind}")
+        def _array_func(
+            recheck: list[bool], fingerprint_method: str = "stat"
+        ) -> dict[tuple, str | Exception | None]:
+            results = {}
+            members, elements = [], []
+            for t, r in zip(self.tasks, recheck):
+                try:
+                    if not t._ready(r, fingerprint_method):
+                        results[t.ids] = None
+                        continue
+                except FileNotFoundError as e:
+                    results[t.ids] = e
+                    continue
+
+                cmd, cmds = t._collect(funcs=True)
+                members.append((t, cmd))
+                elements.append(cmds)
+
+            if not members:
+                return results
+
+            started = time.time()
+            jobs = self.submit_job(elements)
+            for (t, cmd), (_, future) in zip(members, jobs):
+                status = future.result()
+                if status.ok:
+                    try:
+                        if isinstance(cmd, CollectedCall):
+                            cmd = cmd.result()
+                    except Exception as e:
+                        results[t.ids] = e
+                        continue
+                    t._record(cmd, fingerprint_method, started)
+                    results[t.ids] = cmd
+                else:
+                    results[t.ids] = RuntimeError(
+                        f"SLURM {self.kind} job {status.job_id} ({t.runner.options['job_name']}) finished with state {status.state} (exit code {status.exit_code})"
+                    )
+
+            return results
+
+        self._array_func = _array_func
+
+    def job_options(self, dependency: list[str] = []) -> dict:
+        return {
+            "job_name": self.name,
+            "manifest_fp": self.tasks[0].project_fp
+            / ".autobfx"
+            / "slurm"
+            / f"{self.name}_{uuid.uuid4().hex[:8]}.manifest",
+            "dependency": dependency,
+            "priority": max(t.runner.options.get("priority", 0) for t in self.tasks),
+        }
+
+    def submit_job(
+        self, elements: list[list[list[str]]], dependency: list[str] = []
+    ) -> list[tuple[str, Future]]:
+        """Submit the members' commands, returning the job id and a future for the final status of each member"""
+        job_id = self.runner.submit_array(elements, self.job_options(dependency))
+        return [
+            (f"{job_id}_{i}", self.runner.watch(f"{job_id}_{i}"))
+            for i in range(len(elements))
+        ]
+
+    def submit(
+        self,
+        dependencies: list[AutobfxTask] = [],
+        recheck: set[AutobfxTask] = set(),
+        fingerprint_method: str = "stat",
+    ):
+        """
+        Submit the array once all the members' dependencies have finished
+        Failed dependencies don't stop the array, the members depending on them fail on their missing inputs instead
+        """
+        for t in self.tasks:
+            t._setup_run()
+
+        with tags(self.name):
+            self.submission = self._array_func.submit(
+                recheck=[t in recheck for t in self.tasks],
+                fingerprint_method=fingerprint_method,
+                wait_for=[
+                    allow_failure(d.submission) for d in dependencies if d.submission
+                ],
+            )
+
+        for t in self.tasks:
+            with tags(t.name, *t.ids):
+                t.submission = _array_element.with_options(
+                    name=t.runner.options["job_name"]
+                ).submit(self.submission, t.ids)
+
+        return self.submission
+
+
+class AutobfxTaskBundle(AutobfxTaskArray):
+    """
+    Short sibling tasks packed into a single allocation, where they run in parallel (see `autobfx.lib.bundle`)
+    Each task still gets its own exit code and completion record
+    """
+
+    kind = "bundle"
+
+    def job_options(self, dependency: list[str] = []) -> dict:
+        return {
+            **super().job_options(dependency),
+            "workers": self.runner.options["params"].parameters.get("bundle_workers"),
+        }
+
+    def submit_job(
+        self, elements: list[list[list[str]]], dependency: list[str] = []
+    ) -> list[tuple[str, Future]]:
+        options = self.job_options(dependency)
+        job_id = self.runner.submit_bundle(elements, options)
+        futures = [Future() for _ in elements]
+
+        # Every member waits on the one job, then picks its own exit code out of the bundle's results
+        def done(job: Future):
+            try:
+                statuses = self.runner.bundle_statuses(
+                    job.result(), len(elements), options
+                )
+            except Exception as e:
+                for f in futures:
+                    f.set_exception(e)
+                return
+            for f, status in zip(futures, statuses):
+                f.set_result(status)
+
+        self.runner.watch(job_id).add_done_callback(done)
+        return [(job_id, f) for f in futures]
+
+
+class AutobfxTaskChain:
+    """
+    A linear chain of one-to-one tasks (e.g. trimmomatic -> heyfastq for one sample) fused into a single job
+    - The members' commands run one after the other, each in its own environment, in one job sized for the biggest member
+    - With `scratch` in the runner parameters (e.g. "$TMPDIR"), files passed from one member to the next are written under it
+      instead of to their usual paths and are removed when the job ends
+    - Files that are streamable on both ends (see `IOObject`) go through named pipes instead, with both members running at once
+    - Files in `external` are read by tasks outside the chain, so they're always written to their usual paths
+    - Every member still gets its own completion record
+    """
+
+    kind = "chain"
+
+    def __init__(self, tasks: list[AutobfxTask], external: set[Path] = set()):
+        self.tasks = tasks
+        self.external = external
+        self.name = "+".join(t.name for t in tasks)
+        head = tasks[0]
+        # The members' software managers are applied per member in `fuse`
+        self.runner = copy.copy(head.runner)
+        self.runner.swm = NoManager()
+        self.runner.options = {
+            **head.runner.options,
+            "job_name": f"{self.name}_{'_'.join(head.ids)}",
+            "priority": max(t.runner.options.get("priority", 0) for t in tasks),
+        }
+        params = [t.runner.options.get("params") for t in tasks]
+        if all(params):
+            self.runner.options["params"] = params[0].model_copy(
+                update={
+                    "threads": max(p.threads for p in params),
+                    "mem_mb": max(p.mem_mb for p in params),
+                    "runtime_min": sum(p.runtime_min for p in params),
+                }
+            )
+        self.submission = None
+        # Files moved to scratch by the last `fuse`
+        self.moved: dict[str, str] = {}
+
+        @task(name=self.runner.options["job_name"])
+        def _chain_func(fingerprint_method: str = "stat") -> list:
+            if head.dryrun:
+                return [t._call(t.runner) for t in self.tasks]
+            if head._screened_out(fingerprint_method):
+                # Which screens out the rest of the chain in turn
+                for t in self.tasks[1:]:
+                    t._screened_out(fingerprint_method)
+                return [None] * len(self.tasks)
+            self._ready()
+
+            started = time.time()
+            try:
+                collected = [t._collect() for t in self.tasks]
+            except NotImplementedError:
+                # Members that call funcs can't be collected into one command, so just run them one after the other
+                results = []
+                for t in self.tasks:
+                    results.append(t._call(t.runner))
+                    t._record(results[-1], fingerprint_method, started)
+                return results
+
+            self.runner.run_cmd(self.fuse([cmds for _, cmds in collected]))
+            for t, (cmd, _) in zip(self.tasks, collected):
+                t._record(cmd, fingerprint_method, started, set(self.moved))
+            return [cmd for cmd, _ in collected]
+
+        self._chain_func = _chain_func
+
+    def _ready(self):
+        # Only inputs from outside the chain exist before it runs
+        produced = {p for t in self.tasks for o in t.outputs for p in o.paths()}
+        missing = [
+            p for p in self.input_paths() if p not in produced and not p.exists()
+        ]
+        if missing:
+            raise FileNotFoundError(
+                f"{missing} missing but required for {self.name}: {self.tasks[0].ids}"
+            )
+
+    def input_paths(self) -> list[Path]:
+        return [p for t in self.tasks for p in t.input_paths()]
+
+    def _rel(self, t: AutobfxTask, p: Path) -> Path:
+        try:
+            return p.relative_to(t.project_fp)
+        except ValueError:
+            return Path(p.name)
+
+    def intermediates(self, scratch_dir: str) -> dict[str, str]:
+        """Where each file passed from one member to the next goes under `scratch_dir`"""
+        moves = {}
+        for t, following in zip(self.tasks, self.tasks[1:]):
+            consumed = set(following.input_paths())
+            for o in t.outputs:
+                for p in o.paths():
+                    if p in consumed and p not in self.external:
+                        moves[str(p)] = f"{scratch_dir}/{self._rel(t, p)}"
+        return moves
+
+    def streams(self) -> list[tuple[int, str]]:
+        """
+        The files to pass from one member to the next through a named pipe, with the index of the member writing them
+        Both ends have to be streamable and nothing further down the chain can read the file again
+        Files also read outside the chain (`external`) are copied to their usual paths by `tee` as they stream past
+        """
+        streams = []
+        for i, (t, following) in enumerate(zip(self.tasks, self.tasks[1:])):
+            readers = {p: io for io in following.inputs for p in io.paths()}
+            later = {p for u in self.tasks[i + 2 :] for p in u.input_paths()}
+            for o in t.outputs:
+                for p in o.paths():
+                    if (
+                        o.streamable
+                        and p in readers
+                        and readers[p].streamable
+                        and p not in later
+                    ):
+                        streams.append((i, str(p)))
+        return streams
+
+    def fuse(self, elements: list[list[list[str]]]) -> list[str]:
+        """
+        One command running each member's commands (from `elements`, in member order) in that member's environment
+        Members connected by streams run at the same time, and if one of them fails the others are killed
+        (rather than left waiting on a pipe forever)
+        """
+        params = self.runner.options.get("params")
+        scratch = params.parameters.get("scratch") if params else None
+        streams = self.streams()
+        moves = {}
+        # Where the member after each teed stream reads it from, and the tees each member's output goes through
+        teed = {}
+        tees: dict[int, list[str]] = {}
+        lines = []
+        if scratch or streams:
+            work_dir = f"{scratch or '${TMPDIR:-/tmp}'}/autobfx-{self.runner.options['job_name']}-{uuid.uuid4().hex[:8]}"
+            if scratch:
+                moves = self.intermediates(work_dir)
+            for i, p in streams:
+                moves[p] = f"{work_dir}/{self._rel(self.tasks[i], Path(p))}"
+                if Path(p) in self.external:
+                    teed[p] = f"{moves[p]}.tee"
+                    tees.setdefault(i, []).append(f"tee {p} < {moves[p]} > {teed[p]}")
+            dirs = sorted({work_dir, *(m.rsplit("/", 1)[0] for m in moves.values())})
+            lines.append(f"trap {shlex.quote(f'rm -rf {work_dir}')} EXIT")
+            lines.append(f"mkdir -p {' '.join(dirs)}")
+            if streams:
+                lines.append(
+                    f"mkfifo {' '.join([moves[p] for _, p in streams] + list(teed.values()))}"
+                )
+        # Teed files end up at their usual paths, so they aren't transient
+        self.moved = {p: m for p, m in moves.items() if p not in teed}
+
+        def move(token: str, i: int) -> str:
+            # Whole paths only, e.g. not the log next to an intermediate file
+            for fp, moved in moves.items():
+                if fp in teed and i > 0 and (i - 1, fp) in streams:
+                    moved = teed[fp]
+                token = re.sub(re.escape(fp) + r"(?![\w.-])", lambda _: moved, token)
+            return token
+
+        # Runs of members connected by streams
+        groups = [[]]
+        streaming = {i for i, _ in streams}
+        for i, (t, cmds) in enumerate(zip(self.tasks, elements)):
+            member = [
+                line
+                for cmd in cmds
+                for line in t.runner.swm.run_cmd(
+                    [move(c, i) for c in cmd], t.runner.options
+                )
+            ]
+            # In a subshell so one member's environment doesn't leak into the next
+            groups[-1].append(f"( {' && '.join(member)} )")
+            groups[-1] += [f"( {tee} )" for tee in tees.get(i, [])]
+            if i not in streaming:
+                groups.append([])
+
+        for group in groups:
+            if len(group) == 1:
+                lines.append(group[0])
+            elif group:
+                pids = " ".join(f"$p{i}" for i in range(len(group)))
+                started = " ".join(f"{m} & p{i}=$!;" for i, m in enumerate(group))
+                kill = " ".join(f"pkill -P $p{i};" for i in range(len(group)))
+                # wait -n gives 127 once members that already finished have been reaped,
+                # their exit codes are still there for waiting on them by pid afterwards
+                lines.append(
+                    f"( {started} for p in {pids}; do wait -n; s=$?; [ $s -eq 127 ] && break; [ $s -eq 0 ] || {{ {kill} kill {pids} 2>/dev/null; exit 1; }}; done; for p in {pids}; do wait $p || exit 1; done )"
+                )
+        return [" && ".join(lines)]
+
+    def submit_job(
+        self, elements: list[list[list[str]]], dependency: list[str] = []
+    ) -> list[tuple[str, Future]]:
+        """Submit the fused job, returning its id and a future for its final status for each member"""
+        job_id = self.runner.submit_job(
+            [self.fuse(elements)], {"dependency": dependency}
+        )
+        job = self.runner.watch(job_id)
+        futures = [Future() for _ in self.tasks]
+
+        def done(job: Future):
+            for f in futures:
+                if job.exception():
+                    f.set_exception(job.exception())
+                else:
+                    f.set_result(job.result())
+
+        job.add_done_callback(done)
+        return [(job_id, f) for f in futures]
+
+    def submit(
+        self,
+        dependencies: list[AutobfxTask] = [],
+        fingerprint_method: str = "stat",
+    ):
+        """Submit the chain once all the members' dependencies from outside it have finished"""
+        for t in self.tasks:
+            t._setup_run()
+
+        with tags(*[t.name for t in self.tasks], *self.tasks[0].ids):
+            self.submission = self._chain_func.submit(
+                fingerprint_method=fingerprint_method,
+                wait_for=[d.submission for d in dependencies if d.submission],
+            )
+
+        for i, t in enumerate(self.tasks):
+            with tags(t.name, *t.ids):
+                t.submission = _array_element.with_options(
+                    name=t.runner.options["job_name"]
+                ).submit(self.submission, i)
+
+        return self.submission
@@ -1,43 +1,320 @@
-from pathlib import Path
-from autobfx.lib.io import IOObject, IOReads
-from autobfx.lib.runner import AutobfxRunner
-
-
-def run_build_host_index(
-    input_reads: list[IOReads],
-    extra_inputs: dict[str, list[IOObject]],
-    output_reads: list[IOReads],
-    extra_outputs: dict[str, list[IOObject]],
-    log_fp: Path,
-    runner: AutobfxRunner,
-) -> Path:
-    cmd = ["bwa", "index", str(extra_inputs["host"][0].fp), ">", str(log_fp), "2>&1"]
-
-    runner.run_cmd(cmd)
-
-    return cmd
-
-
-def run_align_to_host(
-    input_reads: list[IOReads],
-    extra_inputs: dict[str, list[IOObject]],
-    output_reads: list[IOReads],
-    extra_outputs: dict[str, list[IOObject]],
-    log_fp: Path,
-    runner: AutobfxRunner,
-    threads: int = 1,
-) -> Path:
-    cmd = ["bwa", "mem", "-M"]
-    cmd += ["-t", str(threads)]
-    cmd += [str(extra_inputs["host"][0].fp)]
-    cmd += (
-        [str(input_reads[0].fp), str(input_reads[0].r2)]
-        if input_reads[0].r2
-        else [str(input_reads[0].fp)]
-    )
-    cmd += ["-o", str(extra_outputs["sams"][0].fp)]
-    cmd += [">", str(log_fp), "2>&1"]
-
-    runner.run_cmd(cmd)
-
-    return cmd
+import hashlib
+import math
+import os
+import shlex
+from pathlib import Path
+from autobfx.lib.hosts import combine_fastas_cmd, count_cmd
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.runner import AutobfxRunner
+from autobfx.lib.store import CompletionStore
+
+
+INDEX_SUFFIXES = ["amb", "ann", "bwt", "pac", "sa"]
+
+
+def index_cache_dir() -> Path:
+    return (
+        Path(os.environ.get("XDG_DATA_HOME", "~/.local/share")).expanduser()
+        / "autobfx"
+        / "indices"
+    )
+
+
+def _sha256(fp: Path) -> str:
+    h = hashlib.sha256()
+    with open(fp, "rb") as f:
+        while block := f.read(4 * 2**20):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fasta_hash(fp: Path, store: CompletionStore = None) -> str | None:
+    """
+    The sha256 of a fasta, or None if it doesn't exist (yet)
+    With a store, hashes are memoised by path, size and mtime so an unchanged fasta is only ever hashed once
+    """
+    fp = str(Path(fp).resolve())
+    try:
+        st = os.stat(fp)
+    except FileNotFoundError:
+        return None
+    stat = [st.st_size, st.st_mtime_ns]
+    if store:
+        cached = store.digests([fp]).get(fp)
+        if cached and cached[:2] == stat:
+            return cached[2]
+
+    digest = _sha256(fp)
+    if store:
+        store.set_digests({fp: [*stat, digest]})
+    return digest
+
+
+def _host_key(fasta: Path, store: CompletionStore) -> str:
+    """
+    The cache key of a host's index, a hash of its fasta
+    If the fasta doesn't exist yet (e.g. it's made upstream) the key is worked out by the job's shell instead
+    """
+    digest = fasta_hash(fasta, store)
+    if digest:
+        return digest[:16]
+    return f"$(sha256sum {shlex.quote(str(fasta))} | cut -c1-16)"
+
+
+def _combined_key(hosts: dict[str, Path], store: CompletionStore) -> str:
+    """The cache key of a combined index, a hash of each host's name and the hash of its fasta, like `_host_key`"""
+    hashes = {h: fasta_hash(fp, store) for h, fp in hosts.items()}
+    if all(hashes.values()):
+        return hashlib.sha256(
+            "\n".join(f"{h}:{hashes[h]}" for h in sorted(hosts)).encode()
+        ).hexdigest()[:16]
+
+    fmt = "\\n".join(f"{h.replace('%', '%%')}:%s" for h in sorted(hosts))
+    sums = " ".join(
+        f"$(sha256sum {shlex.quote(str(hosts[h]))} | cut -d' ' -f1)"
+        for h in sorted(hosts)
+    )
+    return f"$(printf {shlex.quote(fmt)} {sums} | sha256sum | cut -c1-16)"
+
+
+def run_build_host_index(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    index_cache: str | Path = None,
+) -> Path:
+    """
+    Index a host fasta in a cache shared between projects and link the index files into this project's outputs
+    The cache (`index_cache`, $XDG_DATA_HOME/autobfx/indices by default) is keyed by a hash of the fasta,
+    so each host is only ever indexed once however many projects use it
+    """
+    fasta = extra_inputs["host"][0].fp
+    cache_root = Path(index_cache) if index_cache else index_cache_dir()
+    key = _host_key(fasta, CompletionStore.for_project(cache_root))
+    cmd = cached_index_cmd(
+        f"{cache_root}/{fasta.stem}-{key}",
+        fasta.name,
+        f"ln -sf {fasta.resolve()} {fasta.name}",
+        extra_outputs["host_indices"],
+        log_fp,
+    )
+
+    runner.run_cmd(cmd)
+
+    return cmd
+
+
+def cached_index_cmd(
+    cache_fp: str,
+    name: str,
+    make_fasta: str,
+    host_indices: list[IOObject],
+    log_fp: Path,
+) -> list[str]:
+    """
+    The command to index `name` (made by `make_fasta` in `cache_fp`) in `cache_fp` unless it's already there,
+    then link the index files into `host_indices`
+    `cache_fp` can hold shell substitutions, it's only expanded once, into $AUTOBFX_INDEX
+    """
+    # Whoever gets the lock first builds it, anyone else waiting on it finds it already built
+    build = f'cd "$AUTOBFX_INDEX" && ([ -e .complete ] || ({make_fasta} && bwa index "$AUTOBFX_INDEX/{name}" > {log_fp} 2>&1 && touch .complete))'
+
+    cmd = [f'export AUTOBFX_INDEX="{cache_fp}"', "&&"]
+    cmd += ["mkdir", "-p", '"$AUTOBFX_INDEX"', "&&"]
+    cmd += ["flock", '"$AUTOBFX_INDEX.lock"', "-c", shlex.quote(build)]
+    for o in host_indices:
+        cmd += [
+            "&&",
+            "ln",
+            "-sf",
+            f'"$AUTOBFX_INDEX/{name}.{o.fp.name.rsplit(".", 1)[-1]}"',
+            str(o.fp),
+        ]
+    return cmd
+
+
+def index_mem_mb(fastas: list[Path]) -> int:
+    """
+    Roughly how much memory aligning to an index of `fastas` takes, about 2 bytes per base for bwa mem
+    Gzipped fastas are assumed to be about a third of their uncompressed size
+    """
+    size = sum(
+        fp.stat().st_size * (3 if fp.name.endswith(".gz") else 1)
+        for fp in map(Path, fastas)
+    )
+    return math.ceil(2 * size / 2**20)
+
+
+def run_build_combined_index(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    index_cache: str | Path = None,
+) -> Path:
+    """
+    Index every host fasta together, with each contig prefixed by its host's name (see `autobfx.lib.hosts`),
+    so samples can be aligned to all of them at once
+    Cached like `run_build_host_index`, keyed by the host names and a hash of each fasta
+    """
+    hosts = {o.fp.stem: o.fp for o in extra_inputs["hosts"]}
+    cache_root = Path(index_cache) if index_cache else index_cache_dir()
+    key = _combined_key(hosts, CompletionStore.for_project(cache_root))
+    cmd = cached_index_cmd(
+        f"{cache_root}/combined-{key}",
+        "combined.fasta",
+        combine_fastas_cmd(
+            {h: fp.resolve() for h, fp in hosts.items()}, Path("combined.fasta")
+        ),
+        extra_outputs["host_indices"],
+        log_fp,
+    )
+
+    runner.run_cmd(cmd)
+
+    return cmd
+
+
+def index_prefix(extra_inputs: dict[str, list[IOObject]]) -> str:
+    """The bwa index to align to, the host fasta's built index (its .bwt file) if there is one or else the fasta itself"""
+    if "index" in extra_inputs:
+        return str(extra_inputs["index"][0].fp).removesuffix(".bwt")
+    return str(extra_inputs["host"][0].fp)
+
+
+def shm_cmd(prefix: str) -> list[str]:
+    """
+    Load an index into shared memory with `bwa shm` unless it's already there, so every alignment on the node shares one copy
+    bwa mem then uses the shared copy by itself, it stays loaded until `bwa shm -d`
+    """
+    load = f"bwa shm -l 2>/dev/null | cut -f 1 | grep -qxF {prefix} || bwa shm {prefix}"
+    return [
+        "flock",
+        "${TMPDIR:-/tmp}/autobfx-bwa-shm.lock",
+        "-c",
+        shlex.quote(load),
+        "&&",
+    ]
+
+
+def run_align_to_host(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    threads: int = 1,
+    shm: bool = False,
+) -> Path:
+    """Align to the host's index, with `shm` loading it into shared memory once per node (see `shm_cmd`)"""
+    prefix = index_prefix(extra_inputs)
+    cmd = shm_cmd(prefix) if shm else []
+    cmd += ["bwa", "mem", "-M"]
+    cmd += ["-t", str(threads)]
+    cmd += [prefix]
+    cmd += (
+        [str(input_reads[0].fp), str(input_reads[0].r2)]
+        if input_reads[0].r2
+        else [str(input_reads[0].fp)]
+    )
+    cmd += ["-o", str(extra_outputs["sams"][0].fp)]
+    cmd += [">", str(log_fp), "2>&1"]
+
+    runner.run_cmd(cmd)
+
+    return cmd
+
+
+def run_align_and_sort(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    threads: int = 0,
+    shm: bool = False,
+) -> Path:
+    """
+    `run_align_to_host` piped straight into `samtools sort`, so the only thing written is the sorted BAM
+    The threads (the runner's by default) are split between the two, with about a quarter going to sorting,
+    and sorting gets half the runner's memory for its buffers before it spills to temp files next to the BAM
+    `shm` loads the index into shared memory first, like in `run_align_to_host`
+    """
+    params = runner.options.get("params")
+    threads = threads or (params.threads if params else 1)
+    mem_mb = params.mem_mb if params else 8000
+    sort_threads = max(1, threads // 4)
+    align_threads = max(1, threads - sort_threads)
+    bam_fp = extra_outputs["bams"][0].fp
+
+    prefix = index_prefix(extra_inputs)
+    cmd = ["bwa", "mem", "-M"]
+    cmd += ["-t", str(align_threads)]
+    cmd += [prefix]
+    cmd += (
+        [str(input_reads[0].fp), str(input_reads[0].r2)]
+        if input_reads[0].r2
+        else [str(input_reads[0].fp)]
+    )
+    cmd += ["2>", str(log_fp)]
+    cmd += ["|", "samtools", "sort"]
+    cmd += ["-@", str(sort_threads)]
+    cmd += ["-m", f"{max(100, mem_mb // 2 // sort_threads)}M"]
+    cmd += ["-T", str(bam_fp.parent / f".{bam_fp.name}.tmp")]
+    cmd += ["-o", str(bam_fp), "-"]
+    cmd += ["2>>", str(log_fp)]
+    # Without pipefail a failed alignment would still leave a (truncated) BAM looking successful
+    cmd = ["set", "-o", "pipefail", "&&"] + (shm_cmd(prefix) if shm else []) + cmd
+
+    runner.run_cmd(cmd)
+
+    return cmd
+
+
+def run_align_to_hosts(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    threads: int = 0,
+    shm: bool = False,
+) -> Path:
+    """
+    Align to every host at once with the combined index from `run_build_combined_index`, writing one (unsorted) BAM
+    The alignments are counted per host on their way through, by the host prefixes of the contigs they mapped to
+    The threads (the runner's by default) are split between aligning and compressing like in `run_align_and_sort`
+    """
+    params = runner.options.get("params")
+    threads = threads or (params.threads if params else 1)
+    view_threads = max(1, threads // 4)
+    align_threads = max(1, threads - view_threads)
+
+    prefix = index_prefix(extra_inputs)
+    cmd = ["bwa", "mem", "-M"]
+    cmd += ["-t", str(align_threads)]
+    cmd += [prefix]
+    cmd += (
+        [str(input_reads[0].fp), str(input_reads[0].r2)]
+        if input_reads[0].r2
+        else [str(input_reads[0].fp)]
+    )
+    cmd += ["2>", str(log_fp)]
+    cmd += ["|", *count_cmd(extra_outputs["counts"][0].fp, runner.swm.python)]
+    cmd += ["|", "samtools", "view", "-b"]
+    cmd += ["-@", str(view_threads)]
+    cmd += ["-o", str(extra_outputs["bams"][0].fp), "-"]
+    cmd += ["2>>", str(log_fp)]
+    cmd = ["set", "-o", "pipefail", "&&"] + (shm_cmd(prefix) if shm else []) + cmd
+
+    runner.run_cmd(cmd)
+
+    return cmd
@@ -0,0 +1,21 @@
+from pathlib import Path
+from autobfx.lib.fastqstats import sample_stats
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.runner import AutobfxRunner
+
+
+def run_fastq_stats(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+) -> dict[str, int]:
+    """
+    Summarise the sample's reads (counts, lengths, per position base composition and mean quality) to JSON in process,
+    a lighter alternative to FastQC (see `autobfx.lib.fastqstats`)
+    """
+    return runner.run_func(
+        sample_stats, [input_reads[0].paths(), extra_outputs["stats"][0].fp]
+    )
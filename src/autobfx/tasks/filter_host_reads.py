@@ -0,0 +1,29 @@
+from pathlib import Path
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.readfilter import filter_host_reads
+from autobfx.lib.runner import AutobfxRunner
+
+
+def run_filter_host_reads(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    threads: int = 0,
+) -> dict[str, int]:
+    """
+    Remove the reads that mapped to any host from a sample, given its alignments to every host (see `autobfx.lib.readfilter`)
+    Hosts that were screened out have no alignments, so they're just left out
+    """
+    params = runner.options.get("params")
+    return runner.run_func(
+        filter_host_reads,
+        [
+            [b.fp for b in extra_inputs["bams"]],
+            input_reads[0].paths(),
+            output_reads[0].paths(),
+            threads or (params.threads if params else 1),
+        ],
+    )
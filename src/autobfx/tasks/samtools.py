@@ -13,10 +13,10 @@ def run_samtools_sort_sam(
 ):
     cmd = ["samtools", "view"]
     cmd += ["-@", str(runner.options["params"].threads)]
-    cmd += ["-b", str(extra_inputs["sam"][0].fp)]
+    cmd += ["-b", str(extra_inputs["sams"][0].fp)]
     cmd += ["|", "samtools", "sort"]
     cmd += ["-@", str(runner.options["params"].threads)]
-    cmd += ["-o", str(extra_outputs["bam"][0].fp)]
+    cmd += ["-o", str(extra_outputs["bams"][0].fp)]
     cmd += ["2>", str(log_fp)]
 
     runner.run_cmd(cmd)
@@ -0,0 +1,50 @@
+from pathlib import Path
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.runner import AutobfxRunner
+from autobfx.lib.sketch import build_sketch, screen_reads
+
+
+SUFFIX = ".sketch.npz"
+
+
+def run_build_host_sketch(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    k: int = 21,
+    scale: int = 1000,
+) -> dict:
+    """Sketch the host's k-mers, keeping about one in every `scale`"""
+    return runner.run_func(
+        build_sketch,
+        [extra_inputs["host"][0].fp, extra_outputs["sketches"][0].fp, k, scale],
+    )
+
+
+def run_screen_hosts(
+    input_reads: list[IOReads],
+    extra_inputs: dict[str, list[IOObject]],
+    output_reads: list[IOReads],
+    extra_outputs: dict[str, list[IOObject]],
+    log_fp: Path,
+    runner: AutobfxRunner,
+    n_reads: int = 100000,
+    min_containment: float = 0.001,
+) -> dict:
+    """
+    Estimate the containment of a subsample of the sample's reads in every host sketch
+    Hosts below `min_containment` are screened out, skipping aligning the sample to them
+    """
+    return runner.run_func(
+        screen_reads,
+        [
+            input_reads[0].paths(),
+            {s.fp.name.removesuffix(SUFFIX): s.fp for s in extra_inputs["sketches"]},
+            extra_outputs["screens"][0].fp,
+            n_reads,
+            min_containment,
+        ],
+    )
@@ -1,8 +1,8 @@
-import pytest
-from prefect.testing.utilities import prefect_test_harness
-
-
-# @pytest.fixture(autouse=True, scope="session")
-# def prefect_test_fixture():
-#    with prefect_test_harness():
-#        yield
+import pytest
+from prefect.testing.utilities import prefect_test_harness
+
+
+# @pytest.fixture(autouse=True, scope="session")
+# def prefect_test_fixture():
+#    with prefect_test_harness():
+#        yield
@@ -0,0 +1,27 @@
+from pathlib import Path
+from autobfx.flows.clean_shotgun import CLEAN_SHOTGUN
+from autobfx.lib.config import Config
+from autobfx.lib.iterator import AutobfxIterator
+
+
+def test_clean_shotgun(data_fp: Path, dummy_project: Config):
+    for name in ["build_host_index", "align_to_host"]:
+        dummy_project.flows[name].extra_inputs["hosts"] = data_fp / "hosts"
+    samples = AutobfxIterator([{"sample": "LONG"}, {"sample": "SHORT"}])
+    flow = CLEAN_SHOTGUN(dummy_project, sample_iterator=samples)
+
+    # Every alignment waits on its sample's QC
+    assert len(flow.index["align_to_host"]) == 6
+    for t in flow.index["align_to_host"].values():
+        assert {p.name for p in flow.dag.predecessors(t)} == {
+            "build_host_index",
+            "heyfastq",
+        }
+
+
+def test_clean_shotgun_no_hosts(dummy_project: Config):
+    samples = AutobfxIterator([{"sample": "LONG"}, {"sample": "SHORT"}])
+    flow = CLEAN_SHOTGUN(dummy_project, sample_iterator=samples)
+
+    assert "heyfastq" in flow.index
+    assert not flow.index.get("align_to_host")
@@ -0,0 +1,147 @@
+from pathlib import Path
+import networkx as nx
+from autobfx.flows.decontam import DECONTAM, align_name
+from autobfx.flows.heyfastq import HEYFASTQ
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.config import Config, FlowConfig
+from autobfx.lib.iterator import AutobfxIterator
+
+
+def test_decontam(data_fp: Path, dummy_project: Config):
+    for name in ["build_host_index", "align_to_host"]:
+        dummy_project.flows[name].extra_inputs["hosts"] = data_fp / "hosts"
+    samples = AutobfxIterator([{"sample": "LONG"}, {"sample": "SHORT"}])
+    flow = DECONTAM(dummy_project, sample_iterator=samples)
+
+    # Every sample is aligned to every host
+    assert len(flow.index["build_host_index"]) == 3
+    assert len(flow.index["align_to_host"]) == 6
+    assert len(flow.index["sort_sam"]) == 6
+    for t in flow.index["align_to_host"].values():
+        assert [p.name for p in flow.dag.predecessors(t)] == ["build_host_index"]
+        assert [s.id_dict for s in flow.dag.successors(t)] == [t.id_dict]
+
+    # Then host reads are filtered out of each sample, with its alignments to every host
+    assert len(flow.index["filter_host_reads"]) == 2
+    for t in flow.index["filter_host_reads"].values():
+        assert {p.name for p in flow.dag.predecessors(t)} == {"sort_sam"}
+        assert len(t.extra_inputs["bams"]) == 3
+
+
+def test_decontam_fused(data_fp: Path, dummy_project: Config):
+    dummy_project.flows["build_host_index"].extra_inputs["hosts"] = data_fp / "hosts"
+    dummy_project.flows["align_and_sort"] = FlowConfig(
+        input_reads="heyfastq",
+        extra_inputs={"hosts": data_fp / "hosts"},
+        extra_outputs={"bams": "sort_sam"},
+        conda="bwa",
+    )
+    samples = AutobfxIterator([{"sample": "LONG"}, {"sample": "SHORT"}])
+    flow = DECONTAM(dummy_project, sample_iterator=samples)
+
+    # No SAMs, alignments go straight into sorted BAMs
+    assert "align_to_host" not in flow.index and "sort_sam" not in flow.index
+    assert len(flow.index["align_and_sort"]) == 6
+    for t in flow.index["align_and_sort"].values():
+        assert [p.name for p in flow.dag.predecessors(t)] == ["build_host_index"]
+        assert t.extra_outputs["bams"][0].fp.suffix == ".bam"
+
+    assert len(DECONTAM(dummy_project, samples, fused=False).index["sort_sam"]) == 6
+
+
+def test_decontam_screened(data_fp: Path, dummy_project: Config):
+    for name in ["build_host_index", "align_to_host"]:
+        dummy_project.flows[name].extra_inputs["hosts"] = data_fp / "hosts"
+    dummy_project.flows["build_host_sketch"] = FlowConfig(
+        extra_inputs={"hosts": data_fp / "hosts"},
+        extra_outputs={"sketches": "host_sketches"},
+    )
+    dummy_project.flows["screen_hosts"] = FlowConfig(
+        input_reads="heyfastq", extra_outputs={"screens": "screen_hosts"}
+    )
+    samples = AutobfxIterator([{"sample": "LONG"}, {"sample": "SHORT"}])
+    flow = DECONTAM(dummy_project, sample_iterator=samples)
+
+    # Each sample is screened against every host's sketch before it's aligned to any of them
+    assert len(flow.index["build_host_sketch"]) == 3
+    for t in flow.index["screen_hosts"].values():
+        assert len(list(flow.dag.predecessors(t))) == 3
+        assert len(t.extra_inputs["sketches"]) == 3
+    for t in flow.index["align_to_host"].values():
+        screens = [p for p in flow.dag.predecessors(t) if p.name == "screen_hosts"]
+        assert [p.id_dict for p in screens] == [{"sample": t.id_dict["sample"]}]
+        assert (
+            t.extra_inputs["screen"][0].fp == screens[0].extra_outputs["screens"][0].fp
+        )
+        assert t.screen is not None
+
+
+def test_decontam_combined(data_fp: Path, dummy_project: Config):
+    dummy_project.flows["build_host_index"].extra_inputs["hosts"] = data_fp / "hosts"
+    dummy_project.flows["align_to_hosts"] = FlowConfig(
+        input_reads="heyfastq",
+        extra_outputs={"bams": "align_to_hosts", "counts": "align_to_hosts"},
+        conda="bwa",
+    )
+    samples = AutobfxIterator([{"sample": "LONG"}, {"sample": "SHORT"}])
+    flow = DECONTAM(dummy_project, sample_iterator=samples)
+
+    # The hosts fit in memory together, so each sample is aligned once to all of them
+    assert "align_to_host" not in flow.index and "build_host_index" not in flow.index
+    (index,) = flow.index["build_combined_index"].values()
+    assert len(index.extra_inputs["hosts"]) == 3
+    assert len(flow.index["align_to_hosts"]) == 2
+    for t in flow.index["align_to_hosts"].values():
+        assert list(flow.dag.predecessors(t)) == [index]
+    for t in flow.index["filter_host_reads"].values():
+        assert [b.fp.name for b in t.extra_inputs["bams"]] == [f"{t.ids[0]}.bam"]
+
+    # Otherwise it's one alignment per host again
+    dummy_project.flows["align_to_hosts"].runner_config.mem_mb = 0
+    dummy_project.flows["align_to_host"].extra_inputs["hosts"] = data_fp / "hosts"
+    assert len(DECONTAM(dummy_project, samples).index["align_to_host"]) == 6
+
+
+def test_align_name_missing_host(data_fp: Path, dummy_project: Config, tmp_path: Path):
+    dummy_project.flows["align_to_hosts"] = FlowConfig(
+        input_reads="heyfastq",
+        extra_outputs={"bams": "align_to_hosts", "counts": "align_to_hosts"},
+        conda="bwa",
+    )
+    hosts = {"human": data_fp / "hosts" / "human.fasta"}
+    assert align_name(dummy_project, hosts) == "align_to_hosts"
+
+    # A host that isn't there yet can't be sized, so it isn't counted as fitting
+    hosts["upstream"] = tmp_path / "upstream.fasta"
+    assert align_name(dummy_project, hosts) == "align_to_host"
+
+
+def test_decontam_combined_streams(data_fp: Path, dummy_project: Config):
+    dummy_project.flows["build_host_index"].extra_inputs["hosts"] = data_fp / "hosts"
+    dummy_project.flows["align_to_hosts"] = FlowConfig(
+        input_reads="heyfastq",
+        extra_outputs={"bams": "align_to_hosts", "counts": "align_to_hosts"},
+        conda="bwa",
+    )
+    for name in ["heyfastq", "align_to_hosts"]:
+        dummy_project.flows[name].runner_config.parameters = {"fuse": True}
+    samples = AutobfxIterator([{"sample": "LONG"}, {"sample": "SHORT"}])
+    flow = AutobfxFlow.compose_flows(
+        "test",
+        [
+            HEYFASTQ(dummy_project, sample_iterator=samples),
+            DECONTAM(dummy_project, sample_iterator=samples),
+        ],
+    )
+    flow.connect("heyfastq", "align_to_hosts", on=["sample"])
+    tasks = list(nx.topological_sort(flow.dag))
+    chains = flow._chains(tasks, set(tasks))
+
+    # Each sample's heyfastq output streams into its alignment to the combined index, which the chain waits for
+    # filter_host_reads reads it again afterwards, so it's written out on the way
+    assert len(set(chains.values())) == 2
+    for chain in set(chains.values()):
+        assert [t.name for t in chain.tasks] == ["heyfastq", "align_to_hosts"]
+        reads = chain.tasks[0].output_reads[0].paths()
+        assert chain.streams() == [(0, str(p)) for p in reads]
+        assert set(reads) <= chain.external
@@ -0,0 +1,57 @@
+from pathlib import Path
+import networkx as nx
+from autobfx.flows.qc import QC
+from autobfx.lib.config import Config, FlowConfig
+
+
+def test_qc(data_fp: Path, dummy_project: Config):
+    dummy_project.flows["trimmomatic"].input_reads = data_fp / "reads"
+    flow = QC(dummy_project)
+
+    assert len(flow.index["trimmomatic"]) == 2
+    for t in flow.index["trimmomatic"].values():
+        assert sorted(s.name for s in flow.dag.successors(t)) == ["fastqc", "heyfastq"]
+
+
+def test_qc_fastq_stats(data_fp: Path, dummy_project: Config):
+    dummy_project.flows["trimmomatic"].input_reads = data_fp / "reads"
+    dummy_project.flows["fastq_stats"] = FlowConfig(
+        input_reads="trimmomatic", extra_outputs={"stats": "fastq_stats"}
+    )
+    flow = QC(dummy_project)
+
+    assert "fastqc" not in flow.index
+    assert len(flow.index["fastq_stats"]) == 2
+    for t in flow.index["trimmomatic"].values():
+        assert sorted(s.name for s in flow.dag.successors(t)) == [
+            "fastq_stats",
+            "heyfastq",
+        ]
+    assert sorted(
+        t.extra_outputs["stats"][0].fp.name for t in flow.index["fastq_stats"].values()
+    ) == ["LONG.json", "SHORT.json"]
+
+
+def test_qc_fused(data_fp: Path, dummy_project: Config):
+    dummy_project.flows["trimmomatic"].input_reads = data_fp / "reads"
+    for name in ["trimmomatic", "heyfastq", "fastqc"]:
+        dummy_project.flows[name].runner_config.parameters = {"fuse": True}
+    flow = QC(dummy_project)
+    tasks = list(nx.topological_sort(flow.dag))
+    chains = flow._chains(tasks, set(tasks), flow.priorities(tasks))
+
+    # trimmomatic -> heyfastq is fused for each sample, streaming the paired reads into heyfastq
+    # and writing them out on the way (with tee) for fastqc
+    assert len(set(chains.values())) == 2
+    for chain in set(chains.values()):
+        assert [t.name for t in chain.tasks] == ["trimmomatic", "heyfastq"]
+        trimmed = chain.tasks[0].output_reads[0].paths()
+        assert set(trimmed) <= chain.external
+        assert chain.streams() == [(0, str(p)) for p in trimmed]
+        cmd = chain.fuse(
+            [[["trimmomatic", *map(str, trimmed)]], [["heyfastq", *map(str, trimmed)]]]
+        )[0]
+        assert "mkfifo" in cmd
+        for p in trimmed:
+            assert f"tee {p} <" in cmd
+            assert str(p) not in chain.moved
@@ -0,0 +1,21 @@
+from pathlib import Path
+from autobfx.lib.bundle import read_results, run_bundle
+
+
+def test_run_bundle(tmp_path: Path):
+    manifest_fp = tmp_path / "test.manifest"
+    manifest_fp.write_text(f"true\nexit 3\necho hi > {tmp_path / 'out.txt'}\n")
+    results_fp = tmp_path / "test.results"
+
+    assert run_bundle(manifest_fp, results_fp, workers=2) == 1
+    results = read_results(results_fp)
+    assert {i: r["exit_code"] for i, r in results.items()} == {0: 0, 1: 3, 2: 0}
+    assert (tmp_path / "out.txt").read_text() == "hi\n"
+
+
+def test_read_results_partial(tmp_path: Path):
+    results_fp = tmp_path / "test.results"
+    results_fp.write_text('{"index": 0, "exit_code": 0}\n{"index": 1, "exit')
+
+    assert list(read_results(results_fp).keys()) == [0]
+    assert read_results(tmp_path / "missing.results") == {}
@@ -0,0 +1,63 @@
+import pytest
+from pathlib import Path
+from autobfx.lib.discovery import discover_samples
+
+
+def touch(fp: Path, *names: str) -> Path:
+    fp.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (fp / name).touch()
+    return fp
+
+
+def test_discover_paired_end(tmp_path: Path):
+    fp = touch(
+        tmp_path / "reads",
+        "B_R2.fastq.gz",
+        "A_R1.fastq.gz",
+        "B_R1.fastq.gz",
+        "A_R2.fastq.gz",
+        "C_S3_R1_001.fastq.gz",
+        "C_S3_R2_001.fastq.gz",
+        "notes.txt",
+    )
+    samples = discover_samples(fp, paired_end=True)
+
+    assert list(samples.keys()) == ["A", "B", "C_S3"]
+    assert samples["B"].fp.name == "B_R1.fastq.gz"
+    assert samples["B"].r2.name == "B_R2.fastq.gz"
+
+
+def test_discover_single_end(data_fp: Path):
+    samples = discover_samples(data_fp / "reads", paired_end=False)
+
+    assert sorted(samples.keys()) == ["LONG_R1", "LONG_R2", "SHORT_R1", "SHORT_R2"]
+    assert samples["LONG_R1"].r2 is None
+
+
+def test_discover_lane_pattern(tmp_path: Path):
+    fp = touch(tmp_path / "reads", "A_L001_R1_001.fastq.gz", "A_L001_R2_001.fastq.gz")
+    samples = discover_samples(
+        fp,
+        paired_end=True,
+        patterns=[r"^(?P<sample>.+?)_L\d{3}_R(?P<read>[12])_001\.fastq\.gz$"],
+    )
+
+    assert list(samples.keys()) == ["A"]
+
+
+def test_discover_missing_mate(tmp_path: Path):
+    fp = touch(tmp_path / "reads", "A_R1.fastq.gz", "A_R2.fastq.gz", "B_R1.fastq.gz")
+
+    with pytest.raises(ValueError):
+        discover_samples(fp, paired_end=True)
+
+
+def test_discover_cache(tmp_path: Path):
+    fp = touch(tmp_path / "reads", "A_R1.fastq.gz", "A_R2.fastq.gz")
+    assert list(discover_samples(fp, paired_end=True).keys()) == ["A"]
+
+    # Adding files changes the directory mtime which invalidates the cache
+    touch(fp, "B_R1.fastq.gz", "B_R2.fastq.gz")
+    assert list(discover_samples(fp, paired_end=True).keys()) == ["A", "B"]
+    assert discover_samples(tmp_path / "missing", paired_end=True) == {}
@@ -0,0 +1,219 @@
+import json
+import os
+import pytest
+import subprocess
+from pathlib import Path
+from autobfx.lib.config import Config, FlowConfig
+from autobfx.lib.envs import (
+    BUILT_MARKER,
+    EnvRecord,
+    activated_env,
+    clear_cache,
+    export_lines,
+    provision,
+    read_registry,
+    spec_hash,
+)
+from autobfx.lib.runner import CondaManager, DryRunner, LocalRunner, VenvManager
+
+
+def fake_venv(tmp_path: Path) -> Path:
+    # Logs every activation so they can be counted
+    venv = tmp_path / "venv"
+    (venv / "bin").mkdir(parents=True)
+    (venv / "bin" / "activate").write_text(
+        f"echo activated >> {tmp_path / 'activations'}\n"
+        f"export VIRTUAL_ENV={venv}\n"
+        'export PATH="$VIRTUAL_ENV/bin:$PATH"\n'
+        "export GREETING='hello world'\n"
+        "unset AUTOBFX_TEST_UNSET\n"
+    )
+    return venv
+
+
+def activations(tmp_path: Path) -> int:
+    return len((tmp_path / "activations").read_text().splitlines())
+
+
+def test_activated_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AUTOBFX_TEST_UNSET", "1")
+    venv = fake_venv(tmp_path)
+    activate = [f"source {venv}/bin/activate"]
+
+    env = activated_env(activate, f"{venv}/bin")
+    assert env["GREETING"] == "hello world"
+    assert env["VIRTUAL_ENV"] == str(venv)
+    assert env["AUTOBFX_TEST_UNSET"] is None
+    # Only what activation added to PATH is kept, not the rest of this shell's
+    assert env["PATH"] == f"{venv}/bin"
+
+    # Cached in memory, then on disk
+    assert activated_env(activate, f"{venv}/bin") == env
+    clear_cache()
+    assert activated_env(activate, f"{venv}/bin") == env
+    assert activations(tmp_path) == 1
+
+    # Changing the environment invalidates it
+    (venv / "bin" / "tool").touch()
+    os.utime(venv / "bin", ns=(0, 0))
+    assert activated_env(activate, f"{venv}/bin") == env
+    assert activations(tmp_path) == 2
+
+    assert activated_env(["false"], f"{venv}/bin") is None
+
+
+def test_export_lines():
+    assert export_lines({"A": "x y", "B": None, "C": "$HOME"}) == [
+        "unset B",
+        "export A='x y' C='$HOME'",
+    ]
+
+    # Added search path entries go ahead of the job's own
+    (line,) = export_lines({"PATH": "/env/bin"})
+    out = subprocess.run(
+        ["bash", "-c", f"PATH=/usr/bin:/bin && {line} && echo $PATH"],
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert out == "/env/bin:/usr/bin:/bin\n"
+
+
+def test_dry_runner_skips_activation(tmp_path: Path, capsys):
+    venv = fake_venv(tmp_path)
+    DryRunner(VenvManager(), options={"venv": str(venv)}).run_cmd(["true"])
+
+    assert not (tmp_path / "activations").exists()
+    assert f"source {venv}/bin/activate" in capsys.readouterr().out
+
+
+def test_venv_manager_cached(tmp_path: Path):
+    venv = fake_venv(tmp_path)
+    runner = LocalRunner(
+        VenvManager(), options={"venv": str(venv), "log_fp": tmp_path / "test.log"}
+    )
+
+    for _ in range(3):
+        runner.run_cmd(["echo", "$GREETING", ">>", str(tmp_path / "out")])
+
+    assert (tmp_path / "out").read_text() == "hello world\n" * 3
+    assert activations(tmp_path) == 1
+    assert VenvManager().run_cmd(
+        ["true"], {"venv": str(venv), "cache_activation": False}
+    ) == [f"source {venv}/bin/activate", "true"]
+
+
+def fake_solver(tmp_path: Path) -> Path:
+    # Stands in for both `conda env create -q -y -f spec -p prefix` and `conda-pack -q -p prefix -o pack`
+    solver = tmp_path / "fake_conda"
+    solver.write_text(
+        "#!/bin/bash\n"
+        f"echo $@ >> {tmp_path / 'builds'}\n"
+        'if [ "$1" = env ]; then grep -q broken $6 && exit 1; mkdir -p $8/conda-meta $8/bin\n'
+        "else tar -czf $6 -C $4 .; fi\n"
+    )
+    solver.chmod(0o755)
+    return solver
+
+
+def test_provision(tmp_path: Path):
+    solver = fake_solver(tmp_path)
+    specs = tmp_path / "specs"
+    specs.mkdir()
+    (specs / "a.yaml").write_text("name: a\n")
+    (specs / "b.yaml").write_text("name: b\n")
+    root = tmp_path / "envs"
+
+    def builds() -> list[str]:
+        return (tmp_path / "builds").read_text().splitlines()
+
+    registry = provision(
+        {"a": specs / "a.yaml", "b": specs / "b.yaml"},
+        root,
+        solver=str(solver),
+        pack=True,
+        packer=f"{solver} pack",
+    )
+    assert registry == read_registry(root)
+    assert registry["a"].prefix == root / f"a-{spec_hash(specs / 'a.yaml')[:16]}"
+    assert registry["a"].pack.exists()
+    assert len(builds()) == 4
+
+    # Nothing changed, nothing to do
+    provision({"a": specs / "a.yaml"}, root, solver=str(solver))
+    assert len(builds()) == 4
+
+    # A changed spec gets a new environment
+    (specs / "a.yaml").write_text("name: a\ndependencies: []\n")
+    registry = provision({"a": specs / "a.yaml"}, root, solver=str(solver))
+    assert registry["a"].prefix.exists() and registry["a"].pack is None
+    assert len(builds()) == 5
+
+    # So does one whose build was interrupted
+    (specs / "d.yaml").write_text("name: d\n")
+    prefix = root / f"d-{spec_hash(specs / 'd.yaml')[:16]}"
+    (prefix / "conda-meta").mkdir(parents=True)
+    provision({"d": specs / "d.yaml"}, root, solver=str(solver))
+    assert (prefix / BUILT_MARKER).exists()
+    assert len(builds()) == 6
+
+    (specs / "c.yaml").write_text("broken\n")
+    with pytest.raises(RuntimeError, match="c"):
+        provision({"c": specs / "c.yaml"}, root, solver=str(solver))
+    assert "c" not in read_registry(root)
+
+
+def test_unpack_env(tmp_path: Path):
+    env = tmp_path / "env"
+    (env / "bin").mkdir(parents=True)
+    (env / "bin" / "activate").write_text("export GREETING=unpacked\n")
+    (env / "bin" / "conda-unpack").write_text(
+        f"#!/bin/bash\necho unpacked >> {tmp_path / 'unpacks'}\n"
+    )
+    (env / "bin" / "conda-unpack").chmod(0o755)
+    pack = tmp_path / "env-1234.tar.gz"
+    subprocess.run(["tar", "-czf", pack, "-C", env, "."], check=True)
+
+    runner = LocalRunner(
+        CondaManager(),
+        options={
+            "conda_env": "env",
+            "conda_pack": str(pack),
+            "env_scratch": "$AUTOBFX_TEST_SCRATCH",
+            "log_fp": tmp_path / "test.log",
+        },
+    )
+    os.environ["AUTOBFX_TEST_SCRATCH"] = str(tmp_path / "scratch")
+    try:
+        for _ in range(2):
+            runner.run_cmd(["echo", "$GREETING", ">>", str(tmp_path / "out")])
+    finally:
+        del os.environ["AUTOBFX_TEST_SCRATCH"]
+
+    assert (tmp_path / "out").read_text() == "unpacked\n" * 2
+    assert (tmp_path / "unpacks").read_text() == "unpacked\n"
+    assert (tmp_path / "scratch" / "autobfx-envs" / "env-1234" / ".unpacked").exists()
+
+
+def test_config_envs(tmp_path: Path):
+    root = tmp_path / "envs"
+    root.mkdir()
+    record = EnvRecord(
+        name="bwa", hash="1234", prefix=root / "bwa-1234", pack=root / "bwa-1234.tar.gz"
+    )
+    (root / "registry.json").write_text(
+        json.dumps({"bwa": record.model_dump(mode="json")})
+    )
+    config = Config(
+        version="0.0.0",
+        name="test",
+        project_fp=tmp_path,
+        swm="conda",
+        env_specs="envs",
+        envs_fp=root,
+        env_scratch="$TMPDIR",
+    )
+
+    options = config.get_runner(FlowConfig(conda="bwa")).options
+    assert options["conda_env"] == str(root / "bwa-1234")
+    assert options["conda_pack"] == str(root / "bwa-1234.tar.gz")
+    assert config.get_runner(FlowConfig(conda="other")).options["conda_env"] == "other"
@@ -0,0 +1,93 @@
+import gzip
+import json
+import pytest
+from pathlib import Path
+from autobfx.lib import fastqstats
+from autobfx.lib.fastqstats import fastq_stats, sample_stats
+
+
+def naive_stats(fp: Path) -> dict:
+    with gzip.open(fp, "rt") as f:
+        lines = f.read().splitlines()
+    seqs, quals = lines[1::4], lines[3::4]
+    max_len = max(map(len, seqs))
+    covered = [sum(len(s) > i for s in seqs) for i in range(max_len)]
+    lengths = {}
+    for s in seqs:
+        lengths[len(s)] = lengths.get(len(s), 0) + 1
+    return {
+        "reads": len(seqs),
+        "bases": sum(map(len, seqs)),
+        "lengths": sorted([l, n] for l, n in lengths.items()),
+        "mean_quality": [
+            round(sum(ord(q[i]) - 33 for q in quals if len(q) > i) / covered[i], 2)
+            for i in range(max_len)
+        ],
+        "G": [
+            round(sum(s[i] == "G" for s in seqs if len(s) > i) / covered[i], 4)
+            for i in range(max_len)
+        ],
+    }
+
+
+def test_fastq_stats(data_fp: Path, monkeypatch):
+    fp = data_fp / "reads" / "LONG_R1.fastq.gz"
+    expected = naive_stats(fp)
+    stats = fastq_stats(fp)
+
+    assert {k: stats[k] for k in ["reads", "bases", "lengths", "mean_quality"]} == {
+        k: expected[k] for k in ["reads", "bases", "lengths", "mean_quality"]
+    }
+    assert stats["composition"]["G"] == expected["G"]
+    assert 0 < stats["gc"] < 1
+
+    # Records split across blocks give the same stats
+    monkeypatch.setattr(fastqstats, "BLOCK_SIZE", 37)
+    assert fastq_stats(fp) == stats
+
+
+def test_fastq_stats_ragged(tmp_path: Path):
+    fp = tmp_path / "reads.fastq"
+    # Reads of different lengths, and no newline at the end
+    fp.write_bytes(b"@r1\nACGN\n+\nIIII\n@r2\nGG\n+\n#5")
+
+    stats = fastq_stats(fp)
+    assert stats["reads"] == 2
+    assert stats["lengths"] == [[2, 1], [4, 1]]
+    assert stats["mean_quality"] == [(40 + 2) / 2, (40 + 20) / 2, 40, 40]
+    assert stats["composition"]["G"] == [0.5, 0.5, 1, 0]
+    assert stats["composition"]["N"] == [0, 0, 0, 1]
+    assert stats["gc"] == pytest.approx(4 / 6)
+
+
+def test_fastq_stats_crlf(tmp_path: Path):
+    fp = tmp_path / "reads.fastq"
+    fp.write_bytes(b"@a\r\nACGT\r\n+\r\nIIII\r\n")
+
+    # Carriage returns aren't counted as bases
+    stats = fastq_stats(fp)
+    assert stats["lengths"] == [[4, 1]]
+    assert stats["mean_quality"] == [40, 40, 40, 40]
+    assert stats["composition"]["N"] == [0, 0, 0, 0]
+
+
+def test_fastq_stats_malformed(tmp_path: Path):
+    fp = tmp_path / "reads.fastq"
+    fp.write_bytes(b"@r1\nACGT\n+\nIIII\n@r2\nAC\n")
+    with pytest.raises(ValueError):
+        fastq_stats(fp)
+
+    fp.write_bytes(b"@r1\nACGT\n+\nIII\n")
+    with pytest.raises(ValueError):
+        fastq_stats(fp)
+
+
+def test_sample_stats(data_fp: Path, tmp_path: Path):
+    read_fps = [data_fp / "reads" / f"SHORT_R{r}.fastq.gz" for r in (1, 2)]
+    out_fp = tmp_path / "stats" / "SHORT.json"
+
+    counts = sample_stats(read_fps, out_fp)
+    stats = json.loads(out_fp.read_text())
+    assert list(stats) == ["SHORT_R1.fastq.gz", "SHORT_R2.fastq.gz"]
+    assert counts == {name: s["reads"] for name, s in stats.items()}
+    assert counts["SHORT_R1.fastq.gz"] == counts["SHORT_R2.fastq.gz"] > 0
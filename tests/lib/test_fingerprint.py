@@ -0,0 +1,46 @@
+from pathlib import Path
+from autobfx.lib.fingerprint import changed, fingerprint
+from autobfx.lib.store import CompletionStore
+
+
+def test_fingerprint_stat(tmp_path: Path):
+    fp = tmp_path / "a.txt"
+    fp.write_text("hello")
+    fingerprints = fingerprint([fp, tmp_path / "missing.txt"])
+
+    assert fingerprints[str(fp)][0] == 5
+    assert fingerprints[str(fp)][2] is None
+    assert fingerprints[str(tmp_path / "missing.txt")] is None
+
+
+def test_fingerprint_content(tmp_path: Path):
+    store = CompletionStore(tmp_path / "test.db")
+    fp = tmp_path / "a.txt"
+    fp.write_text("hello")
+    before = fingerprint([fp], "content", store)
+
+    assert before[str(fp)][2]
+    assert store.digests([fp])[str(fp)] == before[str(fp)]
+
+    # Rewriting the same content changes the mtime but not the digest
+    fp.write_text("hello")
+    after = fingerprint([fp], "content", store)
+    assert not changed(before, after)
+
+    fp.write_text("world")
+    assert changed(before, fingerprint([fp], "content", store)) == [str(fp)]
+
+
+def test_changed_stat():
+    recorded = {"a": [1, 10, None], "b": [2, 20, None]}
+
+    assert changed(recorded, {"a": [1, 10, None], "b": [2, 20, None]}) == []
+    assert changed(recorded, {"a": [1, 11, None], "b": [2, 20, None]}) == ["a"]
+    assert changed(recorded, {"a": [1, 10, None], "c": [3, 30, None]}) == ["c"]
+    assert changed({}, {"a": None}) == []
+
+
+def test_changed_transient():
+    # Inputs that only existed on scratch are unchanged until they show up
+    assert changed({"a": []}, {"a": None}) == []
+    assert changed({"a": []}, {"a": [1, 10, None]}) == ["a"]
@@ -0,0 +1,442 @@
+import networkx as nx
+import pytest
+from pathlib import Path
+from autobfx.lib.config import RunnerConfig
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.io import IOObject
+from autobfx.lib.iterator import AutobfxIterator
+from autobfx.lib.runner import LocalRunner, NoManager
+from autobfx.lib.task import AutobfxTask, AutobfxTaskArray
+
+
+def make_tasks(name: str, iterator: AutobfxIterator) -> list[AutobfxTask]:
+    return [
+        AutobfxTask(name=name, ids=kvs, func=lambda *a: None, project_fp=Path("."))
+        for kvs in iterator
+    ]
+
+
+def test_flow_index():
+    samples = AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}])
+    flow = AutobfxFlow.from_tasks("test", make_tasks("a", samples))
+
+    assert flow.get_task("a", {"sample": "s2"}).id_dict == {"sample": "s2"}
+    assert flow.lookup("a", {"sample": "s3"}) == []
+
+
+def test_flow_index_compose():
+    samples = AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}])
+    flow = AutobfxFlow.compose_flows(
+        "test",
+        [
+            AutobfxFlow.from_tasks("a", make_tasks("a", samples)),
+            AutobfxFlow.from_tasks("b", make_tasks("b", samples)),
+        ],
+    )
+
+    assert len(flow.index["a"]) == 2
+    assert len(flow.index["b"]) == 2
+
+
+def test_connect_one_to_one():
+    samples = AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}])
+    flow = AutobfxFlow.from_tasks(
+        "test", make_tasks("a", samples) + make_tasks("b", samples)
+    )
+    flow.connect_one_to_one(samples, "a", "b")
+
+    assert len(flow.dag.edges) == 2
+    for u, v in flow.dag.edges:
+        assert u.name == "a" and v.name == "b"
+        assert u.id_dict == v.id_dict
+
+
+def test_connect_one_to_many():
+    hosts = AutobfxIterator([{"host": "h1"}, {"host": "h2"}])
+    pairs = AutobfxIterator(
+        [{"sample": s, "host": h} for s in ["s1", "s2", "s3"] for h in ["h1", "h2"]]
+    )
+    flow = AutobfxFlow.from_tasks(
+        "test", make_tasks("index", hosts) + make_tasks("align", pairs)
+    )
+    flow.connect_one_to_many(hosts, "index", "align")
+
+    assert len(flow.dag.edges) == 6
+    assert all(u.id_dict["host"] == v.id_dict["host"] for u, v in flow.dag.edges)
+
+
+def test_connect_many_to_one():
+    samples = AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}])
+    pairs = AutobfxIterator(
+        [{"sample": s, "host": h} for s in ["s1", "s2"] for h in ["h1", "h2", "h3"]]
+    )
+    flow = AutobfxFlow.from_tasks(
+        "test", make_tasks("align", pairs) + make_tasks("filter", samples)
+    )
+    flow.connect_many_to_one(samples, "align", "filter")
+
+    assert len(flow.dag.edges) == 6
+    for t in flow.lookup("filter", {}):
+        assert len(list(flow.dag.predecessors(t))) == 3
+
+
+def test_connect_infers_cardinality():
+    samples = AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}])
+    hosts = AutobfxIterator([{"host": "h1"}, {"host": "h2"}])
+    pairs = AutobfxIterator(
+        [{"sample": s, "host": h} for s in ["s1", "s2"] for h in ["h1", "h2"]]
+    )
+    flow = AutobfxFlow.from_tasks(
+        "test",
+        make_tasks("heyfastq", samples)
+        + make_tasks("index", hosts)
+        + make_tasks("align", pairs)
+        + make_tasks("sort", pairs)
+        + make_tasks("filter", samples),
+    )
+
+    assert flow.connect("index", "align") == "one_to_many"
+    assert flow.connect("heyfastq", "align", on=["sample"]) == "one_to_many"
+    assert flow.connect("align", "sort") == "one_to_one"
+    assert flow.connect("sort", "filter") == "many_to_one"
+    assert len(flow.dag.edges) == 4 + 4 + 4 + 4
+    for t in flow.lookup("sort", {}):
+        assert [p.id_dict for p in flow.dag.predecessors(t)] == [t.id_dict]
+
+
+def test_connect_many_to_many():
+    pairs = AutobfxIterator(
+        [{"sample": s, "host": h} for s in ["s1", "s2"] for h in ["h1", "h2"]]
+    )
+    flow = AutobfxFlow.from_tasks(
+        "test", make_tasks("align", pairs) + make_tasks("sort", pairs)
+    )
+
+    with pytest.raises(ValueError):
+        flow.connect("align", "sort", on=["sample"])
+
+
+def make_chain(tmp_path: Path) -> tuple[AutobfxFlow, AutobfxTask, AutobfxTask]:
+    (tmp_path / "in.txt").write_text("in")
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    a = AutobfxTask(
+        name="a",
+        ids={"sample": "s1"},
+        func=lambda *a: None,
+        project_fp=tmp_path,
+        extra_inputs={"in": [tmp_path / "in.txt"]},
+        extra_outputs={"out": [tmp_path / "a.txt"]},
+    )
+    b = AutobfxTask(
+        name="b",
+        ids={"sample": "s1"},
+        func=lambda *a: None,
+        project_fp=tmp_path,
+        extra_inputs={"in": [tmp_path / "a.txt"]},
+        extra_outputs={"out": [tmp_path / "b.txt"]},
+    )
+    flow = AutobfxFlow.from_tasks("test", [a, b])
+    flow.connect("a", "b")
+    for t in [a, b]:
+        t.store.record(
+            t.name, t.id_dict, [o.fp for o in t.outputs], inputs=t.input_fingerprints()
+        )
+
+    return flow, a, b
+
+
+def test_plan_nothing_changed(tmp_path: Path):
+    flow, a, b = make_chain(tmp_path)
+
+    assert flow.plan("lazy") == (set(), set())
+    assert flow.plan("strict") == (set(), set())
+    assert flow.plan("force") == ({a, b}, set())
+
+
+def test_plan_input_changed(tmp_path: Path):
+    flow, a, b = make_chain(tmp_path)
+    (tmp_path / "in.txt").write_text("changed")
+
+    assert flow.plan("lazy") == ({a}, {b})
+    assert flow.plan("strict") == ({a, b}, set())
+    with pytest.raises(ValueError):
+        flow.plan("sometimes")
+
+
+def test_plan_downstream_changed(tmp_path: Path):
+    flow, a, b = make_chain(tmp_path)
+    (tmp_path / "a.txt").write_text("changed")
+
+    assert flow.plan("lazy") == ({b}, set())
+
+
+def test_plan_output_missing(tmp_path: Path):
+    flow, a, b = make_chain(tmp_path)
+    (tmp_path / "b.txt").unlink()
+
+    assert flow.plan("lazy") == ({b}, set())
+
+
+def test_submission_order_arrays():
+    samples = AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}])
+    flow = AutobfxFlow.from_tasks(
+        "test", make_tasks("a", samples) + make_tasks("b", samples)
+    )
+    flow.connect("a", "b")
+    tasks = list(nx.topological_sort(flow.dag))
+    array = AutobfxTaskArray(flow.lookup("b", {}))
+
+    assert flow._submission_order(tasks, {}) == tasks
+    order = flow._submission_order(tasks, {t: array for t in array.tasks})
+    assert len(order) == 3 and order[-1] is array
+
+
+def test_priorities(tmp_path: Path):
+    samples = AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}])
+    tasks = [
+        AutobfxTask(name=name, ids=kvs, func=lambda *a: None, project_fp=tmp_path)
+        for name in ["fastqc", "index", "align", "sort"]
+        for kvs in samples
+    ]
+    flow = AutobfxFlow.from_tasks("test", tasks)
+    flow.connect("index", "align")
+    flow.connect("align", "sort")
+    priorities = flow.priorities(tasks)
+
+    assert priorities[flow.get_task("index", {"sample": "s1"})] == 1
+    assert priorities[flow.get_task("sort", {"sample": "s1"})] == pytest.approx(1 / 3)
+    assert priorities[flow.get_task("fastqc", {"sample": "s1"})] == pytest.approx(1 / 3)
+    # The long chains start before the fastqc tasks
+    order = flow._submission_order(tasks, {}, priorities)
+    assert [t.name for t in order[:2]] == ["index", "index"]
+
+
+def copy_file(input_reads, extra_inputs, output_reads, extra_outputs, log_fp, runner):
+    cmd = ["cp", str(extra_inputs["in"][0].fp), str(extra_outputs["out"][0].fp)]
+    runner.run_cmd(cmd)
+    return cmd
+
+
+def cat_file(input_reads, extra_inputs, output_reads, extra_outputs, log_fp, runner):
+    cmd = ["cat", str(extra_inputs["in"][0].fp), ">", str(extra_outputs["out"][0].fp)]
+    runner.run_cmd(cmd)
+    return cmd
+
+
+def make_fusable(
+    tmp_path: Path, scratch: str = "", streamable: bool = False, func=copy_file
+) -> AutobfxFlow:
+    (tmp_path / "in.txt").write_text("in")
+    runner = LocalRunner(
+        NoManager(),
+        options={"params": RunnerConfig(parameters={"fuse": True, "scratch": scratch})},
+    )
+    tasks = [
+        AutobfxTask(
+            name=name,
+            ids={"sample": "s1"},
+            func=func,
+            project_fp=tmp_path,
+            extra_inputs={"in": [IOObject(tmp_path / f"{i}.txt", streamable)]},
+            extra_outputs={"out": [IOObject(tmp_path / f"{o}.txt", streamable)]},
+            runner=runner,
+        )
+        for name, i, o in [("a", "in", "a"), ("b", "a", "b"), ("c", "b", "c")]
+    ]
+    flow = AutobfxFlow.from_tasks("test", tasks)
+    flow.connect("a", "b")
+    flow.connect("b", "c")
+    return flow
+
+
+def test_chains(tmp_path: Path):
+    flow = make_fusable(tmp_path)
+    tasks = list(nx.topological_sort(flow.dag))
+
+    chains = flow._chains(tasks, set(tasks))
+    assert len(set(chains.values())) == 1
+    assert chains[tasks[0]].tasks == tasks
+    assert flow._submission_order(tasks, chains) == [chains[tasks[0]]]
+
+    # Rechecked tasks aren't fused
+    assert set(flow._chains(tasks, set(tasks[:2]))[tasks[0]].tasks) == set(tasks[:2])
+
+    # A branch off the chain gets the file it reads written out, rather than kept on scratch
+    d = AutobfxTask(
+        name="d",
+        ids={"sample": "s1"},
+        func=None,
+        project_fp=tmp_path,
+        extra_inputs={"in": [tmp_path / "b.txt"]},
+    )
+    flow.add_task(d)
+    flow.connect("b", "d")
+    chain = flow._chains(tasks, set(tasks))[tasks[0]]
+    assert chain.tasks == tasks
+    assert chain.external == {tmp_path / "b.txt"}
+    assert list(chain.intermediates("/scratch")) == [str(tmp_path / "a.txt")]
+
+    # As long as it isn't also something the chain has to wait for
+    flow.dag.add_edge(d, tasks[2])
+    assert flow._chains(tasks, set(tasks))[tasks[0]].tasks == tasks[:2]
+
+
+def test_chain_scratch(tmp_path: Path):
+    flow = make_fusable(tmp_path, scratch=str(tmp_path / "scratch"))
+    tasks = list(nx.topological_sort(flow.dag))
+    chain = flow._chains(tasks, set(tasks))[tasks[0]]
+
+    cmds = chain._chain_func.fn()
+
+    # Only the end of the chain lands on shared storage, but every step is recorded
+    assert (tmp_path / "c.txt").read_text() == "in"
+    assert not (tmp_path / "a.txt").exists() and not (tmp_path / "b.txt").exists()
+    assert not list((tmp_path / "scratch").iterdir())
+    assert cmds[1] == ["cp", str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    assert len(tasks[0].store.completed([tmp_path / f"{n}.txt" for n in "abc"])) == 3
+    assert flow.plan("lazy") == (set(), set())
+
+
+def test_chain_streams(tmp_path: Path):
+    flow = make_fusable(tmp_path, streamable=True, func=cat_file)
+    tasks = list(nx.topological_sort(flow.dag))
+    chain = flow._chains(tasks, set(tasks))[tasks[0]]
+
+    assert chain.streams() == [
+        (0, str(tmp_path / "a.txt")),
+        (1, str(tmp_path / "b.txt")),
+    ]
+    chain._chain_func.fn()
+
+    # Nothing but the end of the chain was ever written to a file
+    assert (tmp_path / "c.txt").read_text() == "in"
+    assert not (tmp_path / "a.txt").exists() and not (tmp_path / "b.txt").exists()
+    assert flow.plan("lazy") == (set(), set())
+
+
+def test_chain_streams_tee(tmp_path: Path):
+    flow = make_fusable(tmp_path, streamable=True, func=cat_file)
+    tasks = list(nx.topological_sort(flow.dag))
+    d = AutobfxTask(
+        name="d",
+        ids={"sample": "s1"},
+        func=cat_file,
+        project_fp=tmp_path,
+        extra_inputs={"in": [tmp_path / "a.txt"]},
+        extra_outputs={"out": [tmp_path / "d.txt"]},
+    )
+    flow.add_task(d)
+    flow.connect("a", "d")
+    chain = flow._chains(tasks, set(tasks))[tasks[0]]
+
+    # a.txt is read outside the chain as well, so it's still streamed but also copied out on the way
+    assert chain.streams() == [
+        (0, str(tmp_path / "a.txt")),
+        (1, str(tmp_path / "b.txt")),
+    ]
+    chain._chain_func.fn()
+    assert (tmp_path / "a.txt").read_text() == "in"
+    assert not (tmp_path / "b.txt").exists()
+    assert (tmp_path / "c.txt").read_text() == "in"
+    # It's recorded like any other file, so only d still has to run
+    assert flow.plan("lazy") == ({d}, set())
+
+
+def test_chain_stream_failure(tmp_path: Path):
+    flow = make_fusable(tmp_path, streamable=True, func=cat_file)
+    tasks = list(nx.topological_sort(flow.dag))
+    chain = flow._chains(tasks, set(tasks))[tasks[0]]
+    (tmp_path / "in.txt").unlink()
+    (tmp_path / "in.txt").mkdir()
+
+    # The producer fails, which mustn't leave the rest of the chain waiting on its pipe
+    with pytest.raises(RuntimeError):
+        chain._chain_func.fn()
+    assert not tasks[0].store.completed([tmp_path / "c.txt"])
+
+
+def test_screened_out(tmp_path: Path):
+    flow = make_fusable(tmp_path)
+    tasks = list(nx.topological_sort(flow.dag))
+    tasks[0].screen = lambda: True
+
+    # Screening out the first task skips everything downstream of it too
+    assert [t._runner_func.fn() for t in tasks] == [None, None, None]
+    assert not list(tmp_path.glob("[abc].txt"))
+    records = tasks[0].store.get([tmp_path / f"{n}.txt" for n in "abc"])
+    assert {r["status"] for r in records.values()} == {"screened_out"}
+    assert flow.plan("lazy") == (set(), set())
+
+
+def test_screened_out_stale(tmp_path: Path):
+    flow = make_fusable(tmp_path)
+    tasks = list(nx.topological_sort(flow.dag))
+    tasks[0].screen = lambda: True
+    [t._runner_func.fn() for t in tasks]
+
+    # Once the screened out task's inputs change, its old screen doesn't hold for anything downstream
+    assert tasks[1]._screened_out()
+    (tmp_path / "in.txt").write_text("changed")
+    assert not tasks[1]._screened_out()
+    assert flow.plan("lazy") == ({tasks[0]}, set(tasks[1:]))
+
+
+def test_chain_screened_out(tmp_path: Path):
+    flow = make_fusable(tmp_path)
+    tasks = list(nx.topological_sort(flow.dag))
+    tasks[0].screen = lambda: True
+    chain = flow._chains(tasks, set(tasks))[tasks[0]]
+
+    assert chain._chain_func.fn() == [None, None, None]
+    assert not list(tmp_path.glob("[abc].txt"))
+    assert flow.plan("lazy") == (set(), set())
+
+
+def cat_files(input_reads, extra_inputs, output_reads, extra_outputs, log_fp, runner):
+    cmd = [
+        "cat",
+        *[str(i.fp) for i in extra_inputs["in"]],
+        ">",
+        str(extra_outputs["out"][0].fp),
+    ]
+    runner.run_cmd(cmd)
+    return cmd
+
+
+def test_drop_screened(tmp_path: Path):
+    (tmp_path / "in.txt").write_text("in")
+    tasks = [
+        AutobfxTask(
+            name=name,
+            ids={"sample": "s1"},
+            func=copy_file,
+            project_fp=tmp_path,
+            extra_inputs={"in": [IOObject(tmp_path / "in.txt")]},
+            extra_outputs={"out": [IOObject(tmp_path / f"{name}.txt")]},
+            screen=lambda name=name: name == "b",
+        )
+        for name in ["a", "b"]
+    ]
+    merge = AutobfxTask(
+        name="merge",
+        ids={"sample": "s1"},
+        func=cat_files,
+        project_fp=tmp_path,
+        extra_inputs={"in": [IOObject(tmp_path / f"{n}.txt") for n in "ab"]},
+        extra_outputs={"out": [IOObject(tmp_path / "merge.txt")]},
+        drop_screened=True,
+    )
+    flow = AutobfxFlow.from_tasks("test", tasks + [merge])
+    flow.connect("a", "merge")
+    flow.connect("b", "merge")
+
+    # The merge goes ahead without the screened out input
+    for t in tasks + [merge]:
+        t._runner_func.fn()
+    assert (tmp_path / "merge.txt").read_text() == "in"
+    assert (
+        merge.store.get([tmp_path / "merge.txt"])[str(tmp_path / "merge.txt")]["status"]
+        == "completed"
+    )
+    assert flow.plan("lazy") == (set(), set())
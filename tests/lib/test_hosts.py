@@ -0,0 +1,42 @@
+import io
+import subprocess
+from pathlib import Path
+from autobfx.lib.hosts import combine_fastas_cmd, count_hosts
+
+
+def test_combine_fastas(tmp_path: Path):
+    (tmp_path / "a.fasta").write_text(">chr1 first\nACGT\n>chr2\nGGCC\n")
+    subprocess.run(
+        ["bash", "-c", f"gzip -c {tmp_path / 'a.fasta'} > {tmp_path / 'a.fasta.gz'}"],
+        check=True,
+    )
+    (tmp_path / "b.fasta").write_text(">chr1\nTTTT\n")
+
+    cmd = combine_fastas_cmd(
+        {"a": tmp_path / "a.fasta.gz", "b": tmp_path / "b.fasta"},
+        tmp_path / "combined.fasta",
+    )
+    subprocess.run(["bash", "-c", cmd], check=True)
+
+    assert (tmp_path / "combined.fasta").read_text() == (
+        ">a|chr1 first\nACGT\n>a|chr2\nGGCC\n>b|chr1\nTTTT\n"
+    )
+
+
+def test_count_hosts():
+    sam = (
+        b"@HD\tVN:1.6\n"
+        b"@SQ\tSN:human|chr1\tLN:100\n"
+        b"@SQ\tSN:mouse|chr1\tLN:100\n"
+        b"@SQ\tSN:phix174|NC_001422.1\tLN:100\n"
+        b"r1\t0\thuman|chr1\t1\t60\t4M\t*\t0\t0\tACGT\tIIII\n"
+        b"r2\t4\t*\t0\t0\t*\t*\t0\t0\tACGT\tIIII\n"
+        b"r3\t16\tphix174|NC_001422.1\t1\t60\t4M\t*\t0\t0\tACGT\tIIII\n"
+        b"r3\t256\thuman|chr1\t1\t0\t4M\t*\t0\t0\tACGT\tIIII\n"
+        b"r4\t2048\thuman|chr1\t1\t0\t4M\t*\t0\t0\tACGT\tIIII\n"
+    )
+    out = io.BytesIO()
+
+    # Only primary alignments count, and the stream passes through untouched
+    assert count_hosts(io.BytesIO(sam), out) == {"human": 1, "mouse": 0, "phix174": 1}
+    assert out.getvalue() == sam
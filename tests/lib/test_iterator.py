@@ -0,0 +1,65 @@
+import pytest
+from autobfx.lib.iterator import AutobfxIterator
+
+
+@pytest.fixture
+def samples() -> AutobfxIterator:
+    return AutobfxIterator([{"sample": "s1"}, {"sample": "s2"}, {"sample": "s3"}])
+
+
+@pytest.fixture
+def hosts() -> AutobfxIterator:
+    return AutobfxIterator([{"host": "h1"}, {"host": "h2"}])
+
+
+def test_iterator(samples):
+    assert list(samples) == [{"sample": "s1"}, {"sample": "s2"}, {"sample": "s3"}]
+    assert len(samples) == 3
+    assert samples.degree() == 1
+
+
+def test_iterator_product(samples, hosts):
+    it = AutobfxIterator.expand([samples, hosts])
+
+    assert len(it) == 6
+    assert it.degree() == 2
+    assert len(it.factors) == 2
+    assert list(it)[:2] == [
+        {"sample": "s1", "host": "h1"},
+        {"sample": "s1", "host": "h2"},
+    ]
+    with pytest.raises(ValueError):
+        samples.product(samples)
+
+
+def test_iterator_zip(samples):
+    lanes = AutobfxIterator([{"lane": "L1"}, {"lane": "L2"}, {"lane": "L3"}])
+
+    assert list(samples.zip(lanes))[2] == {"sample": "s3", "lane": "L3"}
+    with pytest.raises(ValueError):
+        samples.zip(AutobfxIterator([{"lane": "L1"}]))
+
+
+def test_iterator_filter_select(samples, hosts):
+    it = samples.product(hosts).filter(lambda d: d["host"] == "h2")
+
+    assert len(it) == 3
+    assert list(it.select("sample")) == list(samples)
+    assert list(samples.product(hosts).select("host")) == list(hosts)
+
+
+def test_iterator_join(samples):
+    groups = AutobfxIterator(
+        [{"sample": "s1", "group": "a"}, {"sample": "s3", "group": "b"}]
+    )
+
+    assert list(samples.join(groups)) == [
+        {"sample": "s1", "group": "a"},
+        {"sample": "s3", "group": "b"},
+    ]
+
+
+def test_iterator_gather_empty_override():
+    empty = AutobfxIterator([])
+
+    assert AutobfxIterator.gather([{"sample": "s1"}], empty) is empty
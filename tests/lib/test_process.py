@@ -0,0 +1,59 @@
+import math
+import pytest
+import sys
+import time
+from pathlib import Path
+from autobfx.lib.process import ProcessEngine
+from autobfx.lib.runner import LocalRunner, NoManager, VenvManager
+
+
+def test_process_result(tmp_path: Path):
+    log_fp = tmp_path / "test.log"
+    result = ProcessEngine.shared().run("echo out; echo err >&2; exit 3", log_fp)
+
+    assert result.exit_code == 3
+    assert not result.ok
+    assert log_fp.read_text() == "out\nerr\n"
+    assert result.max_rss_kb > 0
+    assert result.wall_s >= result.cpu_s >= 0
+
+
+def test_process_concurrency():
+    engine = ProcessEngine.shared()
+    start = time.monotonic()
+    futures = [engine.submit("sleep 0.5") for _ in range(200)]
+
+    assert all(f.result().ok for f in futures)
+    assert time.monotonic() - start < 5
+
+
+def test_local_runner_failure(tmp_path: Path):
+    runner = LocalRunner(NoManager(), options={"log_fp": tmp_path / "test.log"})
+
+    assert runner.run_cmd(["echo", "hi"]).ok
+    with pytest.raises(RuntimeError, match="exit code 1"):
+        runner.run_cmd(["false"])
+    assert (tmp_path / "test.log").read_text() == "hi\n"
+
+
+def test_local_runner_func():
+    runner = LocalRunner(NoManager())
+
+    assert runner.run_func(math.factorial, [5]) == 120
+
+
+def test_local_runner_func_env(tmp_path: Path):
+    # A stand in venv whose activate script puts this python first on the PATH
+    venv = tmp_path / "venv"
+    (venv / "bin").mkdir(parents=True)
+    (venv / "bin" / "activate").write_text(
+        f"export PATH={Path(sys.executable).parent}:$PATH\n"
+    )
+    runner = LocalRunner(
+        VenvManager(), options={"venv": str(venv), "log_fp": tmp_path / "test.log"}
+    )
+
+    assert runner.run_func(math.factorial, [5]) == 120
+    with pytest.raises(ValueError):
+        runner.run_func(int, ["x"])
+    assert list((tmp_path / ".calls").glob("*.result"))
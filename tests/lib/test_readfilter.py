@@ -0,0 +1,52 @@
+import gzip
+import os
+from pathlib import Path
+from autobfx.lib import readfilter
+from autobfx.lib.readfilter import filter_host_reads, hash_names, read_name
+
+
+def fnv1a(name: bytes) -> int:
+    h = 0xCBF29CE484222325
+    for c in name:
+        h = ((h ^ c) * 0x100000001B3) % 2**64
+    return h
+
+
+def test_hash_names():
+    names = [b"read1", b"", b"NZ_CP069563.1_22022_22543_4:0:0_2:0:0_0"]
+    assert [int(h) for h in hash_names(names)] == [fnv1a(n) for n in names]
+    assert read_name(b"@read1/2 extra\n") == read_name(b"read1") == b"read1"
+
+
+def test_filter_host_reads(data_fp: Path, tmp_path: Path, monkeypatch):
+    # Stands in for `samtools view -F 4 ... fp`, the test SAMs only have mapped reads
+    bin_fp = tmp_path / "bin"
+    bin_fp.mkdir()
+    (bin_fp / "samtools").write_text('#!/bin/bash\ngrep -v "^@" "${@: -1}"\n')
+    (bin_fp / "samtools").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_fp}:{os.environ['PATH']}")
+    monkeypatch.setattr(readfilter, "BLOCK_SIZE", 7)
+
+    reads = [data_fp / "reads" / f"LONG_R{r}.fastq.gz" for r in (1, 2)]
+    with gzip.open(reads[0]) as f:
+        names = [read_name(l) for i, l in enumerate(f) if i % 4 == 0]
+    # Two hosts, with a read (pair) mapped to both
+    for host, host_names in [("human", names[:10]), ("mouse", names[5:20:2])]:
+        (tmp_path / f"{host}.sam").write_bytes(
+            b"@HD\tVN:1.6\n"
+            + b"".join(
+                b"%s\t0\tchr1\t1\t60\t4M\t*\t0\t0\tACGT\tIIII\n" % n for n in host_names
+            )
+        )
+
+    out = [tmp_path / "out" / f"LONG_R{r}.fastq.gz" for r in (1, 2)]
+    counts = filter_host_reads(
+        [tmp_path / "human.sam", tmp_path / "mouse.sam"], reads, out
+    )
+
+    removed = set(names[:10]) | set(names[5:20:2])
+    assert counts == {"reads": len(names), "host": len(removed)}
+    for fp in out:
+        with gzip.open(fp) as f:
+            kept = [read_name(l) for i, l in enumerate(f) if i % 4 == 0]
+        assert kept == [n for n in names if n not in removed]
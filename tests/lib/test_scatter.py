@@ -0,0 +1,142 @@
+import gzip
+import json
+import pytest
+from pathlib import Path
+from autobfx.lib.config import RunnerConfig
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.runner import LocalRunner, NoManager
+from autobfx.lib.scatter import chunk_count, merge_cmd, merge_counts, split_fastq
+from autobfx.lib.task import AutobfxTask
+
+
+def read_names(fp: Path) -> list[bytes]:
+    with gzip.open(fp) as f:
+        return [line.split()[0] for i, line in enumerate(f) if i % 4 == 0]
+
+
+def test_chunk_count():
+    assert chunk_count(0) == 1
+    assert chunk_count(5000 * 2**20, chunk_mb=2000) == 3
+    assert chunk_count(10**12, max_chunks=8) == 8
+
+
+def test_split_fastq(data_fp: Path, tmp_path: Path):
+    fps = [data_fp / "reads" / f"LONG_R{r}.fastq.gz" for r in (1, 2)]
+
+    counts = split_fastq(fps, tmp_path, 3, block=100)
+
+    assert sum(counts) == 2000 and len(counts) == 3
+    for fp in fps:
+        chunks = [read_names(tmp_path / str(i) / fp.name) for i in range(3)]
+        assert sorted(n for c in chunks for n in c) == sorted(read_names(fp))
+    # Pairs stay together
+    for i in range(3):
+        r1 = read_names(tmp_path / str(i) / fps[0].name)
+        r2 = read_names(tmp_path / str(i) / fps[1].name)
+        assert len(r1) == counts[i] and [n[:-2] for n in r1] == [n[:-2] for n in r2]
+
+
+def test_merge_cmd(tmp_path: Path):
+    chunks = [tmp_path / "0.bam", tmp_path / "1.bam"]
+    assert merge_cmd(tmp_path / "out.bam", chunks, 4)[:5] == [
+        "samtools",
+        "merge",
+        "-f",
+        "-@",
+        "4",
+    ]
+    assert merge_cmd(tmp_path / "out.fastq.gz", chunks)[0] == "cat"
+    assert "merge_counts" in merge_cmd(tmp_path / "out.json", chunks)
+    with pytest.raises(ValueError):
+        merge_cmd(tmp_path / "out.html", chunks)
+
+
+def test_merge_counts(tmp_path: Path):
+    chunks = [tmp_path / "0.json", tmp_path / "1.json"]
+    chunks[0].write_text(json.dumps({"human": 3, "mouse": {"chr1": 1}}))
+    chunks[1].write_text(json.dumps({"human": 2, "phix": 5, "mouse": {"chr1": 2}}))
+
+    assert merge_counts(tmp_path / "out.json", chunks) == {
+        "human": 5,
+        "mouse": {"chr1": 3},
+        "phix": 5,
+    }
+    assert json.loads((tmp_path / "out.json").read_text())["human"] == 5
+
+    # Per position stats (e.g. from fastq_stats) aren't counts, so they can't be summed
+    chunks[1].write_text(json.dumps({"human": 2, "mean_quality": [30.5, 31.0]}))
+    with pytest.raises(ValueError):
+        merge_counts(tmp_path / "out.json", chunks)
+
+
+def copy_reads(input_reads, extra_inputs, output_reads, extra_outputs, log_fp, runner):
+    cmd = ["cp", str(input_reads[0].fp), str(output_reads[0].fp)]
+    cmd += ["&&", "cp", str(input_reads[0].r2), str(output_reads[0].r2)]
+    runner.run_cmd(cmd)
+    return cmd
+
+
+def test_scatter_task(data_fp: Path, tmp_path: Path):
+    reads = IOReads(
+        data_fp / "reads" / "LONG_R1.fastq.gz", data_fp / "reads" / "LONG_R2.fastq.gz"
+    )
+    out = reads.get_output_reads(tmp_path / "out")
+    (tmp_path / "out").mkdir()
+    t = AutobfxTask(
+        name="copy",
+        ids={"sample": "LONG"},
+        func=copy_reads,
+        project_fp=tmp_path,
+        input_reads=[reads],
+        output_reads=[out],
+        log_fp=tmp_path / "logs" / "LONG.log",
+        runner=LocalRunner(
+            NoManager(), options={"params": RunnerConfig(parameters={"scatter": 4})}
+        ),
+    )
+    t._setup_run()
+
+    cmd = t._runner_func.fn()
+
+    assert len(cmd["chunks"]) == 4
+    for fp, out_fp in zip(reads.paths(), out.paths()):
+        assert sorted(read_names(out_fp)) == sorted(read_names(fp))
+    assert not (tmp_path / ".autobfx" / "chunks").exists() or not list(
+        (tmp_path / ".autobfx" / "chunks").iterdir()
+    )
+    assert t.store.completed(out.paths())
+
+
+def count_reads(input_reads, extra_inputs, output_reads, extra_outputs, log_fp, runner):
+    counts = {"reads": len(read_names(input_reads[0].fp))}
+    extra_outputs["counts"][0].fp.write_text(json.dumps(counts))
+    return counts
+
+
+def test_scatter_counts(data_fp: Path, tmp_path: Path):
+    reads = IOReads(
+        data_fp / "reads" / "LONG_R1.fastq.gz", data_fp / "reads" / "LONG_R2.fastq.gz"
+    )
+    t = AutobfxTask(
+        name="count",
+        ids={"sample": "LONG"},
+        func=count_reads,
+        project_fp=tmp_path,
+        input_reads=[reads],
+        extra_outputs={"counts": [tmp_path / "out" / "LONG.json"]},
+        runner=LocalRunner(
+            NoManager(), options={"params": RunnerConfig(parameters={"scatter": 3})}
+        ),
+    )
+    t._setup_run()
+    t._runner_func.fn()
+
+    # The counts from each chunk are summed rather than concatenated
+    assert json.loads((tmp_path / "out" / "LONG.json").read_text()) == {"reads": 2000}
+
+    # And outputs there's no way to merge are refused before anything's split
+    t.extra_outputs = {"report": [IOObject(tmp_path / "out" / "LONG.html")]}
+    t.outputs = t.extra_outputs["report"]
+    with pytest.raises(ValueError):
+        t._runner_func.fn()
+    assert not (tmp_path / ".autobfx" / "chunks" / "count_LONG").exists()
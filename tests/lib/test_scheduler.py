@@ -0,0 +1,82 @@
+import threading
+import time
+from autobfx.lib.scheduler import ResourceScheduler
+
+
+def start(scheduler: ResourceScheduler, started: list, name: str, *args):
+    def run():
+        scheduler.acquire(*args)
+        started.append(name)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    return thread
+
+
+def test_scheduler_budget():
+    scheduler = ResourceScheduler(cores=4, mem_mb=1000)
+    started = []
+    reserved = scheduler.acquire(3, 500)
+    start(scheduler, started, "big", 2, 100)
+    start(scheduler, started, "small", 1, 100)
+
+    # The small request backfills past the big one that doesn't fit yet
+    assert started == ["small"]
+    assert scheduler.stats().queued == 1
+    assert scheduler.stats().cores_used == 4
+
+    scheduler.release(*reserved)
+    time.sleep(0.05)
+    assert started == ["small", "big"]
+    assert scheduler.stats().running == 2
+
+
+def test_scheduler_priority():
+    scheduler = ResourceScheduler(cores=2, mem_mb=1000)
+    started = []
+    reserved = scheduler.acquire(2, 0)
+    start(scheduler, started, "low", 2, 0, 1)
+    start(scheduler, started, "high", 2, 0, 10)
+    # Bigger than the whole budget, so it's shrunk to fit
+    start(scheduler, started, "huge", 8, 5000, 5)
+
+    scheduler.release(*reserved)
+    time.sleep(0.05)
+    assert started == ["high"]
+    scheduler.release(2, 0)
+    time.sleep(0.05)
+    assert started == ["high", "huge"]
+    scheduler.release(2, 1000)
+    time.sleep(0.05)
+    assert started == ["high", "huge", "low"]
+    assert 0 < scheduler.stats().utilization <= 1
+
+
+def test_scheduler_no_starvation():
+    scheduler = ResourceScheduler(cores=4, mem_mb=1000)
+    stop = threading.Event()
+
+    def churn():
+        while not stop.is_set():
+            with scheduler.slot(1, 0, 0):
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=churn, daemon=True) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    started = []
+    start(scheduler, started, "big", 4, 0, 1)
+
+    # The small requests stop being admitted until the big one has the whole budget
+    deadline = time.monotonic() + 2
+    while not started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert started == ["big"]
+    assert scheduler.stats().running == 1
+
+    stop.set()
+    scheduler.release(4, 0)
+    for thread in threads:
+        thread.join(timeout=1)
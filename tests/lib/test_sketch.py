@@ -0,0 +1,58 @@
+import json
+import numpy as np
+from pathlib import Path
+from autobfx.lib import sketch
+from autobfx.lib.sketch import kmer_hashes, screen_reads, screened_out, sketch_fasta
+
+
+def revcomp(seq: bytes) -> bytes:
+    return seq[::-1].translate(bytes.maketrans(b"ACGT", b"TGCA"))
+
+
+def test_kmer_hashes():
+    seq = b"GAGTTTTATCGCTTCCATGACGCAGAAGTTAACACTTTCGG"
+
+    # Canonical k-mers hash the same from either strand, and k-mers with Ns are skipped
+    assert len(kmer_hashes(seq, 21)) == len(seq) - 20
+    assert set(kmer_hashes(seq, 21)) == set(kmer_hashes(revcomp(seq), 21))
+    assert len(kmer_hashes(seq[:20] + b"N" + seq[21:], 21)) == len(seq) - 41
+    assert len(kmer_hashes(seq[:20], 21)) == 0
+
+
+def test_sketch_fasta_chunks(data_fp: Path, monkeypatch):
+    fasta_fp = data_fp / "hosts" / "phix174.fasta"
+    whole = sketch_fasta(fasta_fp, scale=10)
+    assert len(whole) > 0
+
+    # Streaming the FASTA in small chunks gives the same sketch
+    monkeypatch.setattr(sketch, "CHUNK_SIZE", 100)
+    assert np.array_equal(sketch_fasta(fasta_fp, scale=10), whole)
+
+
+def test_screen_reads(data_fp: Path, tmp_path: Path):
+    sketch_fps = {}
+    for host in ["human", "phix174"]:
+        sketch_fps[host] = tmp_path / f"{host}.sketch.npz"
+        sketch.build_sketch(
+            data_fp / "hosts" / f"{host}.fasta", sketch_fps[host], scale=1
+        )
+
+    # Reads cut straight from phiX
+    phix = b"".join(
+        l.strip()
+        for l in (data_fp / "hosts" / "phix174.fasta").read_bytes().splitlines()[1:]
+    )
+    reads_fp = tmp_path / "reads.fastq"
+    reads_fp.write_bytes(
+        b"".join(
+            b"@r%d\n%s\n+\n%s\n" % (i, phix[i : i + 100], b"I" * 100)
+            for i in range(0, 5000, 50)
+        )
+    )
+
+    results = screen_reads([reads_fp], sketch_fps, tmp_path / "screen.json")
+    assert results["hosts"]["phix174"]["containment"] == 1.0
+    assert results["hosts"]["human"]["containment"] == 0.0
+    assert json.loads((tmp_path / "screen.json").read_text()) == results
+    assert screened_out(tmp_path / "screen.json", "human")
+    assert not screened_out(tmp_path / "screen.json", "phix174")
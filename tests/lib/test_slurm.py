@@ -0,0 +1,265 @@
+import os
+import pytest
+from pathlib import Path
+from autobfx.lib.config import RunnerConfig
+from autobfx.lib.flow import AutobfxFlow
+from autobfx.lib.io import IOReads
+from autobfx.lib.runner import NoManager, SLURMRunner
+from autobfx.lib.slurm import SLURMJobMonitor
+from autobfx.lib.task import AutobfxTask, AutobfxTaskBundle
+from autobfx.tasks.fastq_stats import run_fastq_stats
+
+
+def fake_sacct(tmp_path: Path, output: str) -> str:
+    # Logs each call so tests can count them
+    fp = tmp_path / "sacct"
+    fp.write_text(
+        f"#!/bin/sh\necho \"$@\" >> {tmp_path / 'calls.log'}\ncat <<'END'\n{output}\nEND\n"
+    )
+    os.chmod(fp, 0o755)
+    return str(fp)
+
+
+def fake_sbatch(tmp_path: Path, job_id: int, execute: bool = False) -> str:
+    # Numbers jobs from `job_id`, saving each submitted script as script_<job id>.sh (and running it if `execute`)
+    fp = tmp_path / "sbatch"
+    fp.write_text(
+        f"#!/bin/sh\nn=$(cat {tmp_path / 'next'} 2>/dev/null || echo {job_id})\necho $((n + 1)) > {tmp_path / 'next'}\n"
+        f"cat > {tmp_path}/script_$n.sh\n"
+        + (f"sh {tmp_path}/script_$n.sh > /dev/null\n" if execute else "")
+        + "echo 'Submitted batch job '$n\n"
+    )
+    os.chmod(fp, 0o755)
+    return str(fp)
+
+
+def slurm_runner(
+    tmp_path: Path, sacct_output: str, parameters: dict = {"array": True}
+) -> SLURMRunner:
+    return SLURMRunner(
+        NoManager(),
+        options={
+            "params": RunnerConfig(
+                parameters={
+                    **parameters,
+                    "sbatch_cmd": fake_sbatch(tmp_path, 42, "bundle" in parameters),
+                    "sacct_cmd": fake_sacct(tmp_path, sacct_output),
+                    "poll_interval_s": 0.1,
+                }
+            )
+        },
+    )
+
+
+def test_parse():
+    statuses = SLURMJobMonitor.parse(
+        "100|COMPLETED|0:0\n100.batch|COMPLETED|0:0\n101|CANCELLED by 1000|0:15\n102_3|RUNNING|0:0\n"
+    )
+
+    assert set(statuses.keys()) == {"100", "101", "102_3"}
+    assert statuses["100"].ok
+    assert statuses["101"].state == "CANCELLED"
+    assert statuses["102_3"].state == "RUNNING"
+
+
+def test_monitor_batches_jobs(tmp_path: Path):
+    monitor = SLURMJobMonitor(
+        fake_sacct(tmp_path, "1|COMPLETED|0:0\n2|FAILED|1:0\n3|COMPLETED|0:0"),
+        interval=0.2,
+    )
+    futures = [monitor.watch(job_id) for job_id in ["1", "2", "3"]]
+    statuses = [f.result(timeout=10) for f in futures]
+
+    assert [s.state for s in statuses] == ["COMPLETED", "FAILED", "COMPLETED"]
+    calls = (tmp_path / "calls.log").read_text().splitlines()
+    assert len(calls) == 1
+    assert "1,2,3" in calls[0]
+
+
+def test_run_array(tmp_path: Path):
+    runner = slurm_runner(tmp_path, "42_0|COMPLETED|0:0\n42_1|FAILED|1:0")
+    statuses = runner.run_array(
+        [[["echo", "a"]], [["echo", "b1"], ["echo", "b2"]]],
+        {"job_name": "test", "manifest_fp": tmp_path / "test.manifest"},
+    )
+
+    assert [s.state for s in statuses] == ["COMPLETED", "FAILED"]
+    assert (tmp_path / "test.manifest").read_text() == "echo a\necho b1 && echo b2\n"
+    assert "--array               0-1" in (tmp_path / "script_42.sh").read_text()
+    # Elements are polled through their array job
+    assert "-j 42 " in (tmp_path / "calls.log").read_text()
+
+
+def test_task_array(tmp_path: Path):
+    runner = slurm_runner(tmp_path, "42_0|COMPLETED|0:0\n42_1|FAILED|1:0")
+
+    def func(input_reads, extra_inputs, output_reads, extra_outputs, log_fp, runner):
+        cmd = ["echo", str(extra_outputs["out"][0].fp)]
+        runner.run_cmd(cmd)
+        return cmd
+
+    tasks = []
+    for sample in ["s1", "s2", "s3"]:
+        if sample != "s3":
+            (tmp_path / f"{sample}.in").write_text(sample)
+        tasks.append(
+            AutobfxTask(
+                name="a",
+                ids={"sample": sample},
+                func=func,
+                project_fp=tmp_path,
+                extra_inputs={"in": [tmp_path / f"{sample}.in"]},
+                extra_outputs={"out": [tmp_path / f"{sample}.out"]},
+                runner=runner,
+            )
+        )
+    arrays = AutobfxFlow._batches(tasks)
+    array = arrays[tasks[0]]
+
+    assert set(arrays.values()) == {array}
+    assert runner.options.get("job_name") is None
+    results = array._array_func.fn(recheck=[False, False, False])
+
+    assert results[("s1",)] == ["echo", str(tmp_path / "s1.out")]
+    assert isinstance(results[("s2",)], RuntimeError)
+    assert isinstance(results[("s3",)], FileNotFoundError)
+    assert tasks[0].store.completed([tmp_path / "s1.out", tmp_path / "s2.out"]) == {
+        str(tmp_path / "s1.out")
+    }
+    assert (tmp_path / "next").read_text().strip() == "43"
+
+
+def test_submit_dag(tmp_path: Path):
+    runner = slurm_runner(tmp_path, "42|COMPLETED|0:0\n43|COMPLETED|0:0")
+    (tmp_path / "in.txt").write_text("in")
+    tasks = [
+        AutobfxTask(
+            name=name,
+            ids={"sample": "s1"},
+            func=lambda *a: None,
+            project_fp=tmp_path,
+            extra_inputs={"in": [tmp_path / f"{i}.txt"]},
+            extra_outputs={"out": [tmp_path / f"{o}.txt"]},
+            runner=runner,
+        )
+        for name, i, o in [("a", "in", "a"), ("b", "a", "b")]
+    ]
+    flow = AutobfxFlow.from_tasks("test", tasks)
+    flow.connect("a", "b")
+    flow._submit_dag(tasks)
+
+    # Both jobs are submitted before either has run, b waiting on a through SLURM
+    assert "afterok:42" not in (tmp_path / "script_42.sh").read_text()
+    assert "afterok:42" in (tmp_path / "script_43.sh").read_text()
+    assert tasks[1].store.completed([tmp_path / "a.txt", tmp_path / "b.txt"]) == {
+        str(tmp_path / "a.txt"),
+        str(tmp_path / "b.txt"),
+    }
+
+
+def test_submit_dag_funcs(tmp_path: Path):
+    runner = slurm_runner(tmp_path, "42|COMPLETED|0:0\n43|FAILED|1:0", {})
+    runner.options["params"].parameters["sbatch_cmd"] = fake_sbatch(tmp_path, 42, True)
+    (tmp_path / "s1_R1.fastq").write_text("@r1\nACGT\n+\nIIII\n")
+
+    def task(name: str, i: str, o: str, **kwargs) -> AutobfxTask:
+        return AutobfxTask(
+            name=name,
+            ids={"sample": "s1"},
+            func=lambda *a: None,
+            project_fp=tmp_path,
+            extra_inputs={"in": [tmp_path / i]},
+            extra_outputs={"out": [tmp_path / o]},
+            runner=runner,
+            **kwargs,
+        )
+
+    stats = AutobfxTask(
+        name="fastq_stats",
+        ids={"sample": "s1"},
+        func=run_fastq_stats,
+        project_fp=tmp_path,
+        input_reads=[IOReads(tmp_path / "s1_R1.fastq")],
+        extra_outputs={"stats": [tmp_path / "s1.json"]},
+        log_fp=tmp_path / "logs" / "s1.log",
+        runner=runner,
+    )
+    tasks = [
+        stats,
+        task("screened", "s1.json", "b.txt", screen=lambda: True),
+        task("after", "b.txt", "c.txt"),
+        task("failing", "s1_R1.fastq", "d.txt"),
+    ]
+    flow = AutobfxFlow.from_tasks("test", tasks)
+    flow.connect("fastq_stats", "screened")
+    flow.connect("screened", "after")
+
+    # The failed job doesn't stop the others from being recorded
+    with pytest.raises(RuntimeError, match="failing"):
+        flow._submit_dag(tasks)
+
+    # The func ran in its job and its result was loaded back for the record
+    records = stats.store.get(
+        [tmp_path / f for f in ["s1.json", "b.txt", "c.txt", "d.txt"]]
+    )
+    assert records[str(tmp_path / "s1.json")]["cmd"] == {"s1_R1.fastq": 1}
+    # Screening waited on the stats job, then screened out everything downstream without submitting it
+    assert records[str(tmp_path / "b.txt")]["status"] == "screened_out"
+    assert records[str(tmp_path / "c.txt")]["status"] == "screened_out"
+    assert str(tmp_path / "d.txt") not in records
+    assert sorted(p.name for p in tmp_path.glob("script_*.sh")) == [
+        "script_42.sh",
+        "script_43.sh",
+    ]
+
+
+def test_task_bundle(tmp_path: Path):
+    runner = slurm_runner(tmp_path, "42|COMPLETED|0:0", {"bundle": 2})
+
+    def func(input_reads, extra_inputs, output_reads, extra_outputs, log_fp, runner):
+        cmd = ["sh", "-c", "'exit 1'" if "s2" in str(log_fp) else "'exit 0'"]
+        runner.run_cmd(cmd)
+        return cmd
+
+    tasks = [
+        AutobfxTask(
+            name="a",
+            ids={"sample": sample},
+            func=func,
+            project_fp=tmp_path,
+            extra_outputs={"out": [tmp_path / f"{sample}.out"]},
+            log_fp=tmp_path / f"{sample}.log",
+            runner=runner,
+        )
+        for sample in ["s1", "s2", "s3"]
+    ]
+    batches = AutobfxFlow._batches(tasks)
+
+    # s3 is left over on its own so it runs as a normal task
+    assert set(batches.keys()) == {tasks[0], tasks[1]}
+    bundle = batches[tasks[0]]
+    assert isinstance(bundle, AutobfxTaskBundle)
+    results = bundle._array_func.fn(recheck=[False, False])
+
+    assert results[("s1",)] == ["sh", "-c", "'exit 0'"]
+    assert isinstance(results[("s2",)], RuntimeError)
+    assert "--cpus-per-task       2" in (tmp_path / "script_42.sh").read_text()
+
+
+def test_bundle_size(tmp_path: Path):
+    runner = slurm_runner(tmp_path, "", {"bundle": "auto", "bundle_target_min": 30})
+    t = AutobfxTask(
+        name="a", ids={"sample": "s1"}, func=None, project_fp=tmp_path, runner=runner
+    )
+
+    # No history, so the estimate is runtime_min (120)
+    assert AutobfxFlow._bundle_size(t) == 1
+    for i, runtime in enumerate([50, 60, 70]):
+        t.store.record(
+            "a",
+            {"sample": f"s{i}"},
+            [tmp_path / f"{i}.out"],
+            started=0,
+            finished=runtime,
+        )
+    assert AutobfxFlow._bundle_size(t) == 30
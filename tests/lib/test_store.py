@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+from autobfx.lib.io import IOObject
+from autobfx.lib.store import TRANSIENT, CompletionStore
+from autobfx.lib.task import AutobfxTask
+
+
+def test_store_record(tmp_path: Path):
+    store = CompletionStore(tmp_path / ".autobfx" / "autobfx.db")
+    outputs = [tmp_path / f"out{i}.txt" for i in range(2000)]
+    store.record(
+        task="test",
+        ids={"sample": "s1"},
+        outputs=outputs[:1500],
+        cmd=["echo", "hi"],
+        inputs={"in.txt": [1, 2]},
+    )
+
+    assert store.completed(outputs) == {str(fp) for fp in outputs[:1500]}
+    record = store.get([outputs[0]])[str(outputs[0])]
+    assert record["task"] == "test"
+    assert record["ids"] == {"sample": "s1"}
+    assert record["cmd"] == ["echo", "hi"]
+
+    store.remove(outputs[:10])
+    assert len(store.completed(outputs)) == 1490
+
+
+def test_store_imports_done_files(tmp_path: Path):
+    (tmp_path / "trimmomatic").mkdir()
+    output_fp = tmp_path / "trimmomatic" / "A_R1.fastq.gz"
+    output_fp.touch()
+    with open(tmp_path / "trimmomatic" / ".A_R1.fastq.gz.done", "w") as f:
+        json.dump({"job_name": "trimmomatic_A"}, f)
+        f.write("\ncmd: ['trimmomatic']")
+
+    # Markers are only picked up for the outputs tasks ask about
+    store = CompletionStore.for_project(tmp_path)
+    assert not store.completed([output_fp])
+
+    task = AutobfxTask(
+        name="trimmomatic",
+        ids={"sample": "A"},
+        func=lambda *a: None,
+        project_fp=tmp_path,
+        extra_outputs={"out": [output_fp]},
+    )
+    assert not task._check()
+
+    record = store.get([output_fp])[str(output_fp)]
+    assert record["task"] == "trimmomatic"
+    assert record["ids"] == {"sample": "A"}
+    assert record["status"] == "imported"
+
+
+def test_task_check(tmp_path: Path):
+    input_fp = tmp_path / "in.txt"
+    input_fp.touch()
+    outputs = [tmp_path / "a.txt", tmp_path / "b.txt"]
+    for fp in outputs:
+        fp.touch()
+    task = AutobfxTask(
+        name="test",
+        ids={"sample": "s1"},
+        func=lambda *a: None,
+        project_fp=tmp_path,
+        extra_inputs={"in": [IOObject(input_fp)]},
+        extra_outputs={"out": outputs},
+    )
+
+    assert task._check()
+    task.store.record(task="test", ids=task.id_dict, outputs=outputs[:1])
+    assert task._check()
+    task.store.record(task="test", ids=task.id_dict, outputs=outputs)
+    assert not task._check()
+    assert task._check(completed=set())
+
+    # Recorded outputs that have gone missing are remade, unless they were never meant to be kept
+    outputs[1].unlink()
+    assert task._check()
+    task.store.record(
+        task="test", ids=task.id_dict, outputs=outputs[1:], status=TRANSIENT
+    )
+    assert not task._check()
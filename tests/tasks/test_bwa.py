@@ -0,0 +1,184 @@
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from autobfx.lib.config import Config, RunnerConfig
+from autobfx.lib.io import IOObject, IOReads
+from autobfx.lib.runner import LocalRunner, NoManager, TestRunner
+from autobfx.tasks import bwa
+from autobfx.tasks.bwa import (
+    INDEX_SUFFIXES,
+    run_align_and_sort,
+    run_align_to_host,
+    run_align_to_hosts,
+    run_build_combined_index,
+    run_build_host_index,
+)
+
+
+def test_align_and_sort(data_fp: Path, dummy_project: Config, test_runner: TestRunner):
+    project_fp = dummy_project.project_fp
+    input_reads = data_fp / "reads" / "LONG_R1.fastq.gz"
+    bam_fp = project_fp / "sort_sam" / "human_LONG.bam"
+    test_runner.options = {"params": RunnerConfig(threads=8, mem_mb=4000)}
+
+    cmd = " ".join(
+        run_align_and_sort(
+            input_reads=[IOReads(input_reads, IOReads.infer_r2(input_reads))],
+            extra_inputs={"host": [IOObject(data_fp / "hosts" / "human.fasta")]},
+            output_reads=[],
+            extra_outputs={"bams": [IOObject(bam_fp)]},
+            log_fp=project_fp / "logs" / "human_LONG.log",
+            runner=test_runner,
+        )
+    )
+
+    # Threads are split between aligning and sorting, and nothing but the BAM is written
+    assert "bwa mem -M -t 6 " in cmd
+    assert "| samtools sort -@ 2 -m 1000M " in cmd
+    assert f"-o {bam_fp} -" in cmd
+    assert cmd.startswith("set -o pipefail && ")
+    assert ".sam" not in cmd
+
+
+def fake_bwa(tmp_path: Path, monkeypatch):
+    # Stands in for `bwa index prefix`, logging every build
+    bin_fp = tmp_path / "bin"
+    bin_fp.mkdir()
+    (bin_fp / "bwa").write_text(
+        "#!/bin/bash\n"
+        f"echo $2 >> {tmp_path / 'builds'}\n"
+        "for s in amb ann bwt pac sa; do touch $2.$s; done\n"
+    )
+    (bin_fp / "bwa").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_fp}:{os.environ['PATH']}")
+
+
+def test_build_host_index_cache(data_fp: Path, tmp_path: Path, monkeypatch):
+    fake_bwa(tmp_path, monkeypatch)
+    cache_fp = tmp_path / "cache"
+    hashed = []
+    sha256 = bwa._sha256
+    monkeypatch.setattr(bwa, "_sha256", lambda fp: hashed.append(fp) or sha256(fp))
+
+    # Two projects indexing the same host
+    for project in ["a", "b"]:
+        outputs = [
+            IOObject(tmp_path / project / f"human.fasta.{s}") for s in INDEX_SUFFIXES
+        ]
+        (tmp_path / project).mkdir()
+        run_build_host_index(
+            input_reads=[],
+            extra_inputs={"host": [IOObject(data_fp / "hosts" / "human.fasta")]},
+            output_reads=[],
+            extra_outputs={"host_indices": outputs},
+            log_fp=tmp_path / f"{project}.log",
+            runner=LocalRunner(NoManager()),
+            index_cache=cache_fp,
+        )
+        assert all(o.fp.resolve().parent.parent == cache_fp for o in outputs)
+
+    assert len((tmp_path / "builds").read_text().splitlines()) == 1
+    # The fasta's hash is remembered between runs
+    assert len(hashed) == 1
+
+
+def test_align_shm(data_fp: Path, test_runner: TestRunner, tmp_path: Path):
+    cmd = " ".join(
+        run_align_to_host(
+            input_reads=[IOReads(data_fp / "reads" / "LONG_R1.fastq.gz")],
+            extra_inputs={
+                "host": [IOObject(data_fp / "hosts" / "human.fasta")],
+                "index": [IOObject(tmp_path / "human.fasta.bwt")],
+            },
+            output_reads=[],
+            extra_outputs={"sams": [IOObject(tmp_path / "human_LONG.sam")]},
+            log_fp=tmp_path / "human_LONG.log",
+            runner=test_runner,
+            shm=True,
+        )
+    )
+
+    # The index is loaded into shared memory once, then aligned to by its prefix
+    assert f"bwa shm {tmp_path / 'human.fasta'}" in cmd
+    assert f"bwa mem -M -t 1 {tmp_path / 'human.fasta'} " in cmd
+
+
+def test_build_combined_index(data_fp: Path, tmp_path: Path, monkeypatch):
+    fake_bwa(tmp_path, monkeypatch)
+    outputs = [IOObject(tmp_path / f"combined_hosts.fasta.{s}") for s in INDEX_SUFFIXES]
+
+    run_build_combined_index(
+        input_reads=[],
+        extra_inputs={
+            "hosts": [
+                IOObject(data_fp / "hosts" / "human.fasta"),
+                IOObject(data_fp / "hosts" / "phix174.fasta"),
+            ]
+        },
+        output_reads=[],
+        extra_outputs={"host_indices": outputs},
+        log_fp=tmp_path / "combined.log",
+        runner=LocalRunner(NoManager()),
+        index_cache=tmp_path / "cache",
+    )
+
+    # One fasta of every host's contigs, prefixed with the host's name, indexed once
+    combined = outputs[0].fp.resolve().with_suffix("")
+    headers = [l for l in combined.read_text().splitlines() if l.startswith(">")]
+    assert headers[0].startswith(">human|KI270762.1 ")
+    assert headers[-1].startswith(">phix174|gi|9626372|")
+    assert (tmp_path / "builds").read_text().splitlines() == [str(combined)]
+
+
+def test_build_combined_index_missing_fasta(
+    data_fp: Path, test_runner: TestRunner, tmp_path: Path, monkeypatch
+):
+    fake_bwa(tmp_path, monkeypatch)
+    hosts = [tmp_path / "hosts" / "human.fasta", tmp_path / "hosts" / "phix174.fasta"]
+    outputs = [IOObject(tmp_path / f"combined_hosts.fasta.{s}") for s in INDEX_SUFFIXES]
+    kwargs = {
+        "input_reads": [],
+        "extra_inputs": {"hosts": [IOObject(fp) for fp in hosts]},
+        "output_reads": [],
+        "extra_outputs": {"host_indices": outputs},
+        "log_fp": tmp_path / "combined.log",
+        "index_cache": tmp_path / "cache",
+    }
+
+    # Fastas that don't exist yet (e.g. made upstream) are hashed by the job instead
+    cmd = " ".join(run_build_combined_index(runner=test_runner, **kwargs))
+    assert "sha256sum" in cmd
+
+    # Ending up in the same cache as if they'd been there all along
+    hosts[0].parent.mkdir()
+    for fp in hosts:
+        shutil.copy(data_fp / "hosts" / fp.name, fp)
+    subprocess.run(["bash", "-c", cmd], check=True)
+    cache_fp = outputs[0].fp.resolve().parent
+    run_build_combined_index(runner=LocalRunner(NoManager()), **kwargs)
+    assert outputs[0].fp.resolve().parent == cache_fp
+    assert len((tmp_path / "builds").read_text().splitlines()) == 1
+
+
+def test_align_to_hosts(data_fp: Path, test_runner: TestRunner, tmp_path: Path):
+    test_runner.options = {"params": RunnerConfig(threads=8)}
+    cmd = " ".join(
+        run_align_to_hosts(
+            input_reads=[IOReads(data_fp / "reads" / "LONG_R1.fastq.gz")],
+            extra_inputs={"index": [IOObject(tmp_path / "combined_hosts.fasta.bwt")]},
+            output_reads=[],
+            extra_outputs={
+                "bams": [IOObject(tmp_path / "LONG.bam")],
+                "counts": [IOObject(tmp_path / "LONG.json")],
+            },
+            log_fp=tmp_path / "LONG.log",
+            runner=test_runner,
+        )
+    )
+
+    # Aligned once, counted per host on the way into the BAM
+    assert f"bwa mem -M -t 6 {tmp_path / 'combined_hosts.fasta'} " in cmd
+    assert (
+        f"-m autobfx.lib.hosts {tmp_path / 'LONG.json'} | samtools view -b -@ 2 " in cmd
+    )